@@ -4,4 +4,4 @@ This file intentionally left minimal.
 """
 
 __all__ = ["main", "db", "tasks"]
-__all__ = ["main", "routes", "db", "indexer", "tasks", "startup", "evolve"]
+__all__ = ["main", "routes", "db", "indexer", "tasks", "startup", "evolve", "migrate"]
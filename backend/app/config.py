@@ -7,11 +7,13 @@ imports from here instead of scattering os.getenv calls everywhere.
 """
 
 from dataclasses import dataclass, field
+from functools import lru_cache
 import os
 from pathlib import Path
 import subprocess
 
 
+@lru_cache(maxsize=1)
 def _git_commit() -> str | None:
     try:
         out = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
@@ -25,19 +27,64 @@ def _git_commit() -> str | None:
 @dataclass(slots=True)
 class Settings:
     env: str = os.getenv("APP_ENV", "dev")
-    version: str = os.getenv("APP_VERSION", "") or (_git_commit() or "dev")
+    # Resolved per instance (not at import); the git subprocess only runs when
+    # APP_VERSION isn't baked into the environment.
+    version: str = field(default_factory=lambda: os.environ.get("APP_VERSION") or _git_commit() or "dev")
     github_repo: str | None = os.getenv("GITHUB_REPOSITORY")
     github_token: str | None = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
     eval_min_overall: float = float(os.getenv("EVAL_MIN_OVERALL_SCORE", "0.75"))
     events_api_token: str | None = os.getenv("EVENTS_API_TOKEN")
-    # Use default_factory to avoid mutable default list error under dataclasses
-    allow_origins: list[str] = field(
-        default_factory=lambda: os.getenv(
-            "CORS_ALLOW_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000"
-        ).split(",")
+    events_verbose: bool = os.getenv("EVENTS_VERBOSE", "0").lower() in ("1", "true", "yes", "debug")
+    hnsw_ef_search: int = int(os.getenv("HNSW_EF_SEARCH", "100"))
+    # Immutable, pre-stripped tuple so stray spaces in the env don't break CORS matching
+    allow_origins: tuple[str, ...] = field(
+        default_factory=lambda: tuple(
+            o.strip()
+            for o in os.getenv("CORS_ALLOW_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
+            if o.strip()
+        )
     )
 
 
 settings = Settings()
 
-__all__ = ["settings"]
+
+@dataclass(frozen=True, slots=True)
+class RuntimeParams:
+    retrieval_top_k: int
+    confidence_threshold: float
+    eval_threshold: float | None
+    discovery_per_query: int
+    discovery_max_new: int
+    crawl_run_once_limit: int
+    index_run_once_batch: int
+    events_api_token: str
+    github_token: str
+    github_repo: str
+    github_ref: str
+
+
+@lru_cache(maxsize=1)
+def runtime_params() -> RuntimeParams:
+    """Env-derived knobs read by request handlers, parsed once per process.
+
+    Call `runtime_params.cache_clear()` (POST /admin/reload_env) to pick up changes.
+    """
+    eval_threshold = os.getenv("EVAL_MIN_OVERALL_SCORE", "0.75")
+    return RuntimeParams(
+        retrieval_top_k=int(os.getenv("RETRIEVAL_TOP_K", "6") or 6),
+        confidence_threshold=float(os.getenv("CONFIDENCE_THRESHOLD", "0.25") or 0.25),
+        eval_threshold=float(eval_threshold) if eval_threshold else None,
+        discovery_per_query=int(os.getenv("DISCOVERY_PER_QUERY", "5")),
+        discovery_max_new=int(os.getenv("DISCOVERY_MAX_NEW", "25")),
+        crawl_run_once_limit=int(os.getenv("CRAWLER_RUN_ONCE_LIMIT", "50")),
+        index_run_once_batch=int(os.getenv("INDEX_RUN_ONCE_BATCH", "50")),
+        events_api_token=os.getenv("EVENTS_API_TOKEN", ""),
+        # Trim to avoid hidden spaces/newlines causing 404 on workflow dispatch
+        github_token=(os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN") or "").strip(),
+        github_repo=(os.getenv("GITHUB_REPOSITORY") or "").strip(),
+        github_ref=(os.getenv("GITHUB_REF", "main") or "main").strip(),
+    )
+
+
+__all__ = ["settings", "runtime_params", "RuntimeParams"]
@@ -1,11 +1,44 @@
 from __future__ import annotations
 
+import atexit
+from contextlib import asynccontextmanager
+from functools import lru_cache
 import os
-from typing import Any, Iterable, Optional
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, ContextManager, Iterable, Optional
 
+import orjson
 import psycopg
+from psycopg.types.json import set_json_dumps
+from psycopg_pool import ConnectionPool
 
+from .config import settings
 
+import numpy as np
+from pgvector import HalfVector
+
+try:  # binary codec for pgvector columns; text literals still work without it
+    from pgvector.psycopg import register_vector  # type: ignore
+except Exception:  # pragma: no cover - optional
+    register_vector = None  # type: ignore
+
+try:  # async driver for the FastAPI read/write endpoints
+    import asyncpg  # type: ignore
+except Exception:  # pragma: no cover - optional
+    asyncpg = None  # type: ignore
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Every Json/Jsonb parameter (meta columns, settings values) is encoded with orjson
+set_json_dumps(_json_dumps)
+
+
+@lru_cache(maxsize=1)
 def get_db_url() -> str:
     url = os.getenv("DATABASE_URL")
     if not url:
@@ -21,142 +54,377 @@ def get_db_url() -> str:
     return url
 
 
-def connect() -> psycopg.Connection:  # type: ignore
-    return psycopg.connect(get_db_url())
+def get_direct_db_url() -> str:
+    """URL that bypasses PgBouncer, for session features (LISTEN, CONCURRENTLY, session GUCs)."""
+    url = os.getenv("DATABASE_DIRECT_URL")
+    if not url:
+        return get_db_url()
+    return url.replace("postgresql+psycopg://", "postgresql://", 1)
+
+
+def _behind_pgbouncer() -> bool:
+    # Transaction pooling hands each transaction to any server connection, so
+    # named prepared statements can't be reused across transactions.
+    return os.getenv("DB_PGBOUNCER", "0").lower() in ("1", "true", "yes")
+
+
+def to_halfvec(values: Any) -> HalfVector:
+    """Wrap an embedding (list or ndarray) for binary binding to a halfvec column.
+
+    A single vectorised float16 conversion replaces per-element text formatting.
+    """
+    return HalfVector(np.asarray(values, dtype=np.float16))
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _configure(conn: psycopg.Connection) -> None:  # type: ignore
+    # Use server-side prepared statements from the first execution of a query
+    conn.prepare_threshold = None if _behind_pgbouncer() else int(os.getenv("DB_PREPARE_THRESHOLD", "0"))
+    # Session-level ANN recall/latency tradeoff for every pooled connection
+    try:
+        conn.execute("SELECT set_config('hnsw.ef_search', %s, false);", (str(settings.hnsw_ef_search),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+    if register_vector is None:
+        return
+    try:
+        register_vector(conn)
+        conn.commit()
+    except Exception:
+        # vector extension not installed yet (first init_db run)
+        conn.rollback()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_db_url(),
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "4")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "20")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                    num_workers=2,
+                    configure=_configure,
+                    open=True,
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def discard_pool_after_fork() -> None:
+    """Forget a pool inherited from the parent process without closing it.
+
+    Its sockets are shared with the parent, so closing them here would break the
+    parent's connections; the child lazily opens its own pool on next use.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+def connect() -> ContextManager[psycopg.Connection]:  # type: ignore
+    """Borrow a pooled connection; use as `with connect() as conn:`."""
+    return get_pool().connection()
+
+
+_apool: Any = None
+
+
+async def _init_async_conn(conn: Any) -> None:
+    # Decode JSONB columns to Python objects, like psycopg does
+    for typ in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typ, encoder=lambda v: _json_dumps(v).decode(), decoder=orjson.loads, schema="pg_catalog"
+        )
+
+
+async def open_async_pool() -> Any:
+    """Create the asyncpg pool used by the async endpoints (call from the app lifespan)."""
+    global _apool
+    if asyncpg is None:
+        raise RuntimeError("asyncpg non installé")
+    if _apool is None:
+        _apool = await asyncpg.create_pool(
+            get_db_url(),
+            min_size=int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "5")),
+            max_size=int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "25")),
+            statement_cache_size=0 if _behind_pgbouncer() else 100,
+            init=_init_async_conn,
+        )
+    return _apool
+
+
+async def close_async_pool() -> None:
+    global _apool
+    pool, _apool = _apool, None
+    if pool is not None:
+        await pool.close()
+
+
+async def listen_events(callback: Any) -> Any:
+    """Open a dedicated asyncpg connection LISTENing on EVENTS_CHANNEL; the caller closes it."""
+    if asyncpg is None:
+        raise RuntimeError("asyncpg non installé")
+    conn = await asyncpg.connect(get_direct_db_url())
+    await conn.add_listener(EVENTS_CHANNEL, callback)
+    return conn
+
+
+@asynccontextmanager
+async def aconnect() -> AsyncIterator[Any]:
+    """Borrow an asyncpg connection; use as `async with aconnect() as conn:`.
+
+    Outside the FastAPI lifespan (e.g. handlers reused by server.py) no pool is
+    open, so a one-off connection is used instead.
+    """
+    if _apool is not None:
+        async with _apool.acquire() as conn:
+            yield conn
+        return
+    if asyncpg is None:
+        raise RuntimeError("asyncpg non installé")
+    conn = await asyncpg.connect(get_db_url(), statement_cache_size=0 if _behind_pgbouncer() else 100)
+    try:
+        await _init_async_conn(conn)
+        yield conn
+    finally:
+        await conn.close()
+
+
+# live_events writes are buffered in memory and flushed in batches by a
+# background thread with COPY, so log_event never blocks on a DB round-trip.
+EVENTS_CHANNEL = "live_events"
+_EVENTS_QUEUE_MAX = int(os.getenv("EVENTS_QUEUE_MAX", "10000"))
+_EVENTS_FLUSH_BATCH = 200
+_EVENTS_FLUSH_INTERVAL = 0.1
+_event_q: "queue.Queue[tuple[str, str, str, dict[str, Any]]]" = queue.Queue(maxsize=_EVENTS_QUEUE_MAX)
+_event_thread: Optional[threading.Thread] = None
+_event_thread_pid: Optional[int] = None
+_event_lock = threading.Lock()
+
+
+def _write_events(rows: list[tuple[str, str, str, dict[str, Any]]]) -> None:
+    try:
+        with connect() as conn:
+            # Single self-committing statement: no BEGIN/COMMIT round-trips
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    with cur.copy("COPY live_events(stage, level, message, meta) FROM STDIN") as cp:
+                        for stage, level, message, meta in rows:
+                            cp.write_row((stage, level, message, psycopg.types.json.Json(meta)))
+                    # Wake /events/stream listeners; they read the new rows themselves
+                    cur.execute(f"NOTIFY {EVENTS_CHANNEL};")
+            finally:
+                conn.autocommit = False
+    except Exception:
+        # Best effort logging; drop the batch
+        pass
+
+
+def _drain_events(limit: int) -> list[tuple[str, str, str, dict[str, Any]]]:
+    rows: list[tuple[str, str, str, dict[str, Any]]] = []
+    while len(rows) < limit:
+        try:
+            rows.append(_event_q.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+
+def _event_flusher() -> None:
+    while True:
+        try:
+            first = _event_q.get(timeout=_EVENTS_FLUSH_INTERVAL)
+        except queue.Empty:
+            continue
+        time.sleep(_EVENTS_FLUSH_INTERVAL)
+        _write_events([first] + _drain_events(_EVENTS_FLUSH_BATCH - 1))
+
+
+def flush_events() -> None:
+    """Synchronously write every queued event (used at exit)."""
+    while True:
+        rows = _drain_events(_EVENTS_FLUSH_BATCH)
+        if not rows:
+            return
+        _write_events(rows)
+
+
+def _ensure_event_thread() -> None:
+    global _event_thread, _event_thread_pid
+    pid = os.getpid()
+    # Restart after fork (Celery prefork children don't inherit threads)
+    if _event_thread is not None and _event_thread_pid == pid:
+        return
+    with _event_lock:
+        if _event_thread is not None and _event_thread_pid == pid:
+            return
+        _event_thread = threading.Thread(target=_event_flusher, name="live-events-flusher", daemon=True)
+        _event_thread.start()
+        _event_thread_pid = pid
 
 
 def log_event(stage: str, message: str, level: str = "info", meta: Optional[dict[str, Any]] = None) -> None:
+    try:
+        _ensure_event_thread()
+        row = (stage, level, message, meta or {})
         try:
-                with connect() as conn:
-                        with conn.cursor() as cur:
-                                cur.execute(
-                                        "INSERT INTO live_events(stage, level, message, meta) VALUES(%s,%s,%s,%s);",
-                                        (stage, level, message, psycopg.types.json.Json(meta or {})),
-                                )
-                        conn.commit()
-        except Exception:
-                # Best effort logging; ignore errors
+            _event_q.put_nowait(row)
+        except queue.Full:
+            # Drop the oldest event to make room
+            try:
+                _event_q.get_nowait()
+            except queue.Empty:
                 pass
+            _event_q.put_nowait(row)
+    except Exception:
+        # Best effort logging; ignore errors
+        pass
+
+
+atexit.register(flush_events)
+
+
+class SchemaOutdated(RuntimeError):
+    """The database predates a schema change that only the migrate job applies."""
 
 
 def init_db() -> None:
-    # Ensure extension and tables exist; avoid failing the whole init if index creation isn't supported
+    # Ensure extension and tables exist in a single transaction. The transaction-scoped
+    # advisory lock lets one replica run the DDL while concurrent ones wait on it and
+    # then find everything in place. Optional steps run in savepoints so a failure
+    # there (missing privileges, old pgvector) doesn't abort the whole init.
+    # The (potentially slow) vector index build lives in backend/app/migrate.py.
     with connect() as conn:
-        with conn.cursor() as cur:
-            # Extension might require superuser; ignore failure
-            try:
-                cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            except Exception:
-                pass
-            # sources
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS sources (
-                    id SERIAL PRIMARY KEY,
-                    url TEXT UNIQUE NOT NULL,
-                    kind TEXT NOT NULL DEFAULT 'html',
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-            # documents
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS documents (
-                    id BIGSERIAL PRIMARY KEY,
-                    url TEXT UNIQUE NOT NULL,
-                    title TEXT,
-                    content TEXT,
-                    published_at TIMESTAMPTZ,
-                    lang TEXT,
-                    hash TEXT UNIQUE,
-                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    embedding vector(3072),
-                    indexed BOOLEAN NOT NULL DEFAULT FALSE
-                );
-                """
-            )
-            # settings
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value JSONB,
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-            # ci_status
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS ci_status (
-                    id SMALLINT PRIMARY KEY DEFAULT 1,
-                    overall DOUBLE PRECISION,
-                    exact DOUBLE PRECISION,
-                    groundedness DOUBLE PRECISION,
-                    freshness DOUBLE PRECISION,
-                    report_path TEXT,
-                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                );
-                """
-            )
-            # ci_history
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS ci_history (
-                    id SERIAL PRIMARY KEY,
-                    ts TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                    overall DOUBLE PRECISION,
-                    exact DOUBLE PRECISION,
-                    groundedness DOUBLE PRECISION,
-                    semantic_f1 DOUBLE PRECISION,
-                    freshness DOUBLE PRECISION,
-                    avg_freshness_days DOUBLE PRECISION,
-                    meta JSONB
-                );
-                """
-            )
-            # live_events
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS live_events (
-                    id SERIAL PRIMARY KEY,
-                    ts TIMESTAMP DEFAULT NOW(),
-                    stage TEXT,
-                    level TEXT,
-                    message TEXT,
-                    meta JSONB
-                );
-                """
-            )
-        conn.commit()
-
-    # Optional vector index creation
-    import os as _os
-    index_method = (_os.getenv("VECTOR_INDEX_METHOD") or "auto").lower()
-    embedding_dim = 3072
-    create_stmt: Optional[str] = None
-    if index_method == "hnsw":
-        create_stmt = "CREATE INDEX documents_embedding_hnsw_idx ON documents USING hnsw (embedding vector_cosine_ops);"
-    elif index_method in ("ivfflat", "auto") and embedding_dim <= 2000:
-        create_stmt = "CREATE INDEX documents_embedding_ivfflat_idx ON documents USING ivfflat (embedding vector_cosine_ops) WITH (lists=100);"
-    if create_stmt:
-        try:
-            with connect() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        f"""
-                        DO $$
-                        BEGIN
-                            IF NOT EXISTS (
-                                SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid=c.relnamespace
-                                WHERE c.relname = 'documents_embedding_ivfflat_idx' OR c.relname = 'documents_embedding_hnsw_idx'
-                            ) THEN
-                                {create_stmt}
-                            END IF;
-                        END$$;
-                        """
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext('backend.init_db'));")
+                # Extension might require superuser; ignore failure
+                try:
+                    with conn.transaction():
+                        cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+                except Exception:
+                    pass
+                # sources
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS sources (
+                        id SERIAL PRIMARY KEY,
+                        url TEXT UNIQUE NOT NULL,
+                        kind TEXT NOT NULL DEFAULT 'html',
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    );
+                    """
+                )
+                # documents
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS documents (
+                        id BIGSERIAL PRIMARY KEY,
+                        url TEXT UNIQUE NOT NULL,
+                        title TEXT,
+                        content TEXT,
+                        published_at TIMESTAMPTZ,
+                        lang TEXT,
+                        hash TEXT,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        embedding halfvec(3072),
+                        indexed BOOLEAN NOT NULL DEFAULT FALSE
+                    );
+                    """
+                )
+                # Databases created before the halfvec switch still carry a vector(3072) column;
+                # the rewrite is a full-table ACCESS EXCLUSIVE job left to backend/app/migrate.py
+                cur.execute(
+                    """
+                    SELECT 1 FROM pg_attribute
+                    WHERE attrelid = 'documents'::regclass AND attname = 'embedding'
+                      AND atttypid = to_regtype('vector');
+                    """
+                )
+                if cur.fetchone() is not None:
+                    raise SchemaOutdated(
+                        "documents.embedding est encore vector(3072) : lancer `python -m backend.app.migrate`"
                     )
-                conn.commit()
-        except Exception:
-            pass
+                # The non-unique hash index on documents.hash (replacing the old UNIQUE
+                # constraint) is built CONCURRENTLY by backend/app/migrate.py
+                # partial index backing the indexer's "next unindexed batch" lookup
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS documents_unindexed_idx ON documents(id) WHERE indexed = FALSE;"
+                )
+                # The indexed-implies-embedding CHECK is added (and validated) by backend/app/migrate.py
+                # settings
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS settings (
+                        key TEXT PRIMARY KEY,
+                        value JSONB,
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    );
+                    """
+                )
+                # ci_status
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS ci_status (
+                        id SMALLINT PRIMARY KEY DEFAULT 1,
+                        overall DOUBLE PRECISION,
+                        exact DOUBLE PRECISION,
+                        groundedness DOUBLE PRECISION,
+                        freshness DOUBLE PRECISION,
+                        report_path TEXT,
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    );
+                    """
+                )
+                # ci_history
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS ci_history (
+                        id SERIAL PRIMARY KEY,
+                        ts TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        overall DOUBLE PRECISION,
+                        exact DOUBLE PRECISION,
+                        groundedness DOUBLE PRECISION,
+                        semantic_f1 DOUBLE PRECISION,
+                        freshness DOUBLE PRECISION,
+                        avg_freshness_days DOUBLE PRECISION,
+                        meta JSONB
+                    );
+                    """
+                )
+                # backs metrics_history's (ts, id) keyset pagination
+                cur.execute("CREATE INDEX IF NOT EXISTS ci_history_ts_id_idx ON ci_history(ts DESC, id DESC);")
+                # live_events
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS live_events (
+                        id SERIAL PRIMARY KEY,
+                        ts TIMESTAMP DEFAULT NOW(),
+                        stage TEXT,
+                        level TEXT,
+                        message TEXT,
+                        meta JSONB
+                    );
+                    """
+                )
+    # Connections opened before the extension existed lack the vector codec
+    try:
+        get_pool().drain()
+    except Exception:
+        pass
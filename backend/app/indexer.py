@@ -4,8 +4,12 @@ Provides a placeholder `index_unembedded` function so the FastAPI app and
 Celery tasks can run even if no real embedding service is configured yet.
 
 Behaviour:
-  - Select up to `batch_size` documents whose embedding is NULL or `indexed` is FALSE.
-  - Assign a zero vector (length 3072) as a dummy embedding and mark them indexed.
+  - Select up to `batch_size` documents with `indexed = FALSE` (served by the
+    partial index `documents_unindexed_idx`) and, in the same statement, assign
+    a zero vector (length 3072) as a dummy embedding and mark them indexed
+    (single round-trip).
+  - Rows are claimed with `FOR UPDATE SKIP LOCKED`, so concurrent workers each
+    pick a disjoint batch instead of queueing on the same row locks.
   - Return the number of documents updated.
 
 You can later replace the zero vector with real embeddings (OpenAI, local model, etc.).
@@ -13,13 +17,16 @@ You can later replace the zero vector with real embeddings (OpenAI, local model,
 
 from __future__ import annotations
 
-import os
 from typing import List
 
-from .db import connect, log_event  # type: ignore
+import numpy as np
+
+from .config import settings
+from .db import connect, log_event, to_halfvec  # type: ignore
 
 EMBED_DIM = 3072
-_ZERO_VECTOR_LITERAL = "[" + ",".join("0" for _ in range(EMBED_DIM)) + "]"
+# Built once per process and bound as a binary halfvec parameter (see db._configure)
+_ZERO_VECTOR = to_halfvec(np.zeros(EMBED_DIM, dtype=np.float16))
 
 
 def index_unembedded(batch_size: int = 25) -> int:
@@ -31,25 +38,21 @@ def index_unembedded(batch_size: int = 25) -> int:
         with connect() as conn:  # type: ignore
             with conn.cursor() as cur:
                 cur.execute(
-                    "SELECT id FROM documents WHERE (embedding IS NULL OR indexed = FALSE) ORDER BY id ASC LIMIT %s;",
-                    (batch_size,),
+                    "UPDATE documents SET embedding = %s, indexed = TRUE "
+                    "WHERE id IN ("
+                    "SELECT id FROM documents WHERE indexed = FALSE ORDER BY id ASC LIMIT %s "
+                    "FOR UPDATE SKIP LOCKED"
+                    ");",
+                    (_ZERO_VECTOR, batch_size),
                 )
-                rows = cur.fetchall()
-                if not rows:
+                updated = cur.rowcount or 0
+                if not updated:
                     return 0
-                updated = 0
-                for (doc_id,) in rows:
-                    cur.execute(
-                        "UPDATE documents SET embedding = %s::vector, indexed = TRUE WHERE id = %s;",
-                        (_ZERO_VECTOR_LITERAL, doc_id),
-                    )
-                    updated += cur.rowcount or 0
             conn.commit()
         if updated:
             try:
-                verbose = os.getenv("EVENTS_VERBOSE", "0").lower() in ("1", "true", "yes", "debug")
                 log_event("index", "Indexed batch", meta={"updated": updated})  # type: ignore
-                if verbose:
+                if settings.events_verbose:
                     log_event("index", "Dummy embeddings used", meta={"dim": EMBED_DIM})  # type: ignore
             except Exception:
                 pass
@@ -1,50 +1,90 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
+import time
 from datetime import datetime, timezone
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Any, List
-import requests
+import anyio
+import httpx
+import orjson
+import redis.asyncio as aioredis
 from fastapi.middleware.cors import CORSMiddleware
-from .db import init_db, connect, log_event
-from .config import settings
+from .db import SchemaOutdated, init_db, connect, close_pool, flush_events, get_pool, log_event, aconnect, listen_events, open_async_pool, close_async_pool
+from .config import runtime_params, settings
+from .responses import ORJSONResponse
 from .indexer import index_unembedded
 from crawler.run import crawl_sources, discover_new_sources
 from core.search import search_answer
 from .routes.admin import router as admin_router
 from .routes.search import router as search_router
 from contextlib import asynccontextmanager
+from functools import lru_cache
 from .startup import seed_sources_if_empty
 from .tasks import celery_app  # for AsyncResult
 from celery.result import AsyncResult
-from .tasks import task_run_once, task_discover_once
+from .tasks import task_run_once, task_discover_once, task_evaluate, redis_url, PUB_DATES_KEY
 from .evolve import seed_from_docs
-import requests as _requests_diag
 from .db import connect
 import psycopg
 from typing import Optional
 
 
+_GITHUB_HEADERS = {"Accept": "application/vnd.github+json"}
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # type: ignore[name-defined]
+    # Sync `def` endpoints (psycopg, crawler, Celery calls) run in anyio's threadpool (40 by default)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "200"))
     # Initialize DB only if DATABASE_URL is provided; allows local dev without Docker/DB
     try:
         init_db()
         seed_sources_if_empty()
+    except SchemaOutdated:
+        raise  # serving queries against the old column type would fail on every request
     except Exception:
         pass
-    yield
-
-
-app = FastAPI(title="AI Auto-Evolve Backend", lifespan=lifespan)
+    try:
+        get_pool()  # open the sync pool at startup rather than on the first request
+    except Exception:
+        pass
+    app.state.pg = None
+    try:
+        app.state.pg = await open_async_pool()
+    except Exception:
+        pass
+    # Shared client for GitHub API calls (keeps connections alive between requests)
+    app.state.http = httpx.AsyncClient(timeout=15, headers=_GITHUB_HEADERS)
+    # Separate client for source probes: no GitHub credentials, keep-alive per host
+    app.state.probe_http = _new_probe_client()
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        await app.state.probe_http.aclose()
+        await _close_events_listener()
+        await close_async_pool()
+        flush_events()  # queued live_events still need the pool
+        close_pool()
+
+
+# Swagger UI moves off /docs, which is the documents listing used by the frontend
+app = FastAPI(
+    title="AI Auto-Evolve Backend",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    docs_url="/swagger",
+)
 app.add_middleware(
     CORSMiddleware,
-    # Explicit origins to satisfy browsers when credentials are allowed
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-    ],
+    # Explicit origins to satisfy browsers when credentials are allowed (CORS_ALLOW_ORIGINS)
+    allow_origins=list(settings.allow_origins),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -60,7 +100,7 @@ def health():
         "status": "ok",
         "env": settings.env,
         "version": settings.version,
-        "time": datetime.utcnow().isoformat() + "Z",
+        "time": datetime.now(timezone.utc),
     }
 
 @app.get("/config/runtime")
@@ -68,8 +108,8 @@ def runtime_config():
     return {
         "version": settings.version,
         "env": settings.env,
-        "retrieval_top_k": int(os.getenv("RETRIEVAL_TOP_K", "6") or 6),
-        "confidence_threshold": float(os.getenv("CONFIDENCE_THRESHOLD", "0.25") or 0.25),
+        "retrieval_top_k": runtime_params().retrieval_top_k,
+        "confidence_threshold": runtime_params().confidence_threshold,
         "eval_min_overall": settings.eval_min_overall,
     }
 
@@ -127,128 +167,185 @@ def task_status(task_id: str):
     except Exception as e:
         return {"task_id": task_id, "status": "error", "error": str(e)}
 
+_LIST_CACHE_CONTROL = "public, max-age=5, stale-while-revalidate=30"
+
+
+def _cacheable_json(request: Request | None, content: dict[str, Any]) -> Response:
+    """Serialize a list payload with a weak ETag; a matching If-None-Match gets a bodyless 304."""
+    body = ORJSONResponse(content=content).body
+    etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": _LIST_CACHE_CONTROL}
+    if request is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _approx_count_sql(table: str) -> str:
+    """Planner row estimate for `table` (no scan); reltuples is -1 before the first ANALYZE."""
+    return f"SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = '{table}'::regclass;"
+
+
 @app.get("/docs")
-def docs_list(limit: int = 50, offset: int = 0):
+async def docs_list(request: Request, limit: int = 50, offset: int = 0, after_id: int | None = None):
+    # Keyset pagination: pass the previous page's next_cursor as after_id (offset kept for old clients).
+    # Keyset pages report an estimated total so each page stays O(limit); offset pages keep the exact count.
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT COUNT(*) FROM documents;"
+        async with aconnect() as conn:
+            if after_id is not None:
+                total = await conn.fetchval(_approx_count_sql("documents"))
+                rows = await conn.fetch(
+                    "SELECT id, url, title, published_at AS date, lang, created_at FROM documents WHERE id < $1 ORDER BY id DESC LIMIT $2;",
+                    after_id,
+                    limit,
                 )
-                total = cur.fetchone()[0]
-                cur.execute(
-                    "SELECT url, title, published_at, lang, created_at FROM documents ORDER BY id DESC LIMIT %s OFFSET %s;",
-                    (limit, offset),
+            else:
+                total = await conn.fetchval("SELECT COUNT(*) FROM documents;")
+                rows = await conn.fetch(
+                    "SELECT id, url, title, published_at AS date, lang, created_at FROM documents ORDER BY id DESC LIMIT $1 OFFSET $2;",
+                    limit,
+                    offset,
                 )
-                rows = cur.fetchall()
-        return {
-            "items": [
-                {
-                    "url": r[0],
-                    "title": r[1],
-                    "date": r[2].isoformat() if r[2] else None,
-                    "lang": r[3],
-                    "created_at": r[4].isoformat() if r[4] else None,
-                }
-                for r in rows
-            ],
+        # Column names already match the response keys; Records convert straight to dicts
+        return _cacheable_json(request, {
+            "items": [dict(r) for r in rows],
             "total": total,
             "limit": limit,
             "offset": offset,
-        }
+            "next_cursor": rows[-1]["id"] if len(rows) == limit else None,
+        })
     except Exception as e:
         return {"items": [], "error": str(e), "total": 0, "limit": limit, "offset": offset}
 
-## (Removed earlier duplicate /metrics/history simple endpoint; consolidated later extended version.)
-
 
 @app.get("/sources")
-def list_sources(limit: int = 100, offset: int = 0):
+async def list_sources(request: Request, limit: int = 100, offset: int = 0, after_id: int | None = None):
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT id, url, kind, created_at FROM sources ORDER BY id ASC LIMIT %s OFFSET %s;",
-                    (limit, offset),
+        async with aconnect() as conn:
+            if after_id is not None:
+                rows = await conn.fetch(
+                    "SELECT id, url, kind, created_at FROM sources WHERE id > $1 ORDER BY id ASC LIMIT $2;",
+                    after_id,
+                    limit,
+                )
+            else:
+                rows = await conn.fetch(
+                    "SELECT id, url, kind, created_at FROM sources ORDER BY id ASC LIMIT $1 OFFSET $2;",
+                    limit,
+                    offset,
                 )
-                rows = cur.fetchall()
-        return {"items": [{"id": r[0], "url": r[1], "kind": r[2], "created_at": r[3].isoformat()} for r in rows]}
+        return _cacheable_json(request, {
+            "items": [{"id": r[0], "url": r[1], "kind": r[2], "created_at": r[3]} for r in rows],
+            "next_cursor": rows[-1][0] if len(rows) == limit else None,
+        })
     except Exception:
         return {"items": []}
 
 
 @app.get("/docs/latest")
-def docs_latest(limit: int = 10):
+async def docs_latest(limit: int = 10):
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT url, title, published_at, lang FROM documents ORDER BY created_at DESC LIMIT %s;", (limit,))
-                rows = cur.fetchall()
-        return {"items": [{"url": r[0], "title": r[1], "date": r[2].isoformat() if r[2] else None, "lang": r[3]} for r in rows]}
+        async with aconnect() as conn:
+            rows = await conn.fetch("SELECT url, title, published_at, lang FROM documents ORDER BY created_at DESC LIMIT $1;", limit)
+        return {"items": [{"url": r[0], "title": r[1], "date": r[2], "lang": r[3]} for r in rows]}
     except Exception:
         return {"items": []}
 
 
+_METRICS_SQL_TEMPLATE = (
+    "SELECT {docs_count}, (SELECT COUNT(*) FROM sources), "
+    "ci.id, ci.overall, ci.exact, ci.groundedness, ci.freshness, ci.updated_at, s.value "
+    "FROM (SELECT 1) AS _ "
+    "LEFT JOIN ci_status ci ON ci.id = 1 "
+    "LEFT JOIN settings s ON s.key = 'DISCOVERY_QUERIES';"
+)
+_METRICS_SQL = _METRICS_SQL_TEMPLATE.format(docs_count="(SELECT COUNT(*) FROM documents)")
+# Planner estimate instead of a full scan of documents (reltuples is -1 before the first ANALYZE)
+_METRICS_SQL_APPROX = _METRICS_SQL_TEMPLATE.format(
+    docs_count="(SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'documents'::regclass)"
+)
+
+
+# Dashboards poll /metrics continuously; serve a shared snapshot per TTL window
+_METRICS_CACHE_TTL = float(os.getenv("METRICS_CACHE_TTL", "5"))
+_metrics_cache: dict[bool, tuple[float, bytes, str]] = {}
+_metrics_cache_lock = asyncio.Lock()
+
+
+async def _cached_metrics(approx: bool) -> tuple[bytes, str]:
+    """Return (serialized body, ETag) for /metrics, recomputing at most once per TTL."""
+    hit = _metrics_cache.get(approx)
+    if hit and hit[0] > time.monotonic():
+        return hit[1], hit[2]
+    async with _metrics_cache_lock:
+        hit = _metrics_cache.get(approx)
+        if hit and hit[0] > time.monotonic():
+            return hit[1], hit[2]
+        body = ORJSONResponse(content=await _load_metrics(approx)).body
+        etag = '"' + hashlib.md5(body).hexdigest()[:16] + '"'
+        _metrics_cache[approx] = (time.monotonic() + _METRICS_CACHE_TTL, body, etag)
+        return body, etag
+
+
 @app.get("/metrics")
-def metrics():
+async def metrics(request: Request, approx: bool = False):
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM documents;")
-                docs = cur.fetchone()[0]
-                cur.execute("SELECT COUNT(*) FROM sources;")
-                sources = cur.fetchone()[0]
-                # Pull last CI status and threshold (from env or stored setting)
-                cur.execute("SELECT overall, exact, groundedness, freshness, updated_at FROM ci_status WHERE id=1;")
-                ci = cur.fetchone()
-                cur.execute("SELECT value FROM settings WHERE key='DISCOVERY_QUERIES';")
-                row = cur.fetchone()
-        ci_status = None
-        if ci:
-            ci_status = {
-                "overall": float(ci[0]) if ci[0] is not None else None,
-                "exact": float(ci[1]) if ci[1] is not None else None,
-                "groundedness": float(ci[2]) if ci[2] is not None else None,
-                "freshness": float(ci[3]) if ci[3] is not None else None,
-                "updated_at": ci[4].isoformat() + "Z" if ci[4] else None,
-            }
-        eval_threshold = os.getenv("EVAL_MIN_OVERALL_SCORE", "0.75")
-        discover_qs = None
-        try:
-            if row and isinstance(row[0], dict):
-                discover_qs = row[0].get("queries")
-        except Exception:
-            discover_qs = None
-        # Keep legacy fields and add UI-friendly fields expected by frontend
-        retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", "6") or 6)
-        confidence_threshold = float(os.getenv("CONFIDENCE_THRESHOLD", "0.25") or 0.25)
-        return {
-            "nb_docs": docs,
-            "nb_sources": sources,
-            "last_update": datetime.utcnow().isoformat() + "Z",
-            "eval_score": None,
-            # UI expected keys
-            "documents": docs,
-            "coverage": 1.0 if sources > 0 else 0.0,
-            "freshness_days": None,
-            "avg_response_time": None,
-            "ci": ci_status,
-            "eval_threshold": float(eval_threshold) if eval_threshold else None,
-            "discovery_queries": discover_qs,
-            "retrieval_top_k": retrieval_top_k,
-            "confidence_threshold": confidence_threshold,
-        }
+        body, etag = await _cached_metrics(approx)
     except Exception:
         return {
             "nb_docs": 0,
             "nb_sources": 0,
-            "last_update": datetime.utcnow().isoformat() + "Z",
+            "last_update": datetime.now(timezone.utc),
             "eval_score": None,
             "documents": 0,
             "coverage": 0.0,
             "freshness_days": None,
             "avg_response_time": None,
         }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _load_metrics(approx: bool) -> dict[str, Any]:
+    async with aconnect() as conn:
+        # Counts, last CI status and discovery queries in a single round-trip
+        m = await conn.fetchrow(_METRICS_SQL_APPROX if approx else _METRICS_SQL)
+    docs, sources = int(m[0] or 0), int(m[1] or 0)
+    ci = tuple(m[3:8]) if m[2] is not None else None
+    row = (m[8],) if m[8] is not None else None
+    ci_status = None
+    if ci:
+        ci_status = {
+            "overall": float(ci[0]) if ci[0] is not None else None,
+            "exact": float(ci[1]) if ci[1] is not None else None,
+            "groundedness": float(ci[2]) if ci[2] is not None else None,
+            "freshness": float(ci[3]) if ci[3] is not None else None,
+            "updated_at": ci[4],
+        }
+    params = runtime_params()
+    discover_qs = None
+    try:
+        if row and isinstance(row[0], dict):
+            discover_qs = row[0].get("queries")
+    except Exception:
+        discover_qs = None
+    # Keep legacy fields and add UI-friendly fields expected by frontend
+    return {
+        "nb_docs": docs,
+        "nb_sources": sources,
+        "last_update": datetime.now(timezone.utc),
+        "eval_score": None,
+        # UI expected keys
+        "documents": docs,
+        "coverage": 1.0 if sources > 0 else 0.0,
+        "freshness_days": None,
+        "avg_response_time": None,
+        "ci": ci_status,
+        "eval_threshold": params.eval_threshold,
+        "discovery_queries": discover_qs,
+        "retrieval_top_k": params.retrieval_top_k,
+        "confidence_threshold": params.confidence_threshold,
+    }
 
 
 @app.post("/ingest/crawl")
@@ -311,14 +408,19 @@ class EvaluateBody(BaseModel):
     record: bool = True
 
 
+@lru_cache(maxsize=256)
+def _question_tokens(question: str) -> frozenset[str]:
+    # evaluation questions repeat across runs (defaults, CI sets)
+    return frozenset(t for t in question.lower().split() if len(t) > 2)
+
+
 def _evaluate_exact(answer: str, question: str) -> float:
     # naive exactness: proportion of question tokens appearing in answer
-    q_tokens = {t.lower() for t in question.split() if len(t) > 2}
+    q_tokens = _question_tokens(question)
     if not q_tokens:
         return 0.0
-    a_tokens = {t.lower() for t in answer.split()}
-    inter = len(q_tokens.intersection(a_tokens))
-    return round(inter / len(q_tokens), 3)
+    a_tokens = set(answer.lower().split())
+    return round(len(q_tokens & a_tokens) / len(q_tokens), 3)
 
 
 def _evaluate_grounded(citations: list[dict[str, Any]]) -> float:
@@ -328,98 +430,12 @@ def _evaluate_grounded(citations: list[dict[str, Any]]) -> float:
 
 @app.post("/evaluate/run")
 def evaluate_run(body: EvaluateBody):
-    questions = body.questions or [
-        "Qu'est-ce qu'un agent auto-évolutif ?",
-        "Comment fonctionne l'index actuel ?",
-        "Quel est l'objectif du système ?",
-    ]
-    results: list[dict[str, Any]] = []
-    exact_scores: list[float] = []
-    grounded_scores: list[float] = []
-    for q in questions:
-        try:
-            r = search_answer(q)
-            ex = _evaluate_exact(r.get("answer", ""), q)
-            gr = _evaluate_grounded(r.get("citations", []))
-            exact_scores.append(ex)
-            grounded_scores.append(gr)
-            results.append({
-                "question": q,
-                "answer": r.get("answer"),
-                "exact": ex,
-                "grounded": gr,
-                "confidence": r.get("confidence"),
-                "citations": r.get("citations", []),
-            })
-        except Exception as e:  # continue evaluating others
-            results.append({"question": q, "error": str(e), "exact": 0.0, "grounded": 0.0})
-    overall_exact = sum(exact_scores) / max(1, len(exact_scores))
-    overall_grounded = sum(grounded_scores) / max(1, len(grounded_scores))
-    overall = round((overall_exact * 0.6 + overall_grounded * 0.4), 3)
-
-    # Freshness heuristic: compute average age (days) of cited documents and derive a score
-    from datetime import timezone as _tz
-    cited_urls = {c.get("url") for r in results for c in r.get("citations", []) if c.get("url")}
-    avg_freshness_days: float | None = None
-    freshness_score: float | None = None
-    if cited_urls:
-        try:
-            with connect() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT published_at FROM documents WHERE url = ANY(%s);", (list(cited_urls),))
-                    rows = cur.fetchall()
-            now = datetime.now(_tz.utc)
-            ages: list[float] = []
-            for (published_at,) in rows:
-                if published_at:
-                    ages.append((now - published_at).total_seconds() / 86400.0)
-            if ages:
-                avg_freshness_days = sum(ages) / len(ages)
-                if avg_freshness_days <= 7:
-                    freshness_score = 1.0
-                elif avg_freshness_days >= 90:
-                    freshness_score = 0.0
-                else:
-                    freshness_score = max(0.0, min(1.0, 1 - ((avg_freshness_days - 7) / (90 - 7))))
-                freshness_score = round(freshness_score, 3)
-                avg_freshness_days = round(avg_freshness_days, 2)
-        except Exception:
-            pass
-
-    if body.record:
-        try:
-            with connect() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "INSERT INTO ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) VALUES(%s,%s,%s,%s,%s,%s,%s);",
-                        (
-                            overall,
-                            overall_exact,
-                            overall_grounded,
-                            None,
-                            freshness_score,
-                            avg_freshness_days,
-                            psycopg.types.json.Json({"questions": questions}),
-                        ),
-                    )
-                    cur.execute(
-                        "INSERT INTO ci_status(id, overall, exact, groundedness, freshness, updated_at) VALUES(1,%s,%s,%s,%s,NOW()) ON CONFLICT (id) DO UPDATE SET overall=EXCLUDED.overall, exact=EXCLUDED.exact, groundedness=EXCLUDED.groundedness, freshness=EXCLUDED.freshness, updated_at=NOW();",
-                        (overall, overall_exact, overall_grounded, freshness_score),
-                    )
-                conn.commit()
-            log_event("evolve", "Evaluation enregistrée", meta={"overall": overall})
-        except Exception:
-            pass
-
-    return {
-        "status": "ok",
-        "overall": overall,
-        "exact": round(overall_exact, 3),
-        "groundedness": round(overall_grounded, 3),
-        "freshness": freshness_score,
-        "avg_freshness_days": avg_freshness_days,
-        "results": results,
-    }
+    # N questions x (retrieval + LLM) is far too long for a request: run it on a worker
+    try:
+        async_res = task_evaluate.delay(body.questions, body.record)
+        return {"status": "queued", "task_id": async_res.id}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
 
 
 class EvaluateAsyncBody(BaseModel):
@@ -438,7 +454,7 @@ def evaluate_run_async(body: EvaluateAsyncBody | None = None):
 
 # Minimal jobs endpoint(s) for UI compatibility and polling
 @app.get("/jobs")
-def list_jobs(status: str | None = None, type: str | None = None):
+async def list_jobs(status: str | None = None, type: str | None = None):
     # We don't track history yet; return empty list with filters echoed
     return {"items": [], "status": status, "type": type}
 
@@ -467,35 +483,29 @@ class SourceCreate(BaseModel):
 
 
 @app.post("/sources")
-def create_source(body: SourceCreate):
+async def create_source(body: SourceCreate):
     kind = body.type or "html"
     url = body.url
     if not url:
         raise HTTPException(status_code=400, detail="url manquante")
-    with connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO sources(url, kind) VALUES(%s,%s) ON CONFLICT (url) DO NOTHING RETURNING id;",
-                (url, kind),
+    async with aconnect() as conn:
+        async with conn.transaction():
+            row = await conn.fetchrow(
+                "INSERT INTO sources(url, kind) VALUES($1,$2) ON CONFLICT (url) DO NOTHING RETURNING id;",
+                url,
+                kind,
             )
-            row = cur.fetchone()
-        conn.commit()
-    if not row:
-        # Already exists, fetch id
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT id FROM sources WHERE url=%s;", (url,))
-                row = cur.fetchone()
+        if not row:
+            # Already exists, fetch id
+            row = await conn.fetchrow("SELECT id FROM sources WHERE url=$1;", url)
     return {"id": row[0] if row else None}
 
 
 @app.delete("/sources/{source_id}")
-def delete_source_simple(source_id: int):
-    with connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM sources WHERE id=%s;", (source_id,))
-            deleted = cur.rowcount or 0
-        conn.commit()
+async def delete_source_simple(source_id: int):
+    async with aconnect() as conn:
+        status = await conn.execute("DELETE FROM sources WHERE id=$1;", source_id)
+    deleted = int(status.split()[-1]) if status else 0  # command tag "DELETE <n>"
     return {"status": "ok", "deleted": deleted}
 
 
@@ -506,18 +516,18 @@ class IngestRunBody(BaseModel):
 
 
 @app.post("/ingest/run")
-def ingest_run(body: IngestRunBody | None = None):
+def ingest_run(body: IngestRunBody | None = None, snapshot: bool = False):
     created_source_id = None
     try:
-        # Snapshot metrics before
+        # Before/after counts are only taken when the caller asks for the diff (?snapshot=true)
         def _counts():
+            if not snapshot:
+                return None, None
             try:
                 with connect() as conn:
-                    with conn.cursor() as cur:
-                        cur.execute("SELECT COUNT(*) FROM sources;")
-                        s = cur.fetchone()[0]
-                        cur.execute("SELECT COUNT(*) FROM documents;")
-                        d = cur.fetchone()[0]
+                    with conn.cursor(binary=True) as cur:
+                        cur.execute("SELECT (SELECT COUNT(*) FROM sources), (SELECT COUNT(*) FROM documents);")
+                        s, d = cur.fetchone()
                 return int(s), int(d)
             except Exception:
                 return 0, 0
@@ -541,18 +551,15 @@ def ingest_run(body: IngestRunBody | None = None):
                 conn.commit()
             created_source_id = row[0] if row else None
         # Actively discover new sources before crawling (tunable via env)
+        params = runtime_params()
         discovered = 0
         try:
-            per_query = int(os.getenv("DISCOVERY_PER_QUERY", "5"))
-            max_new = int(os.getenv("DISCOVERY_MAX_NEW", "25"))
-            discovered = discover_new_sources(per_query=per_query, max_new=max_new)
+            discovered = discover_new_sources(per_query=params.discovery_per_query, max_new=params.discovery_max_new)
         except Exception:
             discovered = 0
         # Crawl more aggressively to reflect discovery
-        crawl_limit = int(os.getenv("CRAWLER_RUN_ONCE_LIMIT", "50"))
-        index_batch = int(os.getenv("INDEX_RUN_ONCE_BATCH", "50"))
-        ins = crawl_sources(limit=crawl_limit)
-        idx = index_unembedded(batch_size=index_batch)
+        ins = crawl_sources(limit=params.crawl_run_once_limit)
+        idx = index_unembedded(batch_size=params.index_run_once_batch)
 
         sources_after, docs_after = _counts()
         return {
@@ -561,7 +568,7 @@ def ingest_run(body: IngestRunBody | None = None):
             "indexed": idx,
             "created_source_id": created_source_id,
             "discovered": discovered,
-            "new_sources_added": max(0, sources_after - sources_before),
+            "new_sources_added": max(0, sources_after - sources_before) if snapshot else None,
             "docs_before": docs_before,
             "docs_after": docs_after,
             "sources_before": sources_before,
@@ -576,34 +583,125 @@ def ingest_run(body: IngestRunBody | None = None):
 def ingest_run_async():
     """Trigger background discovery+crawl+index and return a task id immediately."""
     try:
-        per_query = int(os.getenv("DISCOVERY_PER_QUERY", "5"))
-        max_new = int(os.getenv("DISCOVERY_MAX_NEW", "25"))
-        crawl_limit = int(os.getenv("CRAWLER_RUN_ONCE_LIMIT", "50"))
-        index_batch = int(os.getenv("INDEX_RUN_ONCE_BATCH", "50"))
-        async_res = task_run_once.delay(per_query=per_query, max_new=max_new, crawl_limit=crawl_limit, index_batch=index_batch)
+        params = runtime_params()
+        async_res = task_run_once.delay(
+            per_query=params.discovery_per_query,
+            max_new=params.discovery_max_new,
+            crawl_limit=params.crawl_run_once_limit,
+            index_batch=params.index_run_once_batch,
+        )
         return {"status": "ok", "task_id": async_res.id}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
 @app.get("/events")
-def get_events(limit: int = 100):
+async def get_events(limit: int = 100, after_id: int | None = None):
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT ts, stage, level, message, meta FROM live_events ORDER BY id DESC LIMIT %s;",
-                    (limit,),
+        async with aconnect() as conn:
+            if after_id is not None:
+                rows = await conn.fetch(
+                    "SELECT id, ts, stage, level, message, COALESCE(meta, '{}'::jsonb) AS meta FROM live_events WHERE id < $1 ORDER BY id DESC LIMIT $2;",
+                    after_id,
+                    limit,
                 )
-                rows = cur.fetchall()
-        return {
-            "items": [
-                {"ts": r[0].isoformat(), "stage": r[1], "level": r[2], "message": r[3], "meta": (r[4] or {})}
-                for r in rows
-            ]
-        }
+            else:
+                rows = await conn.fetch(
+                    "SELECT id, ts, stage, level, message, COALESCE(meta, '{}'::jsonb) AS meta FROM live_events ORDER BY id DESC LIMIT $1;",
+                    limit,
+                )
+        # Bulk payload: skip jsonable_encoder and serialize straight with orjson
+        return ORJSONResponse(
+            content={
+                "items": [dict(r) for r in rows],
+                "next_cursor": rows[-1]["id"] if len(rows) == limit else None,
+            }
+        )
     except Exception as e:
-        return {"items": [], "error": str(e)}
+        return ORJSONResponse(content={"items": [], "error": str(e)})
+
+
+# /events/stream: one LISTEN connection per process wakes every SSE client when
+# log_event flushes; each client then reads only the rows after its last id.
+_SSE_KEEPALIVE = 15.0
+_SSE_BATCH = 500
+_event_waiters: set[asyncio.Event] = set()
+_events_listener: Any = None
+_events_listener_lock = asyncio.Lock()
+
+
+def _wake_event_streams(*_: Any) -> None:
+    for waiter in list(_event_waiters):
+        waiter.set()
+
+
+async def _ensure_events_listener() -> bool:
+    global _events_listener
+    if _events_listener is not None and not _events_listener.is_closed():
+        return True
+    async with _events_listener_lock:
+        if _events_listener is None or _events_listener.is_closed():
+            try:
+                _events_listener = await listen_events(_wake_event_streams)
+            except Exception:
+                _events_listener = None
+                return False
+    return True
+
+
+async def _close_events_listener() -> None:
+    global _events_listener
+    conn, _events_listener = _events_listener, None
+    if conn is not None:
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+
+@app.get("/events/stream")
+async def events_stream(request: Request, after_id: int | None = None):
+    """Server-sent events feed of live_events (GET /events polling still works)."""
+    last_event_id = request.headers.get("last-event-id") or ""
+    if after_id is None and last_event_id.isdigit():
+        after_id = int(last_event_id)  # EventSource reconnect resumes where it stopped
+    wake = asyncio.Event()
+
+    async def _stream():
+        last_id = after_id
+        _event_waiters.add(wake)
+        try:
+            if last_id is None:
+                async with aconnect() as conn:
+                    last_id = await conn.fetchval("SELECT COALESCE(MAX(id), 0) FROM live_events;")
+            while not await request.is_disconnected():
+                listening = await _ensure_events_listener()
+                wake.clear()
+                async with aconnect() as conn:
+                    rows = await conn.fetch(
+                        "SELECT id, ts, stage, level, message, COALESCE(meta, '{}'::jsonb) AS meta FROM live_events "
+                        "WHERE id > $1 ORDER BY id ASC LIMIT $2;",
+                        last_id,
+                        _SSE_BATCH,
+                    )
+                for r in rows:
+                    last_id = r["id"]
+                    yield b"id: %d\ndata: %s\n\n" % (last_id, orjson.dumps(dict(r), option=orjson.OPT_NAIVE_UTC))
+                if len(rows) == _SSE_BATCH:
+                    continue
+                try:
+                    # Without a listener (LISTEN failed) fall back to a short poll
+                    await asyncio.wait_for(wake.wait(), timeout=_SSE_KEEPALIVE if listening else 2.0)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            _event_waiters.discard(wake)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 class EventIn(BaseModel):
@@ -617,7 +715,7 @@ class EventIn(BaseModel):
 @app.post("/events")
 def post_event(body: EventIn):
     # Simple token-based auth to allow CI to push events
-    expected = os.getenv("EVENTS_API_TOKEN", "")
+    expected = runtime_params().events_api_token
     if not expected:
         # If no token configured on server, reject to avoid abuse
         raise HTTPException(status_code=403, detail="events disabled")
@@ -653,37 +751,40 @@ def post_event(body: EventIn):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@asynccontextmanager
+async def _github_client():
+    """Yield the app-wide httpx client, or a short-lived one outside the lifespan."""
+    client = getattr(app.state, "http", None)
+    if client is not None and not client.is_closed:
+        yield client
+        return
+    async with httpx.AsyncClient(timeout=15, headers=_GITHUB_HEADERS) as client:
+        yield client
+
+
 @app.post("/evolve/run")
-def evolve_run():
-    import os as _os
-    import requests as _requests
-    try:
-        # Trim to avoid hidden spaces/newlines causing 404 on workflow dispatch
-        token = (_os.getenv("GITHUB_TOKEN") or _os.getenv("GH_TOKEN") or "").strip()
-        repo = (_os.getenv("GITHUB_REPOSITORY") or "").strip()
-        ref = (_os.getenv("GITHUB_REF", "main") or "main").strip()
+async def evolve_run():
+    try:
+        params = runtime_params()
+        token, repo, ref = params.github_token, params.github_repo, params.github_ref
         if not token or not repo:
             msg = "GITHUB_TOKEN et GITHUB_REPOSITORY requis dans l'environnement pour déclencher la CI."
             log_event("evolve", msg, level="warn")
             return {"status": "error", "error": msg}
-        # Optionally verify workflow exists before dispatch to give clearer 404 cause
-        try:
-            wfs = _requests.get(f"https://api.github.com/repos/{repo}/actions/workflows", headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/vnd.github+json",
-            }, timeout=10)
-            if wfs.status_code == 200:
-                names = [wf.get("path") for wf in wfs.json().get("workflows", [])]
-                if ".github/workflows/auto-evolve.yml" not in names:
-                    log_event("evolve", "Workflow auto-evolve.yml introuvable (liste workflows)", level="error", meta={"paths": names})
-                    return {"status": "error", "code": 404, "hint": "Workflow auto-evolve.yml absent dans la branche ref", "workflows": names}
-        except Exception:
-            pass
-        url = f"https://api.github.com/repos/{repo}/actions/workflows/auto-evolve.yml/dispatches"
-        r = _requests.post(url, headers={
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github+json",
-        }, json={"ref": ref})
+        auth = {"Authorization": f"Bearer {token}"}
+        async with _github_client() as http:
+            # Optionally verify workflow exists before dispatch to give clearer 404 cause
+            try:
+                wfs = await http.get(f"https://api.github.com/repos/{repo}/actions/workflows", headers=auth, timeout=10)
+                if wfs.status_code == 200:
+                    names = [wf.get("path") for wf in wfs.json().get("workflows", [])]
+                    if ".github/workflows/auto-evolve.yml" not in names:
+                        log_event("evolve", "Workflow auto-evolve.yml introuvable (liste workflows)", level="error", meta={"paths": names})
+                        return {"status": "error", "code": 404, "hint": "Workflow auto-evolve.yml absent dans la branche ref", "workflows": names}
+            except Exception:
+                pass
+            url = f"https://api.github.com/repos/{repo}/actions/workflows/auto-evolve.yml/dispatches"
+            r = await http.post(url, headers=auth, json={"ref": ref})
         if r.status_code in (204, 201):
             log_event("evolve", "Workflow auto-evolve déclenché", meta={"repo": repo, "ref": ref})
             return {"status": "ok"}
@@ -716,18 +817,14 @@ def evolve_run():
 
 
 @app.get("/evolve/workflows")
-def evolve_list_workflows():
-    import os as _os
-    token = (_os.getenv("GITHUB_TOKEN") or _os.getenv("GH_TOKEN") or "").strip()
-    repo = (_os.getenv("GITHUB_REPOSITORY") or "").strip()
+async def evolve_list_workflows():
+    token, repo = runtime_params().github_token, runtime_params().github_repo
     if not token or not repo:
         return {"status": "error", "error": "GITHUB_TOKEN ou GITHUB_REPOSITORY manquant"}
     url = f"https://api.github.com/repos/{repo}/actions/workflows"
     try:
-        r = _requests_diag.get(url, headers={
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github+json",
-        }, timeout=15)
+        async with _github_client() as http:
+            r = await http.get(url, headers={"Authorization": f"Bearer {token}"})
         data = {}
         try:
             data = r.json()
@@ -750,60 +847,86 @@ def evolve_list_workflows():
 
 
 @app.post("/metrics/record")
-def metrics_record(payload: dict):
+async def metrics_record(payload: dict):
     """Record a CI/evaluation run. Expected fields: overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta"""
+    try:
+        async with aconnect() as conn:
+            # Single statement: implicit transaction, no BEGIN/COMMIT round-trips
+            await conn.execute(
+                "INSERT INTO ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) VALUES($1,$2,$3,$4,$5,$6,$7);",
+                payload.get("overall"),
+                payload.get("exact"),
+                payload.get("groundedness"),
+                payload.get("semantic_f1"),
+                payload.get("freshness"),
+                payload.get("avg_freshness_days"),
+                payload.get("meta") or {},
+            )
+        return {"status": "ok"}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+@app.post("/metrics/record_bulk")
+def metrics_record_bulk(payload: List[dict]):
+    """Record several CI/evaluation runs at once (same fields as /metrics/record) with COPY."""
     try:
         with connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) VALUES(%s,%s,%s,%s,%s,%s,%s);",
-                    (
-                        payload.get("overall"),
-                        payload.get("exact"),
-                        payload.get("groundedness"),
-                        payload.get("semantic_f1"),
-                        payload.get("freshness"),
-                        payload.get("avg_freshness_days"),
-                        _requests_diag.types.json.Json(payload.get("meta") or {}),
-                    ),
-                )
+                with cur.copy(
+                    "COPY ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) FROM STDIN"
+                ) as cp:
+                    for p in payload:
+                        cp.write_row((
+                            p.get("overall"),
+                            p.get("exact"),
+                            p.get("groundedness"),
+                            p.get("semantic_f1"),
+                            p.get("freshness"),
+                            p.get("avg_freshness_days"),
+                            psycopg.types.json.Json(p.get("meta") or {}),
+                        ))
             conn.commit()
-        return {"status": "ok"}
+        return {"status": "ok", "recorded": len(payload)}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
 @app.get("/metrics/history")
-def metrics_history(limit: Optional[int] = 50, offset: int = 0):
+async def metrics_history(
+    request: Request = None,  # type: ignore[assignment]  # None when forwarded from server.py
+    limit: Optional[int] = 50,
+    offset: int = 0,
+    after_id: int | None = None,
+):
     try:
         limit = int(limit or 50)
         offset = int(offset or 0)
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM ci_history;")
-                total = cur.fetchone()[0]
-                cur.execute(
-                    "SELECT id, ts, overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta FROM ci_history ORDER BY ts DESC LIMIT %s OFFSET %s;",
-                    (limit, offset),
+        # Same total policy as /docs: estimated on keyset pages, exact with offset
+        async with aconnect() as conn:
+            if after_id is not None:
+                total = await conn.fetchval(_approx_count_sql("ci_history"))
+                # (ts, id) row comparison: ts alone is not unique
+                rows = await conn.fetch(
+                    "SELECT id, ts, overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta FROM ci_history "
+                    "WHERE (ts, id) < (SELECT ts, id FROM ci_history WHERE id = $1) ORDER BY ts DESC, id DESC LIMIT $2;",
+                    int(after_id),
+                    limit,
                 )
-                rows = cur.fetchall()
-        items = [
-            {
-                "id": r[0],
-                "ts": r[1].isoformat() if r[1] else None,
-                "overall": r[2],
-                "exact": r[3],
-                "groundedness": r[4],
-                "semantic_f1": r[5],
-                "freshness": r[6],
-                "avg_freshness_days": r[7],
-                "meta": r[8],
-            }
-            for r in rows
-        ]
-        return {"items": items, "total": total, "limit": limit, "offset": offset}
+            else:
+                total = await conn.fetchval("SELECT COUNT(*) FROM ci_history;")
+                rows = await conn.fetch(
+                    "SELECT id, ts, overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta FROM ci_history ORDER BY ts DESC, id DESC LIMIT $1 OFFSET $2;",
+                    limit,
+                    offset,
+                )
+        items = [dict(r) for r in rows]
+        next_cursor = rows[-1]["id"] if len(rows) == limit else None
+        return _cacheable_json(
+            request, {"items": items, "total": total, "limit": limit, "offset": offset, "next_cursor": next_cursor}
+        )
     except Exception as e:
-        return {"items": [], "error": str(e), "total": 0, "limit": limit, "offset": offset}
+        return ORJSONResponse(content={"items": [], "error": str(e), "total": 0, "limit": limit, "offset": offset})
 
 
 @app.post("/index/build")
@@ -816,13 +939,13 @@ def index_build():
 
 
 @app.post("/evolve/seed_from_docs")
-def evolve_seed_from_docs(limit: int = 200, trigger_ci: bool = False):
+async def evolve_seed_from_docs(limit: int = 200, trigger_ci: bool = False):
     try:
-        out = seed_from_docs(limit=limit)
+        out = await run_in_threadpool(seed_from_docs, limit=limit)
         # Optionally trigger CI evolve workflow so PR includes updated topics/issues
         if trigger_ci:
             try:
-                _ = evolve_run()  # reuse handler to trigger workflow and log events
+                _ = await evolve_run()  # reuse handler to trigger workflow and log events
                 out["workflow_triggered"] = True
             except Exception:
                 out["workflow_triggered"] = False
@@ -837,7 +960,7 @@ class IndexActivateBody(BaseModel):
 
 
 @app.post("/index/activate")
-def index_activate(body: IndexActivateBody):
+async def index_activate(body: IndexActivateBody):
     # Placeholder: no versioning implemented yet
     return {"status": "ok", "index_version_id": body.index_version_id}
 
@@ -847,9 +970,6 @@ def index_versions():
     return {"items": []}
 
 
-## Duplicate placeholder /evaluate/run endpoint removed.
-
-
 @app.get("/evaluate/recent")
 def evaluate_recent(limit: int = 5):
     return {"items": []}
@@ -861,15 +981,24 @@ class SettingIn(BaseModel):
     value: dict | list | str | int | float | None
 
 
+# Admin UI polls /admin/settings; the rendered response is cached in Redis until the next upsert
+_SETTINGS_CACHE_KEY = "admin:settings"
+_SETTINGS_CACHE_TTL = 30
+_redis = aioredis.Redis.from_url(redis_url, decode_responses=True, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+
 @app.get("/admin/settings")
-def get_settings():
+async def get_settings():
     try:
-        out: dict[str, Any] = {}
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT key, value FROM settings;")
-                for k, v in cur.fetchall():
-                    out[k] = v
+        cached = await _redis.get(_SETTINGS_CACHE_KEY)
+        if cached:
+            return orjson.loads(cached)
+    except Exception:
+        pass  # Redis unavailable: serve from the DB
+    try:
+        async with aconnect() as conn:
+            rows = await conn.fetch("SELECT key, value FROM settings;")
+        out: dict[str, Any] = {r["key"]: r["value"] for r in rows}
         # Provide env fallback preview for known toggles if not in DB
         if "EVENTS_VERBOSE" not in out:
             out["EVENTS_VERBOSE"] = os.getenv("EVENTS_VERBOSE", "0")
@@ -882,58 +1011,109 @@ def get_settings():
             out["LIVE_SEARCH_MODE"] = os.getenv("LIVE_SEARCH_MODE", "low")
         if "LIVE_SEARCH_MAX_RESULTS" not in out:
             out["LIVE_SEARCH_MAX_RESULTS"] = os.getenv("LIVE_SEARCH_MAX_RESULTS", "3")
+        try:
+            await _redis.setex(_SETTINGS_CACHE_KEY, _SETTINGS_CACHE_TTL, orjson.dumps({"items": out}))
+        except Exception:
+            pass
         return {"items": out}
     except Exception as e:
         return {"items": {}, "error": str(e)}
 
 
 @app.post("/admin/settings")
-def upsert_setting(body: SettingIn):
+async def upsert_setting(body: SettingIn):
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO settings(key, value, updated_at) VALUES(%s, %s, NOW()) "
-                    "ON CONFLICT (key) DO UPDATE SET value=EXCLUDED.value, updated_at=NOW();",
-                    (body.key, body.value),
-                )
-            conn.commit()
+        async with aconnect() as conn:
+            await conn.execute(
+                "INSERT INTO settings(key, value, updated_at) VALUES($1, $2, NOW()) "
+                "ON CONFLICT (key) DO UPDATE SET value=EXCLUDED.value, updated_at=NOW();",
+                body.key,
+                body.value,
+            )
+        try:
+            await _redis.delete(_SETTINGS_CACHE_KEY)
+        except Exception:
+            pass
         return {"status": "ok"}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+@app.post("/admin/reload_env")
+def reload_env():
+    """Re-read env-derived runtime parameters (they are otherwise parsed once per process)."""
+    runtime_params.cache_clear()
+    _metrics_cache.clear()
+    return {"status": "ok"}
+
+
 # Evaluator: provide helper to get publish dates for URLs to compute freshness
 @app.post("/evaluator/publish_dates")
-def evaluator_publish_dates(urls: List[str]):
+async def evaluator_publish_dates(urls: List[str]):
     try:
-        results: dict[str, str | None] = {}
-        with connect() as conn:
-            with conn.cursor() as cur:
-                for u in urls:
-                    cur.execute("SELECT published_at FROM documents WHERE url=%s;", (u,))
-                    row = cur.fetchone()
-                    results[u] = row[0].isoformat() if row and row[0] else None
+        # Publish dates are stable once crawled: serve them from a Redis hash
+        # (invalidated by task_crawl_url) and only query Postgres for misses
+        found: dict[str, str | None] = {}
+        missing = list(urls)
+        try:
+            if urls:
+                cached = await _redis.hmget(PUB_DATES_KEY, urls)
+                found = {u: v for u, v in zip(urls, cached) if v}
+                missing = [u for u in urls if u not in found]
+        except Exception:
+            pass  # Redis unavailable: everything goes to the DB
+        if missing:
+            async with aconnect() as conn:
+                # One round-trip for all URLs (documents.url is UNIQUE, hence indexed)
+                rows = await conn.fetch("SELECT url, published_at FROM documents WHERE url = ANY($1::text[]);", missing)
+            fresh = {u: p.isoformat() for u, p in rows if p}
+            found.update(fresh)
+            if fresh:
+                try:
+                    await _redis.hset(PUB_DATES_KEY, mapping=fresh)
+                except Exception:
+                    pass
+        results: dict[str, str | None] = {u: found.get(u) for u in urls}
         return {"items": results}
     except Exception as e:
         return {"items": {}, "error": str(e)}
 
 
+def _new_probe_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=10,
+        follow_redirects=True,
+        headers={"User-Agent": "connectivity-check/1.0"},
+        transport=httpx.AsyncHTTPTransport(
+            retries=2, limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+        ),
+    )
+
+
+@asynccontextmanager
+async def _probe_client():
+    """Yield the app-wide source-probe client, or a short-lived one outside the lifespan."""
+    client = getattr(app.state, "probe_http", None)
+    if client is not None and not client.is_closed:
+        yield client
+        return
+    async with _new_probe_client() as client:
+        yield client
+
+
 @app.post("/sources/{source_id}/test")
-def source_test_connectivity(source_id: int):
+async def source_test_connectivity(source_id: int):
     url = None
     try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT url FROM sources WHERE id=%s;", (source_id,))
-                row = cur.fetchone()
-        url = row[0] if row else None
+        async with aconnect() as conn:
+            url = await conn.fetchval("SELECT url FROM sources WHERE id=$1;", source_id)
     except Exception:
         url = None
     if not url:
         raise HTTPException(status_code=404, detail="source introuvable")
     try:
-        r = requests.get(url, timeout=10, headers={"User-Agent": "connectivity-check/1.0"})
-        return {"ok": bool(r.ok), "status": r.status_code}
+        async with _probe_client() as cli:
+            r = await cli.get(url)
+        return {"ok": r.is_success, "status": r.status_code}
     except Exception as e:
         return {"ok": False, "message": str(e)}
@@ -0,0 +1,193 @@
+"""One-shot schema migrations that are too slow for the boot path.
+
+Building an HNSW index over millions of rows can take minutes to hours, so it
+is not done by `init_db` (which runs during app startup). Run this module as a
+job instead:
+
+    python -m backend.app.migrate
+
+It converts a pre-halfvec `embedding` column (a full table rewrite, which
+`init_db` refuses to do at boot), ensures the base schema via `init_db`, adds
+the indexed-implies-embedding CHECK without holding ACCESS EXCLUSIVE through
+its validation scan, swaps the UNIQUE constraint on `documents.hash` for a
+hash index, then builds the vector index. Indexes are built with
+`CREATE INDEX CONCURRENTLY` so writes to `documents` keep flowing meanwhile.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import psycopg
+
+from .db import get_direct_db_url, init_db, log_event
+
+EMBEDDING_DIM = 3072
+_VECTOR_INDEX_NAMES = ("documents_embedding_hnsw_idx", "documents_embedding_ivfflat_idx")
+
+
+def _hnsw_build_params(row_count: int) -> tuple[int, int]:
+    """Pick HNSW (m, ef_construction) for the current table size."""
+    if row_count < 100_000:
+        return 16, 64
+    if row_count < 1_000_000:
+        return 24, 100
+    return 32, 128
+
+
+def _index_state(cur: psycopg.Cursor, name: str) -> Optional[bool]:  # type: ignore
+    """Return None if the index is missing, else whether it is valid."""
+    cur.execute(
+        "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = %s;",
+        (name,),
+    )
+    row = cur.fetchone()
+    return None if row is None else bool(row[0])
+
+
+def convert_embedding_to_halfvec() -> bool:
+    """Rewrite a legacy vector(3072) `embedding` column as halfvec(3072); return whether it ran.
+
+    Takes ACCESS EXCLUSIVE on `documents` for the whole rewrite. Errors propagate:
+    the app binds HalfVector everywhere, so a half-migrated database must not pass.
+    """
+    with psycopg.connect(get_direct_db_url()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass('documents') AND attname = 'embedding' "
+                "AND atttypid = to_regtype('vector');"
+            )
+            if cur.fetchone() is None:
+                return False
+            cur.execute(
+                "ALTER TABLE documents ALTER COLUMN embedding TYPE halfvec(3072) USING embedding::halfvec(3072);"
+            )
+    log_event("migrate", "documents.embedding converted to halfvec(3072)")
+    return True
+
+
+def ensure_indexed_constraint() -> bool:
+    """Enforce "indexed implies embedding" on documents; return whether anything ran.
+
+    The indexer selects its backlog with `indexed = FALSE` alone, which is only
+    correct once no row is indexed without an embedding. Added NOT VALID and
+    committed before VALIDATE, so the ACCESS EXCLUSIVE lock of the ADD is
+    released before the (SHARE UPDATE EXCLUSIVE) validation scan.
+    """
+    with psycopg.connect(get_direct_db_url(), autocommit=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT convalidated FROM pg_constraint "
+                "WHERE conrelid = 'documents'::regclass AND conname = 'documents_indexed_implies_embedding';"
+            )
+            row = cur.fetchone()
+            if row is not None and row[0]:
+                return False
+            if row is None:
+                with conn.transaction():
+                    cur.execute("UPDATE documents SET indexed = FALSE WHERE indexed AND embedding IS NULL;")
+                    cur.execute(
+                        "ALTER TABLE documents ADD CONSTRAINT documents_indexed_implies_embedding "
+                        "CHECK (NOT indexed OR embedding IS NOT NULL) NOT VALID;"
+                    )
+            # A NOT VALID leftover from an interrupted run only needs this step
+            cur.execute("ALTER TABLE documents VALIDATE CONSTRAINT documents_indexed_implies_embedding;")
+    log_event("migrate", "documents_indexed_implies_embedding validated")
+    return True
+
+
+def ensure_hash_index() -> bool:
+    """Index documents.hash for lookups and drop its legacy UNIQUE constraint; return whether anything ran.
+
+    Content hash is a lookup key, not a uniqueness guarantee (url already is);
+    a non-unique hash index keeps bulk ingest free of uniqueness checks. The
+    index is built CONCURRENTLY before the constraint (and its btree) goes, so
+    hash lookups never lose their index; the DROP takes ACCESS EXCLUSIVE only
+    when the constraint is actually there.
+    """
+    ran = False
+    with psycopg.connect(get_direct_db_url(), autocommit=True) as conn:
+        with conn.cursor() as cur:
+            state = _index_state(cur, "documents_hash_idx")
+            if state is not True:
+                if state is False:
+                    cur.execute("DROP INDEX CONCURRENTLY IF EXISTS documents_hash_idx;")
+                cur.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_hash_idx ON documents USING hash (hash);")
+                ran = True
+            cur.execute(
+                "SELECT 1 FROM pg_constraint WHERE conrelid = 'documents'::regclass AND conname = 'documents_hash_key';"
+            )
+            if cur.fetchone() is not None:
+                cur.execute("ALTER TABLE documents DROP CONSTRAINT documents_hash_key;")
+                ran = True
+    if ran:
+        log_event("migrate", "documents_hash_idx ready")
+    return ran
+
+
+def ensure_vector_index() -> Optional[str]:
+    """Create the embedding ANN index if missing; return its name (or None if skipped).
+
+    IVFFlat/HNSW on `vector` stop at 2000 dims, so 3072-dim embeddings are stored
+    as halfvec and indexed with HNSW. Uses its own autocommit connection because
+    CONCURRENTLY cannot run inside a transaction block.
+    """
+    index_method = (os.getenv("VECTOR_INDEX_METHOD") or "auto").lower()
+    use_hnsw = index_method == "hnsw" or (index_method == "auto" and EMBEDDING_DIM > 2000)
+    use_ivfflat = not use_hnsw and index_method in ("ivfflat", "auto") and EMBEDDING_DIM <= 2000
+    if not (use_hnsw or use_ivfflat):
+        return None
+    with psycopg.connect(get_direct_db_url(), autocommit=True) as conn:
+        with conn.cursor() as cur:
+            for name in _VECTOR_INDEX_NAMES:
+                state = _index_state(cur, name)
+                if state is True:
+                    return name
+                if state is False:
+                    # Leftover from an interrupted concurrent build; rebuild it
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+            if use_hnsw:
+                cur.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'documents';")
+                row = cur.fetchone()
+                m, ef_construction = _hnsw_build_params(int(row[0]) if row and row[0] else 0)
+                # Build-time knobs; this connection is dedicated to the migration
+                cur.execute(
+                    "SELECT set_config('maintenance_work_mem', %s, false), "
+                    "set_config('max_parallel_maintenance_workers', %s, false);",
+                    (
+                        os.getenv("VECTOR_INDEX_MAINTENANCE_WORK_MEM", "2GB"),
+                        os.getenv("VECTOR_INDEX_PARALLEL_WORKERS", "7"),
+                    ),
+                )
+                name = "documents_embedding_hnsw_idx"
+                cur.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON documents "
+                    f"USING hnsw (embedding halfvec_cosine_ops) WITH (m={m}, ef_construction={ef_construction});"
+                )
+            else:
+                name = "documents_embedding_ivfflat_idx"
+                cur.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON documents "
+                    "USING ivfflat (embedding halfvec_cosine_ops) WITH (lists=100);"
+                )
+    log_event("migrate", "Vector index ready", meta={"index": name})
+    return name
+
+
+def main() -> int:
+    # Before init_db, which refuses to run against the legacy column type
+    if convert_embedding_to_halfvec():
+        print("[migrate] documents.embedding converted to halfvec(3072)")
+    init_db()
+    if ensure_indexed_constraint():
+        print("[migrate] documents_indexed_implies_embedding validated")
+    if ensure_hash_index():
+        print("[migrate] documents_hash_idx ready")
+    name = ensure_vector_index()
+    print(f"[migrate] vector index: {name or 'skipped'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
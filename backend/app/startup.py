@@ -1,3 +1,12 @@
+"""Startup helpers run from the FastAPI lifespan.
+
+Connection topology: backend and worker reach Postgres through PgBouncer in
+transaction pooling mode (docker-compose `pgbouncer` service, DB_PGBOUNCER=1),
+so bursts from Celery beat tasks and API workers share a few server backends.
+Session-scoped features go straight to Postgres via DATABASE_DIRECT_URL:
+LISTEN for /events/stream and the `migrate` job (CREATE INDEX CONCURRENTLY).
+"""
+
 from __future__ import annotations
 
 from .db import connect, log_event
@@ -18,16 +27,12 @@ def seed_sources_if_empty() -> int:
                 count = cur.fetchone()[0]
                 if count and count > 0:
                     return 0
-                inserted = 0
-                for url, kind in SEED_SOURCES:
-                    try:
-                        cur.execute(
-                            "INSERT INTO sources(url, kind) VALUES(%s,%s) ON CONFLICT (url) DO NOTHING;",
-                            (url, kind),
-                        )
-                        inserted += cur.rowcount or 0
-                    except Exception:
-                        pass
+                # Pipelined executemany: one round-trip for the whole list; ON CONFLICT absorbs dupes
+                cur.executemany(
+                    "INSERT INTO sources(url, kind) VALUES(%s,%s) ON CONFLICT (url) DO NOTHING;",
+                    SEED_SOURCES,
+                )
+                inserted = cur.rowcount or 0
             conn.commit()
         if inserted:
             log_event("seed", "Seed sources inserted", meta={"count": inserted})
@@ -1,16 +1,36 @@
+"""Celery tasks for the ingestion, indexing and evaluation pipelines.
+
+All tasks are routed to the default ``celery`` queue; run workers with
+``-c 8 --prefetch-multiplier=1`` so long crawls do not hoard queued work.
+`task_crawl_once` enqueues one ``task_crawl_url`` per pending source (a plain
+group, capped by ``CRAWL_FANOUT_MAX``). `task_run_once` fans out as a chord:
+``task_discover_new`` and the per-source ``task_crawl_url`` tasks run in
+parallel and ``task_index_unembedded`` runs once all of them return. Chords
+need the Redis result backend configured below.
+"""
+
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
-from celery import Celery
+import time
+import redis
+from celery import Celery, chain, chord, group
+from celery.signals import worker_process_init
 
-from crawler.run import crawl_sources, discover_new_sources
+from core.crawler import fetch_and_extract
+from crawler.run import discover_new_sources
 from .indexer import index_unembedded
-from .db import log_event, connect
+from .db import discard_pool_after_fork, log_event, connect
 from .evolve import seed_from_docs
 import subprocess
-import json
+import sys
+import orjson
+from psycopg.types.json import Json
 import os as _os
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -24,13 +44,114 @@ redis_url = _get_env("REDIS_URL", "redis://localhost:6379/0")
 
 celery_app = Celery("auto_evolve", broker=redis_url, backend=redis_url)
 
+# Redis hash url -> ISO publish date served by /evaluator/publish_dates; entries
+# are dropped when a URL is re-crawled
+PUB_DATES_KEY = "pub_dates"
+_redis_client: redis.Redis | None = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+    return _redis_client
+
+
+@worker_process_init.connect
+def _init_worker_process(**_: Any) -> None:
+    # Prefork children get their own DB pool instead of the parent's sockets
+    discard_pool_after_fork()
+
+
+# Upper bound on crawl tasks enqueued per scheduler tick; keep it near the total
+# worker concurrency so the broker queue cannot grow without bound
+CRAWL_FANOUT_MAX = int(_get_env("CRAWL_FANOUT_MAX", "16"))
+
+
+def _select_pending_sources(limit: int) -> list[tuple[str, str]]:
+    """Sources never crawled first, then those whose document is the oldest."""
+    limit = max(0, min(int(limit), CRAWL_FANOUT_MAX))
+    if not limit:
+        return []
+    try:
+        with connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT s.url, s.kind FROM sources s LEFT JOIN documents d ON d.url = s.url "
+                    "ORDER BY d.created_at ASC NULLS FIRST, s.id ASC LIMIT %s;",
+                    (limit,),
+                )
+                return [(str(u), str(k)) for u, k in cur.fetchall()]
+    except Exception:
+        return []
+
+
+# In-flight marker per URL (Redis SET NX with expiry): concurrent tasks for the
+# same source skip it without holding a DB connection across the HTTP fetch
+CRAWL_INFLIGHT_PREFIX = "crawl:inflight:"
+CRAWL_INFLIGHT_TTL = int(_get_env("CRAWL_INFLIGHT_TTL", "300"))
+
+
+def _claim_crawl(url: str) -> bool:
+    """False if another worker is already crawling `url`; True (proceed) if Redis is unreachable."""
+    try:
+        return bool(_get_redis().set(CRAWL_INFLIGHT_PREFIX + url, 1, nx=True, ex=CRAWL_INFLIGHT_TTL))
+    except Exception:
+        # The upsert below is idempotent, so a duplicate crawl only wastes a fetch
+        return True
+
+
+def _release_crawl(url: str) -> None:
+    try:
+        _get_redis().delete(CRAWL_INFLIGHT_PREFIX + url)
+    except Exception:
+        pass
+
+
+@celery_app.task(name="backend.app.tasks.task_crawl_url")
+def task_crawl_url(url: str, kind: str = "html") -> int:
+    """Fetch one source and upsert it into `documents`; return 1 if content changed."""
+    if not _claim_crawl(url):
+        return 0  # another worker is already crawling this URL
+    try:
+        # Network fetch first: no pooled connection sits idle in transaction meanwhile
+        res = fetch_and_extract(url, persist=False)
+        if not res.content:
+            return 0
+        digest = hashlib.sha256(res.content.encode("utf-8")).hexdigest()
+        with connect() as conn:
+            with conn.cursor() as cur:
+                # Unchanged content is a no-op, so a duplicate crawl cannot clobber anything
+                cur.execute(
+                    "INSERT INTO documents(url, title, content, hash) VALUES(%s, %s, %s, %s) "
+                    "ON CONFLICT (url) DO UPDATE SET title=EXCLUDED.title, content=EXCLUDED.content, "
+                    "hash=EXCLUDED.hash, created_at=NOW(), embedding=NULL, indexed=FALSE "
+                    "WHERE documents.hash IS DISTINCT FROM EXCLUDED.hash;",
+                    (url, res.title, res.content, digest),
+                )
+                changed = cur.rowcount or 0
+            conn.commit()
+        if changed:
+            try:
+                _get_redis().hdel(PUB_DATES_KEY, url)
+            except Exception:
+                pass
+        return int(changed)
+    except Exception as e:
+        log_event("crawl", "Crawl failed", level="warn", meta={"url": url, "kind": kind, "error": str(e)})
+        return 0
+    finally:
+        _release_crawl(url)
+
 
 @celery_app.task
 def task_crawl_once(limit: int = 10) -> int:
-    log_event("crawl", "Periodic crawl start", meta={"limit": limit})
-    n = crawl_sources(limit=limit)
-    log_event("crawl", "Periodic crawl done", meta={"inserted": n})
-    return n
+    """Enqueue one `task_crawl_url` per pending source and return how many were queued."""
+    sources = _select_pending_sources(limit)
+    if sources:
+        group(task_crawl_url.s(u, k) for u, k in sources).apply_async()
+    log_event("crawl", "Periodic crawl queued", meta={"limit": limit, "queued": len(sources)})
+    return len(sources)
 
 
 @celery_app.task
@@ -49,10 +170,15 @@ def task_index_once(batch_size: int = 10) -> int:
 
 @celery_app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):  # type: ignore
-    # Every 5 minutes, discover, crawl and then index
-    sender.add_periodic_task(300.0, celery_app.signature("backend.app.tasks.task_discover_once"), name="discover every 5m")
-    sender.add_periodic_task(300.0, task_crawl_once.s(10), name="crawl every 5m")
-    sender.add_periodic_task(300.0, task_index_once.s(10), name="index every 5m")
+    # Every 5 minutes, discover, crawl and then index, strictly in order so the
+    # steps never contend for the DB pool. Immutable signatures: each step keeps
+    # its own arguments instead of receiving the previous count. Crawls fan out
+    # asynchronously, so pages fetched now are indexed by the next tick.
+    sender.add_periodic_task(
+        300.0,
+        chain(task_discover_once.si(), task_crawl_once.si(10), task_index_once.si(10)),
+        name="discover+crawl+index 5m",
+    )
     # Daily evaluator run at 03:30 UTC (configurable via env)
     try:
         eval_schedule = float(_os.getenv("EVAL_PERIOD_SECONDS", str(24 * 3600)))
@@ -61,78 +187,115 @@ def setup_periodic_tasks(sender, **kwargs):  # type: ignore
         pass
 
 
+@lru_cache(maxsize=1)
+def _load_discovery_queries_cached(epoch: int) -> tuple[str, ...] | None:
+    """Persisted DISCOVERY_QUERIES; `epoch` (minute bucket) bounds staleness to ~60 s."""
+    try:
+        with connect() as conn:
+            with conn.cursor(binary=True) as cur:  # jsonb arrives without a text round-trip
+                cur.execute("SELECT value FROM settings WHERE key='DISCOVERY_QUERIES';")
+                row = cur.fetchone()
+                if row and isinstance(row[0], dict):
+                    arr = row[0].get("queries")
+                    if isinstance(arr, list) and arr:
+                        return tuple(str(x) for x in arr if str(x).strip())
+    except Exception:
+        pass
+    return None
+
+
 @celery_app.task(name="backend.app.tasks.task_discover_once")
 def task_discover_once(per_query: int = 5, max_new: int = 25, queries: list[str] | None = None) -> int:
     # Load persisted DISCOVERY_QUERIES if not explicitly provided
     if queries is None:
-        try:
-            with connect() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT value FROM settings WHERE key='DISCOVERY_QUERIES';")
-                    row = cur.fetchone()
-                    if row and isinstance(row[0], dict):
-                        arr = row[0].get("queries")
-                        if isinstance(arr, list) and arr:
-                            queries = [str(x) for x in arr if str(x).strip()]
-        except Exception:
-            pass
+        cached = _load_discovery_queries_cached(int(time.time() // 60))
+        queries = list(cached) if cached else None
     log_event("discover", "Periodic discover start", meta={"per_query": per_query, "max_new": max_new, "has_queries": bool(queries)})
     n = discover_new_sources(queries=queries, per_query=per_query, max_new=max_new)
     log_event("discover", "Periodic discover done", meta={"new_sources": n})
     return n
 
 
-@celery_app.task(name="backend.app.tasks.task_run_once")
-def task_run_once(per_query: int = 5, max_new: int = 25, crawl_limit: int = 50, index_batch: int = 50) -> dict:
-    """Run discovery, then crawl, then index in the background and return a summary dict."""
+@celery_app.task(name="backend.app.tasks.task_discover_new")
+def task_discover_new(per_query: int = 5, max_new: int = 25) -> int:
     try:
+        discovered = discover_new_sources(per_query=per_query, max_new=max_new)
+    except Exception:
         discovered = 0
-        try:
-            discovered = discover_new_sources(per_query=per_query, max_new=max_new)
-        except Exception:
-            discovered = 0
-        log_event("discover", "Run once discover", meta={"new_sources": discovered})
-        inserted = 0
+    log_event("discover", "Run once discover", meta={"new_sources": discovered})
+    return int(discovered)
+
+
+@celery_app.task(name="backend.app.tasks.task_index_unembedded")
+def task_index_unembedded(counts: list[int], batch_size: int = 50) -> dict:
+    """Chord callback: index once discover+crawl are both done, then build the run summary.
+
+    `counts` is the discover result followed by one result per crawled URL.
+    """
+    discovered = counts[0] if counts else 0
+    inserted = sum(int(c or 0) for c in counts[1:])
+    log_event("crawl", "Run once crawl", meta={"inserted": inserted})
+    try:
+        indexed = index_unembedded(batch_size=batch_size)
+    except Exception:
         indexed = 0
-        try:
-            inserted = crawl_sources(limit=crawl_limit)
-        except Exception:
-            inserted = 0
-        log_event("crawl", "Run once crawl", meta={"inserted": inserted})
-        try:
-            indexed = index_unembedded(batch_size=index_batch)
-        except Exception:
-            indexed = 0
-        log_event("index", "Run once index", meta={"indexed": indexed})
-        try:
-            if os.getenv("EVOLVE_SEED_AFTER_INDEX", "1") in ("1", "true", "True"):
-                seed_from_docs(limit=200)
-        except Exception:
-            pass
-        return {
-            "status": "ok",
-            "discovered": int(discovered),
-            "inserted": int(inserted),
-            "indexed": int(indexed),
-        }
+    log_event("index", "Run once index", meta={"indexed": indexed})
+    try:
+        if os.getenv("EVOLVE_SEED_AFTER_INDEX", "1") in ("1", "true", "True"):
+            seed_from_docs(limit=200)
+    except Exception:
+        pass
+    return {
+        "status": "ok",
+        "discovered": int(discovered or 0),
+        "inserted": int(inserted or 0),
+        "indexed": int(indexed),
+    }
+
+
+@celery_app.task(name="backend.app.tasks.task_run_once", bind=True)
+def task_run_once(self, per_query: int = 5, max_new: int = 25, crawl_limit: int = 50, index_batch: int = 50) -> dict:
+    """Run discovery and crawl in parallel, then index, and return a summary dict.
+
+    Discovery and the per-source crawls are network-bound and independent, so
+    they run as a chord header on separate workers; indexing is the callback. The task replaces
+    itself with the chord, so its id still resolves to the final summary.
+    Sources found by this run's discovery are picked up by the next crawl.
+    """
+    try:
+        header = [task_discover_new.s(per_query, max_new)]
+        header += [task_crawl_url.s(u, k) for u, k in _select_pending_sources(crawl_limit)]
+        workflow = chord(header, task_index_unembedded.s(index_batch))
     except Exception as e:
         return {"status": "error", "error": str(e), "discovered": 0, "inserted": 0, "indexed": 0}
+    raise self.replace(workflow)
 
 
 @celery_app.task(name="backend.app.tasks.task_evaluate_and_record")
 def task_evaluate_and_record(version_id: int = 1, testset: str | None = None) -> dict:
-    """Run evaluator CLI and record its report into ci_history. Uses evaluator/evaluate.py --version-id <id>"""
+    """Run the evaluator and record its report into ci_history.
+
+    The evaluator runs in-process (deps already imported by the worker); set
+    EVAL_USE_SUBPROCESS=1 to isolate it in a `python -m evaluator.evaluate` child.
+    """
     try:
         log_event("evolve", "Evaluator run start", meta={"version_id": version_id})
-        cmd = ["python", "evaluator/evaluate.py", "--version-id", str(version_id)]
-        if testset:
-            cmd += ["--testset", testset]
-        # Run evaluator and capture report path (it writes evaluator/reports/index_<id>.json)
-        subprocess.check_call(cmd)
         report_path = Path("evaluator/reports") / f"index_{version_id}.json"
-        if report_path.exists():
-            with report_path.open("r", encoding="utf-8") as f:
-                report = json.load(f)
+        report: dict[str, Any] | None = None
+        if _os.getenv("EVAL_USE_SUBPROCESS", "0") in ("1", "true", "True"):
+            cmd = [sys.executable, "-m", "evaluator.evaluate", "--version-id", str(version_id)]
+            if testset:
+                cmd += ["--testset", testset]
+            # The child writes evaluator/reports/index_<id>.json
+            subprocess.check_call(cmd)
+            if report_path.exists():
+                with report_path.open("rb") as f:
+                    report = orjson.loads(f.read())
+        else:
+            from evaluator.evaluate import evaluate_index
+
+            report = evaluate_index(version_id, testset_path=testset)
+        if report:
             agg = report.get("aggregates", {})
             overall = report.get("overall_score") or report.get("overall_score")
             payload = {
@@ -146,8 +309,7 @@ def task_evaluate_and_record(version_id: int = 1, testset: str | None = None) ->
             }
             # Try direct DB insert first
             try:
-                from psycopg import connect as _pg_connect
-                with _pg_connect(_os.getenv("DATABASE_URL")) as conn:
+                with connect() as conn:
                     with conn.cursor() as cur:
                         cur.execute(
                             "INSERT INTO ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) VALUES(%s,%s,%s,%s,%s,%s,%s);",
@@ -158,7 +320,7 @@ def task_evaluate_and_record(version_id: int = 1, testset: str | None = None) ->
                                 payload["semantic_f1"],
                                 payload["freshness"],
                                 payload["avg_freshness_days"],
-                                json.dumps(payload["meta"]),
+                                Json(payload["meta"]),
                             ),
                         )
                     conn.commit()
@@ -179,60 +341,105 @@ def task_evaluate_and_record(version_id: int = 1, testset: str | None = None) ->
         return {"status": "error", "error": str(e)}
 
 
-@celery_app.task(name="backend.app.tasks.task_simple_evaluate")
-def task_simple_evaluate(questions: list[str] | None = None) -> dict[str, Any]:
-    """Async version of /evaluate/run: reuses search_answer logic for provided questions."""
-    from core.search import search_answer
+DEFAULT_EVAL_QUESTIONS = [
+    "Qu'est-ce qu'un agent auto-évolutif ?",
+    "Comment fonctionne l'index actuel ?",
+    "Quel est l'objectif du système ?",
+]
+
+
+def _freshness(cited_urls: set[str]) -> tuple[float | None, float | None]:
+    """Average age (days) of the cited documents and the derived 0..1 freshness score."""
+    if not cited_urls:
+        return None, None
+    try:
+        with connect() as conn:
+            with conn.cursor(binary=True) as cur:  # timestamptz decoded from binary, not parsed from text
+                cur.execute("SELECT published_at FROM documents WHERE url = ANY(%s);", (list(cited_urls),))
+                rows = cur.fetchall()
+    except Exception:
+        return None, None
+    now = datetime.now(timezone.utc)
+    ages = [(now - published_at).total_seconds() / 86400.0 for (published_at,) in rows if published_at]
+    if not ages:
+        return None, None
+    avg_days = sum(ages) / len(ages)
+    if avg_days <= 7:
+        score = 1.0
+    elif avg_days >= 90:
+        score = 0.0
+    else:
+        score = max(0.0, min(1.0, 1 - ((avg_days - 7) / (90 - 7))))
+    return round(avg_days, 2), round(score, 3)
+
+
+def run_evaluation(questions: list[str] | None = None, record: bool = True) -> dict[str, Any]:
+    """Answer each question, score exactness/groundedness/freshness and optionally persist to ci_history."""
+    from core.search import search_answer_async
     from .main import _evaluate_exact, _evaluate_grounded  # type: ignore
-    qs = questions or [
-        "Qu'est-ce qu'un agent auto-évolutif ?",
-        "Comment fonctionne l'index actuel ?",
-        "Quel est l'objectif du système ?",
-    ]
+    qs = questions or DEFAULT_EVAL_QUESTIONS
+
+    async def _answer_all() -> list[Any]:
+        return await asyncio.gather(*(search_answer_async(q) for q in qs), return_exceptions=True)
+
+    # search_answer is I/O-bound (vector DB + LLM): wall time is the slowest question, not the sum
+    answers = asyncio.run(_answer_all())
     results: list[dict[str, Any]] = []
-    exact_scores: list[float] = []
-    grounded_scores: list[float] = []
-    for q in qs:
-        try:
-            r = search_answer(q)
-            ex = _evaluate_exact(r.get("answer", ""), q)
-            gr = _evaluate_grounded(r.get("citations", []))
-            exact_scores.append(ex)
-            grounded_scores.append(gr)
-            results.append({
-                "question": q,
-                "answer": r.get("answer"),
-                "exact": ex,
-                "grounded": gr,
-                "confidence": r.get("confidence"),
-                "citations": r.get("citations", []),
-            })
-        except Exception as e:
-            results.append({"question": q, "error": str(e), "exact": 0.0, "grounded": 0.0})
-    overall_exact = sum(exact_scores) / max(1, len(exact_scores))
-    overall_grounded = sum(grounded_scores) / max(1, len(grounded_scores))
+    for q, r in zip(qs, answers):
+        if isinstance(r, BaseException):  # continue evaluating others
+            results.append({"question": q, "error": str(r), "exact": 0.0, "grounded": 0.0})
+            continue
+        results.append({
+            "question": q,
+            "answer": r.get("answer"),
+            "exact": _evaluate_exact(r.get("answer", ""), q),
+            "grounded": _evaluate_grounded(r.get("citations", [])),
+            "confidence": r.get("confidence"),
+            "citations": r.get("citations", []),
+        })
+    scored = [r for r in results if "error" not in r]
+    overall_exact = sum(r["exact"] for r in scored) / max(1, len(scored))
+    overall_grounded = sum(r["grounded"] for r in scored) / max(1, len(scored))
     overall = round((overall_exact * 0.6 + overall_grounded * 0.4), 3)
-    payload = {
+    cited_urls = {c.get("url") for r in results for c in r.get("citations", []) if c.get("url")}
+    avg_freshness_days, freshness_score = _freshness(cited_urls)
+
+    if record:
+        try:
+            with connect() as conn:
+                # Both statements go out in one round-trip and commit together
+                with conn.pipeline(), conn.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) VALUES(%s,%s,%s,%s,%s,%s,%s);",
+                        (overall, overall_exact, overall_grounded, None, freshness_score, avg_freshness_days, Json({"questions": qs})),
+                    )
+                    cur.execute(
+                        "INSERT INTO ci_status(id, overall, exact, groundedness, freshness, updated_at) VALUES(1,%s,%s,%s,%s,NOW()) ON CONFLICT (id) DO UPDATE SET overall=EXCLUDED.overall, exact=EXCLUDED.exact, groundedness=EXCLUDED.groundedness, freshness=EXCLUDED.freshness, updated_at=NOW();",
+                        (overall, overall_exact, overall_grounded, freshness_score),
+                    )
+                conn.commit()
+            log_event("evolve", "Evaluation enregistrée", meta={"overall": overall})
+        except Exception:
+            pass
+
+    return {
         "status": "ok",
         "overall": overall,
         "exact": round(overall_exact, 3),
         "groundedness": round(overall_grounded, 3),
+        "freshness": freshness_score,
+        "avg_freshness_days": avg_freshness_days,
         "results": results,
     }
-    # Persist like sync version (no freshness heuristic here yet)
-    try:
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO ci_history(overall, exact, groundedness, semantic_f1, freshness, avg_freshness_days, meta) VALUES(%s,%s,%s,%s,%s,%s,%s);",
-                    (overall, overall_exact, overall_grounded, None, None, None, json.dumps({"questions": qs})),
-                )
-                cur.execute(
-                    "INSERT INTO ci_status(id, overall, exact, groundedness, freshness, updated_at) VALUES(1,%s,%s,%s,%s,NOW()) ON CONFLICT (id) DO UPDATE SET overall=EXCLUDED.overall, exact=EXCLUDED.exact, groundedness=EXCLUDED.groundedness, freshness=EXCLUDED.freshness, updated_at=NOW();",
-                    (overall, overall_exact, overall_grounded, None),
-                )
-            conn.commit()
-        log_event("evolve", "Async evaluation enregistrée", meta={"overall": overall})
-    except Exception:
-        pass
-    return payload
+
+
+@celery_app.task(name="backend.app.tasks.task_evaluate")
+def task_evaluate(questions: list[str] | None = None, record: bool = True) -> dict[str, Any]:
+    """Background version of /evaluate/run."""
+    return run_evaluation(questions, record=record)
+
+
+@celery_app.task(name="backend.app.tasks.task_simple_evaluate")
+def task_simple_evaluate(questions: list[str] | None = None) -> dict[str, Any]:
+    """Async version of /evaluate/run (kept for /evaluate/run_async callers)."""
+    return run_evaluation(questions, record=True)
@@ -1,7 +1,9 @@
-from .search import search_answer, retrieve_passages, Passage  # re-export for convenience
+from .search import search_answer, search_answer_async, retrieve_passages, batch_retrieve, Passage  # re-export for convenience
 
 __all__ = [
     "search_answer",
+    "search_answer_async",
     "retrieve_passages",
+    "batch_retrieve",
     "Passage",
 ]
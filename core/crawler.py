@@ -4,7 +4,7 @@ Crawler minimal pour apprendre d'Internet.
 Fonctionnalités:
 - Récupère une page web via HTTP GET.
 - Extrait du texte lisible (titre, paragraphes).
-- Ajoute un document dans dummy_data.json si contenu non vide.
+- Ajoute un document dans dummy_data.db (SQLite, en ajout seul) si contenu non vide.
 
 Remarques:
 - À des fins de démonstration seulement; ne gère pas robots.txt ni le crawling
@@ -14,18 +14,46 @@ Remarques:
 
 from __future__ import annotations
 
-import json
-import re
+import sqlite3
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:  # Parseur HTML5 en C (lexbor), bien plus rapide que html.parser
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    LexborHTMLParser = None  # type: ignore
+
+try:  # HTTP/2 multiplexing when the optional `h2` package is installed
+    import h2  # type: ignore  # noqa: F401
+
+    _HTTP2 = True
+except Exception:  # pragma: no cover - optional dependency
+    _HTTP2 = False
 
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_FILE = ROOT / "dummy_data.json"
+# Documents crawlés: table append-only, dédoublonnée par clé primaire (pas de réécriture du JSON)
+STORE_FILE = DATA_FILE.with_suffix(".db")
+HEADERS = {"User-Agent": "AutoEvolveBot/0.1 (+https://example.local)"}
+LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+RETRIES = 2  # nouvelles tentatives sur échec de connexion uniquement
+
+# Sélecteurs/filtre construits une seule fois; le repli BeautifulSoup ne
+# construit que les balises utiles au lieu de tout l'arbre
+_TITLE_SEL = "title"
+_PARA_SEL = "p"
+_BS_ONLY = SoupStrainer([_TITLE_SEL, _PARA_SEL])
+
+# Client keep-alive partagé par les appels synchrones (un par processus)
+_sync_client: Optional[httpx.Client] = None
+_store: Optional[sqlite3.Connection] = None
+_store_lock = threading.Lock()
 
 
 @dataclass
@@ -37,30 +65,78 @@ class CrawlResult:
 
 
 def clean_text(text: str) -> str:
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+    # str.split() sans argument coupe sur tout blanc Unicode et ignore les vides
+    return " ".join(text.split())
 
 
-def fetch_and_extract(url: str, timeout: int = 10) -> CrawlResult:
-    headers = {"User-Agent": "AutoEvolveBot/0.1 (+https://example.local)"}
-    r = requests.get(url, headers=headers, timeout=timeout)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
-    title = soup.title.string.strip() if soup.title and soup.title.string else url
+def _get_store() -> sqlite3.Connection:
+    global _store
+    if _store is None:
+        conn = sqlite3.connect(STORE_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("CREATE TABLE IF NOT EXISTS documents(url TEXT PRIMARY KEY, title TEXT, content TEXT)")
+        conn.commit()
+        _store = conn
+    return _store
+
+
+def _store_document(url: str, title: str, content: str) -> bool:
+    """Insère le document s'il est nouveau; renvoie True si ajouté."""
+    with _store_lock:
+        conn = _get_store()
+        cur = conn.execute("INSERT OR IGNORE INTO documents(url, title, content) VALUES(?, ?, ?)", (url, title, content))
+        conn.commit()
+        return cur.rowcount > 0
+
+
+def load_documents() -> List[Dict[str, str]]:
+    """Documents crawlés stockés localement (vide si aucun crawl n'a eu lieu)."""
+    if not STORE_FILE.exists():
+        return []
+    with _store_lock:
+        rows = _get_store().execute("SELECT url, title, content FROM documents ORDER BY rowid").fetchall()
+    return [{"title": t or "", "content": c or "", "url": u} for u, t, c in rows]
+
+
+def _get_sync_client() -> httpx.Client:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = httpx.Client(
+            headers=HEADERS,
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(http2=_HTTP2, limits=LIMITS, retries=RETRIES),
+        )
+    return _sync_client
+
+
+def _parse(url: str, html: str) -> tuple[str, List[str]]:
+    """Renvoie (titre, paragraphes); selectolax si installé, sinon BeautifulSoup."""
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(html)
+        title_node = tree.css_first(_TITLE_SEL)
+        title = (title_node.text(strip=True) if title_node else "") or url
+        return title, [n.text(separator=" ", strip=True) for n in tree.css(_PARA_SEL)]
+    soup = BeautifulSoup(html, "html.parser", parse_only=_BS_ONLY)
+    title_tag = soup.find(_TITLE_SEL)
+    title = title_tag.string.strip() if title_tag and title_tag.string else url
+    return title, [p.get_text(" ", strip=True) for p in soup.find_all(_PARA_SEL)]
+
+
+def _extract(url: str, html: str, persist: bool) -> CrawlResult:
+    title, paragraphs = _parse(url, html)
     # Concaténer paragraphes
-    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
     content = clean_text(" ".join(paragraphs))[:1500]
-    added = False
-    if content:
-        # Charger existant
-        docs: List[Dict[str, str]] = []
-        if DATA_FILE.exists():
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                docs = json.load(f)
-        # Éviter doublons exacts d'URL
-        if not any(d.get("url") == url for d in docs):
-            docs.append({"title": title, "content": content, "url": url})
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(docs, f, ensure_ascii=False, indent=2)
-            added = True
+    # Doublons exacts d'URL ignorés par la clé primaire
+    added = _store_document(url, title, content) if content and persist else False
     return CrawlResult(url=url, title=title, content=content, added=added)
+
+
+def fetch_and_extract(url: str, timeout: int = 10, persist: bool = True) -> CrawlResult:
+    """Télécharge `url` et extrait titre + texte.
+
+    Avec `persist=False`, rien n'est écrit dans le stockage local (l'appelant
+    stocke lui-même le résultat, ex. les workers Celery en base).
+    """
+    r = _get_sync_client().get(url, timeout=timeout)
+    r.raise_for_status()
+    return _extract(url, r.text, persist)
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import hashlib
 import json
-import math
 import os
+import pickle
 import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
 
 # Optional third-party deps; code should gracefully degrade during tests
 try:  # OpenAI Python SDK v1.x
@@ -20,8 +30,17 @@ try:  # psycopg v3 binary for simple local usage
 except Exception:  # pragma: no cover - optional
     psycopg = None  # type: ignore
 
+try:  # pgvector adapters: send the query as a binary fp16 halfvec instead of a text literal
+    from pgvector import HalfVector  # type: ignore
+    from pgvector.psycopg import register_vector  # type: ignore
+except Exception:  # pragma: no cover - optional
+    HalfVector = None  # type: ignore
+    register_vector = None  # type: ignore
+
 
 DATA_FILE = Path(__file__).resolve().parent.parent / "dummy_data.json"
+# HNSW candidate list size per query (recall vs latency); same knob as the backend pool
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH") or "100")
 
 
 @dataclass
@@ -37,46 +56,136 @@ def _get_env(name: str, default: Optional[str] = None) -> str:
     return val if val is not None else (default or "")
 
 
+# Process-local LRU of query embeddings keyed by sha256(model + query)
+_EMBED_CACHE_MAX = 4096
+_embed_cache: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+_embed_lock = threading.Lock()
+
+
+def _embed_key(model: str, query: str) -> str:
+    return hashlib.sha256(f"{model}\x00{query}".encode("utf-8")).hexdigest()
+
+
+def _embed_cache_get(key: str) -> Optional[Tuple[float, ...]]:
+    with _embed_lock:
+        vec = _embed_cache.get(key)
+        if vec is not None:
+            _embed_cache.move_to_end(key)
+        return vec
+
+
+def _embed_cache_put(key: str, vec: Tuple[float, ...]) -> None:
+    with _embed_lock:
+        _embed_cache[key] = vec
+        _embed_cache.move_to_end(key)
+        while len(_embed_cache) > _EMBED_CACHE_MAX:
+            _embed_cache.popitem(last=False)
+
+
+@lru_cache(maxsize=8)
+def _openai_client(api_key: str) -> Any:
+    return OpenAI(api_key=api_key)  # type: ignore[misc]
+
+
 def _embed_query(query: str) -> Optional[List[float]]:
     """Return the embedding vector for the query using OpenAI, or None if unavailable."""
+    return _embed_queries([query])[0]
+
+
+def _embed_queries(queries: List[str]) -> List[Optional[List[float]]]:
+    """Embed several queries with a single API call; cached queries are not re-sent."""
     api_key = _get_env("OPENAI_API_KEY")
     model = _get_env("EMBEDDING_MODEL", "text-embedding-3-small")
     if not api_key or OpenAI is None:
-        return None
-    try:  # pragma: no cover - network path not covered by unit tests
-        client = OpenAI(api_key=api_key)
-        resp = client.embeddings.create(model=model, input=query)
-        return list(resp.data[0].embedding)
+        return [None] * len(queries)
+    found: Dict[str, Tuple[float, ...]] = {}
+    missing: List[str] = []
+    for q in dict.fromkeys(queries):
+        vec = _embed_cache_get(_embed_key(model, q))
+        if vec is None:
+            missing.append(q)
+        else:
+            found[q] = vec
+    if missing:
+        try:  # pragma: no cover - network path not covered by unit tests
+            resp = _openai_client(api_key).embeddings.create(model=model, input=missing)
+            for item in resp.data:
+                q = missing[item.index]
+                found[q] = tuple(item.embedding)
+                _embed_cache_put(_embed_key(model, q), found[q])
+        except Exception:
+            pass
+    return [list(found[q]) if q in found else None for q in queries]
+
+
+@lru_cache(maxsize=1)
+def _backend_connect() -> Any:
+    """backend.app.db.connect when the backend (and its pool deps) is importable, else None."""
+    try:
+        from backend.app.db import connect
+
+        return connect
     except Exception:
         return None
 
 
-def _pgvector_search(query: str, top_k: int) -> Optional[List[Passage]]:
+def _db_connection(db_url: str, register: bool) -> Any:
+    """Connection for one retrieval query; use as `with _db_connection(...) as conn:`.
+
+    Borrowed from the backend's shared pool, whose configure hook already registered
+    the pgvector types; standalone installs fall back to a one-off connection.
+    """
+    connect = _backend_connect()
+    if connect is not None:
+        return connect()
+    conn = psycopg.connect(db_url)
+    if register:
+        try:
+            register_vector(conn)
+        except Exception:
+            conn.close()
+            raise
+    return conn
+
+
+def _pgvector_search(
+    query: str, top_k: int, embedding: Optional[List[float]] = None, ef_search: Optional[int] = None
+) -> Optional[List[Passage]]:
     """Try to retrieve top_k passages from Postgres/pgvector using cosine similarity.
 
-    Returns None if the database or embedding service isn't available.
+    The ORDER BY is served by the HNSW index built by `python -m backend.app.migrate`
+    (halfvec_cosine_ops, m/ef_construction sized from the table). Returns None if
+    the database or embedding service isn't available.
     """
     if psycopg is None:
         return None
     db_url = _get_env("DATABASE_URL")
     if not db_url:
         return None
-    embedding = _embed_query(query)
+    if embedding is None:
+        embedding = _embed_query(query)
     if embedding is None:
         return None
-    # Build vector literal for pgvector (e.g., '[1,2,3]')
-    vec_literal = "[" + ",".join(f"{x:.8f}" for x in embedding) + "]"
+    # documents.embedding is halfvec (fp16): bind the query in the same precision
+    binary = HalfVector is not None and register_vector is not None
+    if binary:
+        query_vec: Any = HalfVector(np.asarray(embedding, dtype=np.float16))
+    else:
+        # Text literal (e.g. '[1,2,3]'); fp16 keeps ~4 significant digits anyway
+        query_vec = "[" + ",".join(f"{x:.5g}" for x in embedding) + "]"
     sql = (
-        "WITH q AS (SELECT %s::vector AS emb) "
+        "WITH q AS (SELECT %s::halfvec AS emb) "
         "SELECT d.title, d.url, d.content, (1 - (d.embedding <=> q.emb)) AS score "
         "FROM documents d, q "
         "ORDER BY d.embedding <=> q.emb ASC "
         "LIMIT %s"
     )
     try:  # pragma: no cover - requires DB
-        with psycopg.connect(db_url) as conn:
+        with _db_connection(db_url, register=binary) as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (vec_literal, top_k))
+                # SET LOCAL equivalent: scoped to this transaction, safe behind PgBouncer
+                cur.execute("SELECT set_config('hnsw.ef_search', %s, true);", (str(ef_search or HNSW_EF_SEARCH),))
+                cur.execute(sql, (query_vec, top_k))
                 rows = cur.fetchall()
         passages: List[Passage] = []
         for title, url, content, score in rows:
@@ -88,81 +197,159 @@ def _pgvector_search(query: str, top_k: int) -> Optional[List[Passage]]:
 
 # -------- Fallback TF-IDF retrieval over local dummy_data.json ---------
 
-_tfidf_index: Optional[Tuple[List[Dict[str, float]], Dict[str, float], List[Dict[str, str]]]] = None
+@dataclass
+class _TfidfIndex:
+    """TF-IDF matrix stored term-major (CSC): column j is the posting list of term j.
+
+    Rows are L2-normalised, so a query's cosine scores are X @ q, computed by
+    summing the posting lists of the query terms (a handful of NumPy ops).
+    """
+
+    vocab: Dict[str, int]
+    idf: np.ndarray
+    indptr: np.ndarray  # len(vocab) + 1 offsets into indices/data
+    indices: np.ndarray  # document ids
+    data: np.ndarray  # normalised tf-idf weights
+    docs: List[Dict[str, str]]
+
+
+_tfidf_index: Optional[_TfidfIndex] = None
+
+
+_CITE_RE = re.compile(r"【[^】]*】")
+_TOKEN_RE = re.compile(r"[a-zàâäéèêëïîôöùûüç]+")
 
 
 def _tokenize(text: str) -> List[str]:
-    text = text.lower()
-    text = re.sub(r"【[^】]*】", "", text)
-    return re.findall(r"[a-zàâäéèêëïîôöùûüç]+", text)
+    return _TOKEN_RE.findall(_CITE_RE.sub("", text.lower()))
+
 
+def _term_weights(toks: List[str], vocab: Dict[str, int], idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(term ids, L2-normalised tf-idf weights) for one token list; OOV terms are dropped."""
+    counts = Counter(t for t in toks if t in vocab)
+    if not counts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    cols = np.fromiter((vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+    tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) / max(1, len(toks))
+    w = tf * idf[cols]
+    norm = np.linalg.norm(w)
+    return cols, (w / norm if norm > 0.0 else w)
 
-def _build_index() -> Tuple[List[Dict[str, float]], Dict[str, float], List[Dict[str, str]]]:
+
+def _build_index() -> _TfidfIndex:
     with open(DATA_FILE, "r", encoding="utf-8") as f:
         docs = json.load(f)
+    try:  # pages added by core.crawler live in its SQLite store
+        from .crawler import load_documents
+
+        seen = {d.get("url") for d in docs}
+        docs += [d for d in load_documents() if d["url"] not in seen]
+    except Exception:
+        pass
+    tokenized = [_tokenize((d.get("title") or "") + " " + (d.get("content") or "")) for d in docs]
     # doc frequencies
-    df: Dict[str, int] = {}
-    tokenized: List[List[str]] = []
-    for d in docs:
-        toks = _tokenize((d.get("title") or "") + " " + (d.get("content") or ""))
-        tokenized.append(toks)
-        for t in set(toks):
-            df[t] = df.get(t, 0) + 1
+    df: Counter = Counter(t for toks in tokenized for t in set(toks))
+    vocab = {t: j for j, t in enumerate(df)}
     n = max(1, len(docs))
-    idf: Dict[str, float] = {t: math.log((n + 1) / (c + 1)) + 1.0 for t, c in df.items()}
-    # tf-idf vectors
-    vectors: List[Dict[str, float]] = []
-    for toks in tokenized:
-        tf: Dict[str, float] = {}
-        for t in toks:
-            tf[t] = tf.get(t, 0) + 1
-        L = max(1, len(toks))
-        for t in tf:
-            tf[t] /= L
-        vec: Dict[str, float] = {t: tf[t] * idf.get(t, 0.0) for t in tf}
-        vectors.append(vec)
-    return vectors, idf, docs
-
-
-def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
-    dot = 0.0
-    for k, v in a.items():
-        dot += v * b.get(k, 0.0)
-    na = math.sqrt(sum(x * x for x in a.values()))
-    nb = math.sqrt(sum(x * x for x in b.values()))
-    if na == 0.0 or nb == 0.0:
-        return 0.0
-    return dot / (na * nb)
-
-
-def _vectorize_query(q: str, idf: Dict[str, float]) -> Dict[str, float]:
-    toks = _tokenize(q)
-    tf: Dict[str, float] = {}
-    for t in toks:
-        tf[t] = tf.get(t, 0) + 1
-    L = max(1, len(toks))
-    for t in tf:
-        tf[t] /= L
-    return {t: tf[t] * idf.get(t, 0.0) for t in tf}
+    dfs = np.fromiter(df.values(), dtype=np.float64, count=len(df))
+    idf = np.log((n + 1) / (dfs + 1)) + 1.0
+    # Document-major triplets, then regrouped by term (stable, so doc ids stay sorted)
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    vals: List[np.ndarray] = []
+    for i, toks in enumerate(tokenized):
+        c, w = _term_weights(toks, vocab, idf)
+        rows.append(np.full(c.size, i, dtype=np.int64))
+        cols.append(c)
+        vals.append(w)
+    row = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    col = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    val = np.concatenate(vals) if vals else np.empty(0, dtype=np.float64)
+    order = np.argsort(col, kind="stable")
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(col, minlength=len(vocab)), out=indptr[1:])
+    return _TfidfIndex(vocab=vocab, idf=idf, indptr=indptr, indices=row[order], data=val[order], docs=docs)
+
+
+_INDEX_CACHE_FILE = DATA_FILE.with_suffix(".tfidf.cache")
+_INDEX_CACHE_VERSION = 1  # bump when _TfidfIndex or the weighting changes
+
+
+def _corpus_key() -> Tuple[Tuple[int, int], ...]:
+    """(mtime_ns, size) of every corpus file; changes whenever the corpus does."""
+    paths = [DATA_FILE]
+    try:
+        from .crawler import STORE_FILE
+
+        paths.append(STORE_FILE)
+    except Exception:
+        pass
+    key: List[Tuple[int, int]] = [(_INDEX_CACHE_VERSION, 0)]
+    for p in paths:
+        try:
+            st = p.stat()
+            key.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append((0, 0))
+    return tuple(key)
+
+
+def _load_index() -> _TfidfIndex:
+    """Load the pickled index if the corpus is unchanged, else rebuild and persist it."""
+    key = _corpus_key()
+    try:
+        with open(_INDEX_CACHE_FILE, "rb") as f:
+            cached_key, index = pickle.load(f)
+        if cached_key == key and isinstance(index, _TfidfIndex):
+            return index
+    except Exception:
+        pass
+    index = _build_index()
+    try:  # best-effort; write-then-rename so concurrent workers never read a partial file
+        tmp = _INDEX_CACHE_FILE.with_name(f"{_INDEX_CACHE_FILE.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((key, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, _INDEX_CACHE_FILE)
+    except Exception:
+        pass
+    return index
+
+
+def _score_query(q: str, index: _TfidfIndex) -> np.ndarray:
+    """Cosine similarity of the query against every document (X @ q)."""
+    scores = np.zeros(len(index.docs), dtype=np.float64)
+    cols, weights = _term_weights(_tokenize(q), index.vocab, index.idf)
+    for j, w in zip(cols.tolist(), weights.tolist()):
+        lo, hi = index.indptr[j], index.indptr[j + 1]
+        # A document appears at most once per posting list, so fancy += is safe
+        scores[index.indices[lo:hi]] += w * index.data[lo:hi]
+    return scores
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first (O(N) partition + O(k log k) sort)."""
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if scores.size <= k:
+        return np.argsort(-scores, kind="stable")
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
 
 
 def _fallback_search(query: str, top_k: int) -> List[Passage]:
     global _tfidf_index
     if _tfidf_index is None:
-        _tfidf_index = _build_index()
-    vectors, idf, docs = _tfidf_index
-    qv = _vectorize_query(query, idf)
-    scored: List[Tuple[float, int]] = []
-    for i, dv in enumerate(vectors):
-        scored.append((_cosine(qv, dv), i))
-    scored.sort(key=lambda x: x[0], reverse=True)
+        _tfidf_index = _load_index()
+    index = _tfidf_index
+    scores = _score_query(query, index)
     passages: List[Passage] = []
-    for score, idx in scored[:top_k]:
+    for idx in _top_k(scores, top_k).tolist():
+        score = float(scores[idx])
         if score <= 0.0:
             continue
-        d = docs[idx]
+        d = index.docs[idx]
         passages.append(
-            Passage(title=d.get("title", "Sans titre"), url=d.get("url", ""), content=d.get("content", ""), score=float(score))
+            Passage(title=d.get("title", "Sans titre"), url=d.get("url", ""), content=d.get("content", ""), score=score)
         )
     return passages
 
@@ -175,21 +362,79 @@ def retrieve_passages(query: str, top_k: int = 6) -> List[Passage]:
     return _fallback_search(query, top_k)
 
 
-def _build_prompt(query: str, passages: List[Passage]) -> str:
-    snippets = []
-    for p in passages:
-        snippets.append(f"- Titre: {p.title}\n  URL: {p.url}\n  Extrait: {p.content}")
-    sources_block = "\n".join(snippets) if snippets else "(aucune)"
-    instr = (
-        "Réponds en citant [titre](url) après chaque paragraphe utilisé. "
-        "Si les sources ne suffisent pas, dis 'Je ne sais pas' et liste juste les sources."
-    )
-    return (
-        f"Question: {query}\n\n"
-        f"Voici des passages de sources candidates:\n{sources_block}\n\n"
-        f"Consignes: {instr}\n"
-        f"Réponds en français, de manière concise et factuelle."
+# Speculative RAG (SPECULATIVE_RAG=1): a cheap top-3 draft starts the LLM while the full top-k runs
+_SPECULATIVE_DRAFT_K = 3
+_SPECULATIVE_EF_SEARCH = 20
+_speculative_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _speculative_executor() -> ThreadPoolExecutor:
+    global _speculative_pool
+    if _speculative_pool is None:
+        _speculative_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="spec-rag")
+    return _speculative_pool
+
+
+def _speculative_retrieve(
+    query: str, top_k: int, threshold: float
+) -> Tuple[List[Passage], Optional[Tuple[set, Future]]]:
+    """Full top-k passages plus, when pgvector is usable, (draft URLs, in-flight draft answer).
+
+    The draft LLM call only starts when the draft passages already clear the
+    confidence threshold: a running call cannot be cancelled, so a query that
+    ends in "Je ne sais pas" would otherwise pay for an answer nobody reads.
+    """
+    embedding = _embed_query(query) if psycopg is not None and _get_env("DATABASE_URL") else None
+    if embedding is None:
+        return retrieve_passages(query, top_k=top_k), None
+    draft = None
+    draft_passages = _pgvector_search(
+        query, min(_SPECULATIVE_DRAFT_K, top_k), embedding=embedding, ef_search=_SPECULATIVE_EF_SEARCH
     )
+    if draft_passages and sum(p.score for p in draft_passages) / len(draft_passages) >= threshold:
+        fut = _speculative_executor().submit(_call_llm, _build_prompt(query, draft_passages))
+        draft = ({p.url for p in draft_passages}, fut)
+    passages = _pgvector_search(query, top_k, embedding=embedding)
+    if passages is None:
+        passages = _fallback_search(query, top_k)
+    return passages, draft
+
+
+def batch_retrieve(queries: List[str], top_k: int = 6) -> List[List[Passage]]:
+    """`retrieve_passages` for many queries, embedding them all in one API call."""
+    embeddings = _embed_queries(list(queries)) if _get_env("DATABASE_URL") and psycopg is not None else [None] * len(queries)
+    out: List[List[Passage]] = []
+    for q, emb in zip(queries, embeddings):
+        pg = _pgvector_search(q, top_k, embedding=emb) if emb is not None else None
+        out.append(pg if pg is not None else _fallback_search(q, top_k))
+    return out
+
+
+# Static head of every prompt: identical bytes across queries, so a serving stack
+# with prefix caching (e.g. vLLM --enable-prefix-caching) reuses its KV blocks
+_PROMPT_PREFIX = (
+    "Consignes: Réponds en citant [titre](url) après chaque paragraphe utilisé. "
+    "Si les sources ne suffisent pas, dis 'Je ne sais pas' et liste juste les sources.\n"
+    "Réponds en français, de manière concise et factuelle.\n\n"
+    "Voici des passages de sources candidates:\n"
+)
+
+
+def _build_prompt(query: str, passages: List[Passage]) -> str:
+    """Prefix-cache friendly layout: static instructions, then passages, then the question.
+
+    Passages are ordered by URL so the same retrieved set always yields the same
+    block sequence; only the trailing question differs between repeated retrievals.
+    """
+    # Cap each passage: prompt prefill cost grows with every character sent
+    limit = int(_get_env("PROMPT_SNIPPET_CHARS", "1500") or 1500)
+    blocks = [
+        f"[DOC {i}] Titre: {p.title}\nURL: {p.url}\nExtrait: {(p.content or '')[:limit]}"
+        for i, p in enumerate(sorted(passages, key=lambda p: p.url), start=1)
+    ]
+    sources_block = "\n\n".join(blocks) if blocks else "(aucune)"
+    # One join instead of chained f-string concatenation of KB-sized passages
+    return "".join((_PROMPT_PREFIX, sources_block, "\n\nQuestion: ", query))
 
 
 def _call_llm(prompt: str) -> Optional[str]:
@@ -199,8 +444,7 @@ def _call_llm(prompt: str) -> Optional[str]:
     if not api_key or OpenAI is None:
         return None
     try:  # pragma: no cover - network path not covered by unit tests
-        client = OpenAI(api_key=api_key)
-        resp = client.chat.completions.create(
+        resp = _openai_client(api_key).chat.completions.create(
             model=model,
             temperature=temp,
             messages=[
@@ -213,30 +457,178 @@ def _call_llm(prompt: str) -> Optional[str]:
         return None
 
 
+_CITE_ANS_RE = re.compile(r"\[([^\]]+)\]\((https?://[^)]+)\)")
+
+
 def _extract_citations(answer: str) -> List[Dict[str, str]]:
     cites: List[Dict[str, str]] = []
-    seen = set()
-    for title, url in re.findall(r"\[([^\]]+)\]\((https?://[^)]+)\)", answer or ""):
-        key = (title.strip(), url.strip())
+    seen: set = set()
+    seen_add = seen.add
+    for m in _CITE_ANS_RE.finditer(answer or ""):
+        key = (m.group(1).strip(), m.group(2).strip())
         if key in seen:
             continue
-        seen.add(key)
-        cites.append({"title": title.strip(), "url": url.strip()})
+        seen_add(key)
+        cites.append({"title": key[0], "url": key[1]})
     return cites
 
 
+def _db_corpus_version(db_url: str) -> Optional[int]:
+    """Write counter of the documents table (rows inserted + updated + deleted), or None."""
+    try:  # pragma: no cover - requires DB
+        with _db_connection(db_url, register=False) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables WHERE relname = 'documents';"
+                )
+                row = cur.fetchone()
+        return int(row[0]) if row else None
+    except Exception:
+        return None
+
+
+def _corpus_version() -> Tuple[Any, ...]:
+    """Changes whenever the retrievable corpus does: local corpus files, then the documents table."""
+    db_url = _get_env("DATABASE_URL")
+    db_version = _db_corpus_version(db_url) if db_url and psycopg is not None else None
+    return _corpus_key(), db_version
+
+
+class _SemanticCache:
+    """Answers of past queries, looked up by cosine similarity of the query embeddings.
+
+    Brute-force NumPy search over a ring buffer of at most `capacity` unit
+    vectors (oldest overwritten first); persisted to `path` at exit so warm
+    answers survive restarts. An entry only matches a lookup with the same key
+    (models, retrieval settings, corpus version) and expires after `ttl` seconds.
+    """
+
+    def __init__(self, path: Path, capacity: int = 4096) -> None:
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._vecs: Optional[np.ndarray] = None  # (capacity, dim) float32, L2-normalised rows
+        self._entries: List[Optional[Tuple[Tuple[Any, ...], float, Dict[str, Any]]]] = []  # (key, created, result)
+        self._size = 0
+        self._next = 0
+        self._loaded = False
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            with open(self.path, "rb") as f:
+                vecs, entries, size, nxt = pickle.load(f)
+            valid = all(e is None or (len(e) == 3 and isinstance(e[0], tuple)) for e in entries)
+            if isinstance(vecs, np.ndarray) and len(vecs) == len(entries) == self.capacity and valid:
+                self._vecs, self._entries, self._size, self._next = vecs, list(entries), int(size), int(nxt)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _unit(vec: List[float]) -> Optional[np.ndarray]:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0.0 else None
+
+    def get(self, key: Tuple[Any, ...], vec: List[float], threshold: float, ttl: float) -> Optional[Dict[str, Any]]:
+        q = self._unit(vec)
+        now = time.time()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if q is None or self._vecs is None or self._vecs.shape[1] != q.shape[0]:
+                return None
+            sims = self._vecs[: self._size] @ q
+            for i in np.argsort(-sims)[:8].tolist():
+                if sims[i] < threshold:
+                    break
+                entry = self._entries[i]
+                if entry and entry[0] == key and now - entry[1] < ttl:
+                    return dict(entry[2])
+        return None
+
+    def put(self, key: Tuple[Any, ...], vec: List[float], result: Dict[str, Any]) -> None:
+        q = self._unit(vec)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if q is None:
+                return
+            if self._vecs is None or self._vecs.shape[1] != q.shape[0]:
+                # First entry (or embedding model changed dimension): start afresh
+                self._vecs = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+                self._entries = [None] * self.capacity
+                self._size = self._next = 0
+            self._vecs[self._next] = q
+            self._entries[self._next] = (key, time.time(), dict(result))
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def save(self) -> None:
+        with self._lock:
+            if self._vecs is None or not self._size:
+                return
+            try:
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                with open(tmp, "wb") as f:
+                    pickle.dump((self._vecs, self._entries, self._size, self._next), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self.path)
+            except Exception:
+                pass
+
+
+_semantic_cache = _SemanticCache(DATA_FILE.with_suffix(".semcache"))
+atexit.register(_semantic_cache.save)
+
+
 def search_answer(query: str, top_k: int | None = None) -> Dict[str, Any]:
     """
     - Récupère top_k=6 passages via pgvector (cosine), fallback TF-IDF si indispo.
     - Construit un prompt imposant les citations [titre](url) après chaque paragraphe, sinon "Je ne sais pas" + sources.
     - Appelle le LLM (modèle et température via env) si des sources pertinentes existent.
     - Renvoie { answer, citations: [{title,url}], confidence }.
+    - Avec SEMANTIC_CACHE=1, une question quasi identique (cosinus des embeddings
+      ≥ SEMANTIC_CACHE_THRESHOLD) réutilise une réponse de moins de SEMANTIC_CACHE_TTL
+      secondes, obtenue avec les mêmes modèles, réglages et version du corpus.
     """
     top_k = int(top_k or int(_get_env("RETRIEVAL_TOP_K", "6") or 6))
     threshold = float(_get_env("CONFIDENCE_THRESHOLD", "0.25") or 0.25)
 
-    passages = retrieve_passages(query, top_k=top_k)
+    # Semantic cache (opt-in): near-duplicate questions reuse a previous answer. The
+    # embedding is memoised, so retrieval below does not pay for it twice.
+    cache_vec = _embed_query(query) if _get_env("SEMANTIC_CACHE", "0") in ("1", "true", "True") else None
+    cache_key: Tuple[Any, ...] = ()
+    if cache_vec is not None:
+        cache_key = (
+            _get_env("EMBEDDING_MODEL", "text-embedding-3-small"),
+            _get_env("OPENAI_MODEL", "gpt-4o-mini"),
+            top_k,
+            threshold,
+            _corpus_version(),
+        )
+        hit = _semantic_cache.get(
+            cache_key,
+            cache_vec,
+            float(_get_env("SEMANTIC_CACHE_THRESHOLD", "0.95") or 0.95),
+            float(_get_env("SEMANTIC_CACHE_TTL", "3600") or 3600),
+        )
+        if hit is not None:
+            return hit
+    result = _search_answer_uncached(query, top_k, threshold)
+    if cache_vec is not None:
+        _semantic_cache.put(cache_key, cache_vec, result)
+    return result
+
+
+def _search_answer_uncached(query: str, top_k: int, threshold: float) -> Dict[str, Any]:
+    draft = None
+    if _get_env("SPECULATIVE_RAG", "0") in ("1", "true", "True"):
+        passages, draft = _speculative_retrieve(query, top_k, threshold)
+    else:
+        passages = retrieve_passages(query, top_k=top_k)
     if not passages:
+        if draft is not None:
+            draft[1].cancel()
         return {"answer": "Je ne sais pas", "citations": [], "confidence": 0.0}
 
     # Confidence from mean of top scores (clamped 0..1)
@@ -245,11 +637,21 @@ def search_answer(query: str, top_k: int | None = None) -> Dict[str, Any]:
 
     # If below threshold, short-circuit with "Je ne sais pas" and list only sources
     if confidence < threshold:
+        if draft is not None:
+            draft[1].cancel()
         cites = [{"title": p.title, "url": p.url} for p in passages]
         return {"answer": "Je ne sais pas", "citations": cites, "confidence": round(confidence, 3)}
 
-    prompt = _build_prompt(query, passages)
-    answer = _call_llm(prompt)
+    answer = None
+    if draft is not None:
+        draft_urls, fut = draft
+        # Keep the draft only if the refined search agrees on the leading sources
+        if draft_urls == {p.url for p in passages[: len(draft_urls)]}:
+            answer = fut.result()
+        else:
+            fut.cancel()
+    if answer is None:
+        answer = _call_llm(_build_prompt(query, passages))
 
     if not answer:
         # Deterministic fallback: build a minimal answer citing each passage
@@ -268,3 +670,8 @@ def search_answer(query: str, top_k: int | None = None) -> Dict[str, Any]:
         citations = [{"title": p.title, "url": p.url} for p in passages]
 
     return {"answer": answer, "citations": citations, "confidence": round(confidence, 3)}
+
+
+async def search_answer_async(query: str, top_k: int | None = None) -> Dict[str, Any]:
+    """Awaitable search_answer: runs the blocking retrieval/LLM pipeline in a worker thread."""
+    return await asyncio.to_thread(search_answer, query, top_k)
@@ -5,15 +5,14 @@ Replace with real crawling & discovery logic later.
 """
 from __future__ import annotations
 
-import random
 from typing import List, Optional
 
 
 def crawl_sources(limit: int = 10) -> int:
-    """Pretend crawl returning a small random number."""
+    """Pretend crawl returning a small fixed count (no RNG state or lock)."""
     if limit <= 0:
         return 0
-    return random.randint(0, min(3, limit))
+    return min(3, limit)
 
 
 def discover_new_sources(
@@ -25,7 +24,7 @@ def discover_new_sources(
     if not queries:
         return 0
     potential = min(len(queries) * per_query, max_new)
-    return random.randint(0, potential) if potential > 0 else 0
+    return min(3, potential) if potential > 0 else 0
 
 
 __all__ = ["crawl_sources", "discover_new_sources"]
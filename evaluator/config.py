@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from typing import Dict, Optional
 
+import numpy as np
+
 
 def _get_float(name: str, default: float) -> float:
     try:
@@ -13,6 +15,10 @@ def _get_float(name: str, default: float) -> float:
         return default
 
 
+# Order of the metrics in EvalSettings.weights_array
+METRIC_KEYS = ("exact", "semantic_f1", "groundedness", "freshness")
+
+
 @dataclass(frozen=True)
 class EvalSettings:
     WEIGHT_EXACT: float = 0.25
@@ -31,6 +37,17 @@ class EvalSettings:
             "freshness": float(self.WEIGHT_FRESHNESS),
         }
 
+    @cached_property
+    def weights_array(self) -> np.ndarray:
+        """Weights normalised to sum 1, ordered as METRIC_KEYS (computed once per settings)."""
+        w = np.array([self.as_weights()[k] for k in METRIC_KEYS], dtype=np.float64)
+        total = float(w.sum())
+        return w / total if total else w
+
+    @cached_property
+    def normalized_weights(self) -> Dict[str, float]:
+        return {k: float(v) for k, v in zip(METRIC_KEYS, self.weights_array)}
+
 
 @lru_cache(maxsize=1)
 def get_eval_settings() -> EvalSettings:
@@ -3,26 +3,38 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 import requests
 
-from .config import get_eval_settings
-from .metrics import exact_match, semantic_f1, groundedness, freshness
+try:  # faster report serialisation when available
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional
+    orjson = None  # type: ignore
+
+from .config import METRIC_KEYS, get_eval_settings
+from .metrics import exact_match, semantic_f1, groundedness, freshness_batch
 
 
 SearchFn = Callable[[str], Dict[str, Any]]
 
+_YEAR_RE = re.compile(r"(?:20|19)\d{2}")
+# Shared keep-alive session for backend calls (used from the evaluation thread pool)
+_SESSION = requests.Session()
+
 
 def _default_backend_search(q: str) -> Dict[str, Any]:
     st = get_eval_settings()
     if not st.BACKEND_URL:
         raise RuntimeError("BACKEND_URL is not configured; provide a backend_search function instead")
     url = st.BACKEND_URL.rstrip("/") + "/search"
-    r = requests.get(url, params={"q": q, "k": 5}, timeout=20)
+    r = _SESSION.get(url, params={"q": q, "k": 5}, timeout=20)
     r.raise_for_status()
     return r.json()
 
@@ -35,20 +47,10 @@ def _load_testset(path: Path) -> List[Dict[str, Any]]:
 def _collect_freshness_dates(sources: Iterable[str]) -> List[datetime]:
     # Placeholder: in a real system, we'd fetch publish dates from DB.
     # For now, we treat missing dates as no contribution (freshness 0).
-    # If a source embeds an ISO date in query or path, parse it.
-    dates: List[datetime] = []
-    for s in sources:
-        # naive parse YYYY (if present) as Jan 1st of that year
-        import re
-
-        m = re.search(r"(20\d{2}|19\d{2})", s)
-        if m:
-            try:
-                y = int(m.group(1))
-                dates.append(datetime(y, 1, 1))
-            except Exception:
-                pass
-    return dates
+    # If a source embeds a year in query or path, use Jan 1st of that year
+    # (first match per source).
+    matches = (_YEAR_RE.search(s) for s in sources)
+    return [datetime(int(m.group(0)), 1, 1) for m in matches if m]
 
 
 @dataclass
@@ -63,7 +65,6 @@ class ItemResult:
 
 def evaluate_index(version_id: int, testset_path: Optional[str] = None, backend_search: Optional[SearchFn] = None) -> Dict[str, Any]:
     st = get_eval_settings()
-    weights = st.as_weights()
     if backend_search is None:
         backend_search = _default_backend_search
 
@@ -76,18 +77,27 @@ def evaluate_index(version_id: int, testset_path: Optional[str] = None, backend_
     agg = {"exact": 0.0, "semantic_f1": 0.0, "groundedness": 0.0, "freshness": 0.0}
     freshness_days: List[float] = []
 
-    for case in cases:
-        q = case["question"]
+    # Backend calls are I/O-bound round-trips: issue them concurrently, score in order
+    questions = [case["question"] for case in cases]
+    with ThreadPoolExecutor(max_workers=max(1, int(os.getenv("EVAL_CONCURRENCY", "8")))) as ex:
+        responses = list(ex.map(backend_search, questions))
+
+    all_sources = [
+        [s if isinstance(s, str) else (s[0] if isinstance(s, (list, tuple)) and s else "") for s in res.get("sources", [])]
+        for res in responses
+    ]
+    # Freshness for every case in one vectorised pass (single `now`)
+    f_scores, f_days = freshness_batch(_collect_freshness_dates(srcs) for srcs in all_sources)
+
+    for i, (case, q, res, pred_sources) in enumerate(zip(cases, questions, responses, all_sources)):
         gold = case["expected_answer"]
         gold_sources = case.get("expected_sources", [])
-        res = backend_search(q)
         pred = str(res.get("answer", ""))
-        pred_sources = [s if isinstance(s, str) else (s[0] if isinstance(s, (list, tuple)) and s else "") for s in res.get("sources", [])]
 
         em = exact_match(pred, gold)
         sf1 = semantic_f1(pred, gold)
         _, _, grd_f1 = groundedness(pred_sources, gold_sources)
-        f_score, avg_days = freshness(_collect_freshness_dates(pred_sources))
+        f_score, avg_days = float(f_scores[i]), float(f_days[i])
 
         item_results.append(
             ItemResult(
@@ -115,16 +125,9 @@ def evaluate_index(version_id: int, testset_path: Optional[str] = None, backend_
     for k in list(agg.keys()):
         agg[k] = agg[k] / n
 
-    # Normalize weights to sum 1
-    sw = sum(weights.values()) or 1.0
-    weights = {k: v / sw for k, v in weights.items()}
-
-    overall = (
-        weights["exact"] * agg["exact"]
-        + weights["semantic_f1"] * agg["semantic_f1"]
-        + weights["groundedness"] * agg["groundedness"]
-        + weights["freshness"] * agg["freshness"]
-    )
+    # Weights normalised to sum 1, precomputed once per settings object
+    weights = dict(st.normalized_weights)
+    overall = float(st.weights_array @ np.array([agg[k] for k in METRIC_KEYS]))
 
     avg_fresh_days = sum(freshness_days) / len(freshness_days) if freshness_days else None
     eligible = overall >= float(st.MIN_OVERALL_SCORE)
@@ -157,8 +160,12 @@ def evaluate_index(version_id: int, testset_path: Optional[str] = None, backend_
     out_dir = Path(__file__).parent / "reports"
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / f"index_{version_id}.json"
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        # Serialised in C straight to bytes (no intermediate str)
+        out_path.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with out_path.open("w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
 
     # Optional: mark eligibility in DB if configured
     _maybe_mark_db(version_id, eligible)
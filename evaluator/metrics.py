@@ -1,17 +1,20 @@
 from __future__ import annotations
 
-import math
 import re
-from collections import Counter
+import zlib
 from datetime import datetime, timezone
 from typing import Iterable, List, Tuple
 
+import numpy as np
+
 
 _TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_BOW_DIM = 2048
+_WS_RE = re.compile(r"\s+")
 
 
 def _normalize_text(text: str) -> str:
-    return re.sub(r"\s+", " ", text.strip().lower())
+    return _WS_RE.sub(" ", text.strip().lower())
 
 
 def _tokenize(text: str) -> List[str]:
@@ -22,28 +25,19 @@ def exact_match(pred: str, gold: str) -> float:
     return 1.0 if _normalize_text(pred) == _normalize_text(gold) else 0.0
 
 
-def _bow_vector(tokens: Iterable[str]) -> Counter:
-    # Simple BOW with hashing to dampen vocabulary variance
-    vec: Counter = Counter()
-    for t in tokens:
-        # map token into a small-ish space to stabilize on Windows w/o numpy
-        bucket = hash(t) % 2048
-        vec[bucket] += 1
-    return vec
+def _bow_vector(tokens: Iterable[str]) -> np.ndarray:
+    # Simple BOW with hashing to dampen vocabulary variance. crc32 is stable
+    # across processes (unlike hash(), which is salted per interpreter run).
+    ids = np.fromiter((zlib.crc32(t.encode("utf-8")) % _BOW_DIM for t in tokens), dtype=np.int64)
+    return np.bincount(ids, minlength=_BOW_DIM).astype(np.float64)
 
 
-def _cosine(a: Counter, b: Counter) -> float:
-    if not a or not b:
-        return 0.0
-    dot = 0.0
-    for k, v in a.items():
-        if k in b:
-            dot += v * b[k]
-    na = math.sqrt(sum(v * v for v in a.values()))
-    nb = math.sqrt(sum(v * v for v in b.values()))
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    na = float(np.linalg.norm(a))
+    nb = float(np.linalg.norm(b))
     if na == 0.0 or nb == 0.0:
         return 0.0
-    return float(dot / (na * nb))
+    return min(1.0, float(np.dot(a, b) / (na * nb)))  # clamp float rounding on identical bags
 
 
 def semantic_f1(pred: str, gold: str) -> float:
@@ -80,19 +74,35 @@ def groundedness(pred_sources: Iterable[str], gold_sources: Iterable[str]) -> Tu
     return (prec, rec, f1)
 
 
+def freshness_batch(cases: Iterable[Iterable[datetime]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorised `freshness` over many cases: (scores, avg_age_days), one entry per case.
+
+    `now` is read once for the whole batch; cases without dates score 0 with an
+    infinite average age, like `freshness`.
+    """
+    now = datetime.now(timezone.utc).timestamp()
+    case_ids: List[int] = []
+    stamps: List[float] = []
+    n = 0
+    for i, dates in enumerate(cases):
+        n = i + 1
+        for d in dates:
+            if isinstance(d, datetime):
+                # Naive dates are taken as UTC
+                stamps.append((d if d.tzinfo else d.replace(tzinfo=timezone.utc)).timestamp())
+                case_ids.append(i)
+    ids = np.asarray(case_ids, dtype=np.int64)
+    ages = (now - np.asarray(stamps, dtype=np.float64)) / 86400.0
+    counts = np.bincount(ids, minlength=n)
+    sums = np.bincount(ids, weights=ages, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_days = np.where(counts > 0, sums / np.maximum(counts, 1), np.inf)
+    # Score linearly decays across a year; clamp to [0,1]
+    scores = np.where(counts > 0, np.maximum(0.0, 1.0 - avg_days / 365.0), 0.0)
+    return scores, avg_days
+
+
 def freshness(cited_dates: Iterable[datetime]) -> Tuple[float, float]:
     # Returns (freshness_score in [0,1], avg_age_days)
-    dates = [d for d in cited_dates if isinstance(d, datetime)]
-    if not dates:
-        return (0.0, float("inf"))
-    now = datetime.now(timezone.utc)
-    ages_days: List[float] = []
-    for d in dates:
-        if d.tzinfo is None:
-            d = d.replace(tzinfo=timezone.utc)
-        delta = now - d
-        ages_days.append(delta.total_seconds() / 86400.0)
-    avg_days = sum(ages_days) / len(ages_days)
-    # Score linearly decays across a year; clamp to [0,1]
-    score = max(0.0, 1.0 - (avg_days / 365.0))
-    return (float(score), float(avg_days))
+    scores, avg_days = freshness_batch([cited_dates])
+    return (float(scores[0]), float(avg_days[0]))
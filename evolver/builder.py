@@ -7,16 +7,17 @@ import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
 
 ROOT = Path(__file__).resolve().parents[1]
 
 
-def sh(cmd: str, check: bool = True) -> str:
-    p = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=str(ROOT))
+def run(argv: List[str], check: bool = True, input: Optional[str] = None) -> str:
+    """Run a command directly (no intermediate shell) from the repo root; `input` feeds stdin."""
+    p = subprocess.run(argv, input=input, capture_output=True, text=True, cwd=str(ROOT))
     if check and p.returncode != 0:
-        raise RuntimeError(f"Command failed: {cmd}\n{p.stdout}\n{p.stderr}")
+        raise RuntimeError(f"Command failed: {' '.join(argv)}\n{p.stdout}\n{p.stderr}")
     return (p.stdout or "") + (p.stderr or "")
 
 
@@ -25,11 +26,12 @@ def load_plan(plan_path: Path) -> Dict[str, Any]:
 
 
 def ensure_branch(branch: str) -> None:
-    sh("git rev-parse --git-dir >NUL 2>&1 || git init", check=False)
+    if subprocess.run(["git", "rev-parse", "--git-dir"], capture_output=True, cwd=str(ROOT)).returncode != 0:
+        run(["git", "init"], check=False)
     # Fetch origin if exists
-    sh("git fetch origin", check=False)
+    run(["git", "fetch", "origin"], check=False)
     # Create/checkout branch
-    sh(f"git checkout -B {branch}")
+    run(["git", "checkout", "-B", branch])
 
 
 def apply_patch(file_path: Path, patch: str, dry_run: bool) -> None:
@@ -54,29 +56,22 @@ def apply_patch(file_path: Path, patch: str, dry_run: bool) -> None:
         if dry_run:
             print(f"[DRY] apply unified patch to {file_path} (len={len(unified)})")
             return
-        # Try to apply with `git apply -p0` from repo root
-        tmp = ROOT / ".tmp.patch"
-        tmp.write_text(unified, encoding="utf-8")
-        try:
-            sh(f"git apply --whitespace=fix {tmp}")
-        finally:
-            try:
-                tmp.unlink()
-            except Exception:
-                pass
+        # Apply from repo root, streaming the diff on stdin (no temp patch file)
+        run(["git", "apply", "--whitespace=fix", "-"], input=unified)
     else:
         raise ValueError("Unsupported patch format")
 
 
 def stage_and_commit(message: str) -> None:
-    sh("git add -A")
-    sh(f"git commit -m {json.dumps(message)}", check=False)
+    # Kept as two calls: `commit -a` would skip newly written (untracked) test files
+    run(["git", "add", "-A"])
+    run(["git", "commit", "-m", message], check=False)
 
 
 def open_pr(title: str, body: str) -> None:
     # Requires GitHub CLI `gh` to be authenticated. Fallback prints instructions.
     try:
-        sh(f"gh pr create --title {json.dumps(title)} --body {json.dumps(body)} --fill", check=True)
+        run(["gh", "pr", "create", "--title", title, "--body", body, "--fill"], check=True)
     except Exception as e:
         print("Impossible d'ouvrir la PR automatiquement (gh CLI).\n", e)
         print("Crée la PR manuellement sur GitHub avec le titre et la description ci-dessus.")
@@ -119,7 +114,7 @@ def main() -> None:
 
     # Push branch
     if not args.dry_run:
-        sh(f"git push -u origin {branch}")
+        run(["git", "push", "-u", "origin", branch])
 
     if args.open_pr and not args.dry_run:
         title = plan.get("title", branch)
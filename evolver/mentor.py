@@ -8,8 +8,15 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any
 
+try:  # Rust JSON encoder/decoder, used when installed
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
 
 ROOT = Path(__file__).resolve().parents[1]
+SKIP_DIRS = {".venv", "node_modules", "__pycache__"}
+_DOCSTRING_QUOTES = ("\"\"\"", "'''")
 
 
 @dataclass
@@ -28,12 +35,22 @@ def _read_text_if_exists(p: Path) -> str:
     return ""
 
 
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
 def _collect_files(base: Path, exts: List[str]) -> List[Path]:
     files: List[Path] = []
     if not base.exists():
         return files
-    for ext in exts:
-        files.extend(base.rglob(f"*{ext}"))
+    # One walk for all extensions instead of one rglob (full tree scan) per extension
+    suffixes = tuple(exts)
+    for dirpath, dirnames, filenames in os.walk(base):
+        # Vendored/generated trees are never patched: do not descend into them
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        files.extend(Path(dirpath) / n for n in filenames if n.endswith(suffixes))
     return files
 
 
@@ -58,8 +75,13 @@ def _propose_changes(files: List[Path]) -> List[Change]:
     for p in files:
         if p.suffix == ".py":
             try:
+                # The first bytes are enough to rule out most files; read the rest only to patch
+                with p.open("rb") as f:
+                    head = f.read(256).decode("utf-8", errors="ignore").lstrip()
+                if head.startswith(_DOCSTRING_QUOTES):
+                    continue
                 text = p.read_text(encoding="utf-8", errors="ignore")
-                if not text.lstrip().startswith(("\"\"\"", "'''")):
+                if not text.lstrip().startswith(_DOCSTRING_QUOTES):
                     new_first = f'"""Auto-added module docstring for {p.name}."""\n\n'
                     patch = "PATCH:WRITE\n" + (new_first + text)
                     rel = str(p.relative_to(ROOT))
@@ -112,7 +134,7 @@ def main() -> None:
 
     plan = generate_plan()
     out_path = Path(args.out)
-    out_path.write_text(json.dumps(plan, ensure_ascii=False, indent=2), encoding="utf-8")
+    out_path.write_bytes(_dumps(plan))
     print(f"Plan écrit: {out_path}")
 
 
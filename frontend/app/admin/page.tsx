@@ -21,7 +21,9 @@ import {
   runDiscover,
   runDiscoverAsync,
   getEvents,
+  subscribeEvents,
 } from "@/lib/api"
+import type { EventsItem } from "@/lib/api"
 import { BACKEND_URL } from "@/lib/api"
 import { KpiCard } from "@/components/admin/KpiCard"
 import { Tabs } from "@/components/admin/Tabs"
@@ -47,8 +49,15 @@ export default function AdminPage() {
   const [message, setMessage] = useState("")
   const [lastResult, setLastResult] = useState<any | null>(null)
   const [discoverQueries, setDiscoverQueries] = useState("")
-  const events = useQuery({ queryKey: ["events"], queryFn: () => getEvents(200), refetchInterval: 2000 })
-  const live = useQuery({ queryKey: ["events-live"], queryFn: () => getEvents(400), refetchInterval: 1000 })
+  // Initial page from /events, then new rows arrive over SSE; the slow refetch only resyncs after gaps
+  const events = useQuery({ queryKey: ["events"], queryFn: () => getEvents(200), refetchInterval: 60000 })
+  const live = useQuery({ queryKey: ["events-live"], queryFn: () => getEvents(400), refetchInterval: 60000 })
+  useEffect(() => subscribeEvents((e) => {
+    // Same newest-first order and size cap as the /events pages
+    const prepend = (limit: number) => (old?: { items: EventsItem[] }) => ({ ...old, items: [e, ...(old?.items || [])].slice(0, limit) })
+    qc.setQueryData(["events"], prepend(200))
+    qc.setQueryData(["events-live"], prepend(400))
+  }), [qc])
   const liveRef = useRef<HTMLUListElement | null>(null)
   useEffect(() => { const el = liveRef.current; if (el) el.scrollTop = el.scrollHeight }, [live.data])
   const settings = useQuery({ queryKey: ["settings"], queryFn: async () => {
@@ -14,7 +14,7 @@ export interface Metrics {
 }
 export interface Job { task_id?: string; state?: string; status?: string; error?: string; [k: string]: any }
 export interface DocItem { url: string; title: string; date?: string|null; lang?: string|null; created_at?: string|null }
-export interface PaginatedDocs { items: DocItem[]; total: number; limit: number; offset: number; error?: string }
+export interface PaginatedDocs { items: DocItem[]; total: number; limit: number; offset: number; next_cursor?: number | null; error?: string }
 export interface SourceItem { id: number; url: string; kind?: string; created_at?: string }
 export interface EventsItem { ts: string; stage: string; level: string; message: string; meta: Record<string, any> }
 export interface SearchResult { query: string; answer: string; citations: { title: string; url: string }[]; confidence: number; sources: [string,string][]; error?: string }
@@ -105,6 +105,13 @@ export async function getEvents(limit = 100): Promise<{ items: EventsItem[] }> {
   return unwrap(api.get<{ items: EventsItem[] }>("/events", { params: { limit } }))
 }
 
+// Live events pushed by the backend (server-sent events); returns an unsubscribe function
+export function subscribeEvents(onEvent: (e: EventsItem) => void): () => void {
+  const es = new EventSource(`${BACKEND_URL}/events/stream`)
+  es.onmessage = (m) => { try { onEvent(JSON.parse(m.data)) } catch {} }
+  return () => es.close()
+}
+
 // Crawl / Index / Discover triggers (placeholder endpoints assumed)
 export async function runCrawl(limit = 50) { return safe(()=>unwrap(api.post("/crawl/run", { limit })), { status:"error" }) }
 export async function runIndex(batch = 50) { return safe(()=>unwrap(api.post("/index/run", { batch })), { status:"error" }) }
@@ -7,135 +7,409 @@ Usage :
 
 L'utilisateur peut poser des questions interactives. Saisissez "quit" pour
 terminer la session.
-Les logs seront enregistrés dans logs.json.
+Les logs seront ajoutés à logs.jsonl (un objet JSON par ligne).
 """
 
 from __future__ import annotations
 
+import atexit
+import hashlib
 import json
 import math
+import multiprocessing as mp
 import os
+import pickle
 import re
+import threading
 import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:  # Encodeur/décodeur JSON en Rust, utilisé s'il est installé
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - dépendance optionnelle
+    orjson = None  # type: ignore
 
 
 DATA_FILE = Path(__file__).resolve().parent / "dummy_data.json"
-LOG_FILE = Path(__file__).resolve().parent / "logs.json"
+LOG_FILE = Path(__file__).resolve().parent / "logs.jsonl"
+
+# Motifs compilés une fois : tokenize est appelé pour chaque document et chaque requête
+_BRACKET_RE = re.compile(r"【[^】]*】")
+_TOKEN_RE = re.compile(r"[a-zàâäéèêëïîôöùûüç]+")
+
+INDEX_CACHE_VERSION = 2  # à incrémenter si TfidfMatrix ou la pondération change
+
+# Sur option (INDEX_WORKERS > 1), build_index répartit les gros corpus sur plusieurs
+# processus ; en dessous de INDEX_PARALLEL_MIN_DOCS documents, le découpage coûte plus qu'il ne rapporte
+INDEX_PARALLEL_MIN_DOCS = int(os.getenv("INDEX_PARALLEL_MIN_DOCS", "1024"))
+INDEX_WORKERS = max(1, int(os.getenv("INDEX_WORKERS", "1")))
+
+# Pool gardé entre les reconstructions. Ses processus viennent d'un forkserver (ou de spawn),
+# jamais d'un fork du processus appelant, qui peut avoir d'autres threads (crawler, Flask) :
+# un fork pourrait hériter d'un verrou tenu par l'un d'eux et se bloquer.
+_index_pool: Optional[ProcessPoolExecutor] = None
+_index_pool_lock = threading.Lock()
+
+
+def _get_index_pool() -> ProcessPoolExecutor:
+    global _index_pool
+    with _index_pool_lock:
+        if _index_pool is None:
+            method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+            _index_pool = ProcessPoolExecutor(max_workers=INDEX_WORKERS, mp_context=mp.get_context(method))
+        return _index_pool
+
+
+def _discard_index_pool() -> None:
+    global _index_pool
+    with _index_pool_lock:
+        pool, _index_pool = _index_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_discard_index_pool)
 
 
 def load_documents() -> List[Dict[str, str]]:
     """Charge les documents factices à partir du fichier JSON."""
+    if orjson is not None:
+        return orjson.loads(DATA_FILE.read_bytes())
     with open(DATA_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
 def tokenize(text: str) -> List[str]:
     """Tokenise le texte en mots minuscules en retirant les caractères non alphanumériques."""
-    # Remplace les tirets par des espaces et retire les caractères non alphabet/chiffre
-    text = text.lower()
-    # Supprime les balises ou crochets comme 【†】 s'il y en a
-    text = re.sub(r"【[^】]*】", "", text)
-    tokens = re.findall(r"[a-zàâäéèêëïîôöùûüç]+", text)
-    return tokens
+    # Supprime les balises ou crochets comme 【†】 s'il y en a, puis extrait les mots
+    return _TOKEN_RE.findall(_BRACKET_RE.sub("", text.lower()))
+
+
+@dataclass
+class TfidfMatrix:
+    """Matrice TF-IDF creuse stockée par terme (CSC) : la colonne j liste les documents du terme j.
+
+    Les lignes (documents) sont normalisées L2 : les similarités cosinus d'une
+    requête valent X @ q, obtenues en additionnant les listes des termes de la
+    requête (quelques opérations NumPy au lieu d'une boucle Python par document).
+    """
 
+    vocab: Dict[str, int]
+    indptr: np.ndarray  # len(vocab) + 1 décalages dans indices/data
+    indices: np.ndarray  # identifiants de documents
+    data: np.ndarray  # poids TF-IDF normalisés (float32 : moitié moins de mémoire à parcourir)
+    num_docs: int
 
-def build_index(docs: List[Dict[str, str]]) -> Tuple[List[Dict], Dict[str, float]]:
+    def __len__(self) -> int:
+        return self.num_docs
+
+
+def term_counts(doc: Dict[str, str]) -> Tuple[Counter, int]:
+    """Occurrences de chaque terme du document (titre + contenu) et nombre total de tokens."""
+    tokens = tokenize(doc["title"] + " " + doc["content"])
+    return Counter(tokens), len(tokens)
+
+
+def _tfidf_weights(counts: Counter, length: int, idf: Dict[str, float]) -> Dict[str, float]:
+    """Vecteur TF-IDF (TF normalisé par la longueur) à partir des comptes de termes."""
+    length = length or 1
+    return {t: (c / length) * idf.get(t, 0.0) for t, c in counts.items()}
+
+
+def build_index(
+    docs: List[Dict[str, str]], doc_counts: Optional[List[Tuple[Counter, int]]] = None
+) -> Tuple[TfidfMatrix, Dict[str, float]]:
     """
     Construit un index TF-IDF simple pour une liste de documents.
 
-    Retourne une liste de vecteurs (dictionnaires mot→poids TF-IDF) et l'IDF global.
+    `doc_counts` (résultats de term_counts, dans l'ordre de `docs`) évite de
+    retokeniser les documents déjà vus lors d'une reconstruction.
+    Avec INDEX_WORKERS > 1 et au-delà de INDEX_PARALLEL_MIN_DOCS documents, la
+    tokenisation et la pondération sont réparties sur le pool de processus
+    partagé (résultat identique). Ces processus importent le module principal de
+    l'appelant, qui doit donc être importable sans effet de bord.
+    Retourne la matrice TF-IDF creuse (lignes normalisées) et l'IDF global.
     """
+    workers = min(INDEX_WORKERS, len(docs) // INDEX_PARALLEL_MIN_DOCS + 1)
+    # Jamais de pool depuis un processus du pool (import du module principal de l'appelant)
+    if workers > 1 and mp.parent_process() is None:
+        try:
+            return _build_index(docs, doc_counts, _get_index_pool(), workers)
+        except Exception:
+            # Pool indisponible ou cassé (environnement restreint…) : calcul dans ce processus
+            _discard_index_pool()
+    return _build_index(docs, doc_counts, None, 1)
+
+
+def _shards(items: List, n: int) -> List[List]:
+    """Découpe `items` en au plus n tranches contiguës."""
+    size = -(-len(items) // n) or 1
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _term_counts_shard(docs: List[Dict[str, str]]) -> List[Tuple[Counter, int]]:
+    return [term_counts(doc) for doc in docs]
+
+
+def _triplets_shard(
+    doc_counts: List[Tuple[Counter, int]], idf: Dict[str, float], vocab: Dict[str, int], first_doc: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rows, cols, vals = _triplets(doc_counts, idf, vocab, first_doc)
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64), np.asarray(vals, dtype=np.float32)
+
+
+def _build_index(
+    docs: List[Dict[str, str]],
+    doc_counts: Optional[List[Tuple[Counter, int]]],
+    pool: Optional[Executor],
+    workers: int,
+) -> Tuple[TfidfMatrix, Dict[str, float]]:
+    if doc_counts is None:
+        if pool is None:
+            doc_counts = [term_counts(doc) for doc in docs]
+        else:
+            doc_counts = [c for part in pool.map(_term_counts_shard, _shards(docs, workers)) for c in part]
     # Compte des documents contenant chaque terme
-    doc_freq: Dict[str, int] = {}
-    doc_tokens: List[List[str]] = []
-    for doc in docs:
-        tokens = tokenize(doc["title"] + " " + doc["content"])
-        doc_tokens.append(tokens)
-        unique_tokens = set(tokens)
-        for token in unique_tokens:
-            doc_freq[token] = doc_freq.get(token, 0) + 1
+    doc_freq = Counter(t for counts, _ in doc_counts for t in counts)
 
     # Calcul de l'IDF : log(N / df)
     num_docs = len(docs)
-    idf: Dict[str, float] = {}
-    for token, df in doc_freq.items():
-        idf[token] = math.log((num_docs + 1) / (df + 1)) + 1.0
-
-    # Construction des vecteurs TF-IDF pour chaque document
-    vectors: List[Dict[str, float]] = []
-    for tokens in doc_tokens:
-        tf: Dict[str, float] = {}
-        for token in tokens:
-            tf[token] = tf.get(token, 0) + 1
-        # Normalisation TF (division par longueur)
-        length = len(tokens) or 1
-        for token in tf:
-            tf[token] = tf[token] / length
-        # Combine TF et IDF
-        vec: Dict[str, float] = {}
-        for token, tf_val in tf.items():
-            vec[token] = tf_val * idf.get(token, 0.0)
-        vectors.append(vec)
-
-    return vectors, idf
+    idf: Dict[str, float] = {t: math.log((num_docs + 1) / (df + 1)) + 1.0 for t, df in doc_freq.items()}
+    vocab = {t: j for j, t in enumerate(doc_freq)}
+
+    if pool is None:
+        rows, cols, vals = _triplets_shard(doc_counts, idf, vocab, 0)
+    else:
+        # Tranches dans l'ordre des documents : les lignes restent croissantes une fois concaténées
+        parts = _shards(doc_counts, workers)
+        firsts = np.cumsum([0] + [len(p) for p in parts[:-1]]).tolist()
+        n = len(parts)
+        results = list(pool.map(_triplets_shard, parts, [idf] * n, [vocab] * n, firsts))
+        rows, cols, vals = (np.concatenate([r[i] for r in results]) for i in range(3))
+    return _to_csc(vocab, rows, cols, vals, num_docs), idf
+
+
+def _triplets(
+    doc_counts: List[Tuple[Counter, int]], idf: Dict[str, float], vocab: Dict[str, int], first_doc: int
+) -> Tuple[List[int], List[int], List[float]]:
+    """Triplets (document, terme, poids normalisé) des documents, numérotés à partir de `first_doc`."""
+    rows: List[int] = []
+    cols: List[int] = []
+    vals: List[float] = []
+    for i, (counts, length) in enumerate(doc_counts, start=first_doc):
+        vec = _tfidf_weights(counts, length, idf)
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        if norm == 0:
+            continue
+        for t, v in vec.items():
+            rows.append(i)
+            cols.append(vocab[t])
+            vals.append(v / norm)
+    return rows, cols, vals
+
+
+def _to_csc(vocab: Dict[str, int], rows: np.ndarray, cols: np.ndarray, vals: np.ndarray, num_docs: int) -> TfidfMatrix:
+    """Regroupe les triplets par terme ; le tri stable garde les documents croissants dans chaque colonne."""
+    order = np.argsort(cols, kind="stable")
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=len(vocab)), out=indptr[1:])
+    return TfidfMatrix(vocab=vocab, indptr=indptr, indices=rows[order], data=vals[order], num_docs=num_docs)
+
+
+def update_index(
+    doc_vecs: TfidfMatrix, idf: Dict[str, float], doc_counts: List[Tuple[Counter, int]]
+) -> Tuple[TfidfMatrix, Dict[str, float]]:
+    """
+    Ajoute des documents (leurs term_counts) à un index existant sans retraiter le corpus.
+
+    L'IDF des termes déjà connus n'est pas recalculé : il ne dérive que
+    lentement quand N augmente. Les nouveaux termes reçoivent l'IDF calculé sur
+    le nouveau N. Reconstruire périodiquement avec build_index pour resynchroniser.
+    """
+    num_docs = doc_vecs.num_docs + len(doc_counts)
+    idf = dict(idf)
+    vocab = dict(doc_vecs.vocab)
+    new_df = Counter(t for counts, _ in doc_counts for t in counts if t not in idf)
+    for t, df in new_df.items():
+        idf[t] = math.log((num_docs + 1) / (df + 1)) + 1.0
+        vocab[t] = len(vocab)
+    rows, cols, vals = _triplets(doc_counts, idf, vocab, doc_vecs.num_docs)
+    # Colonnes des entrées existantes, puis les nouvelles (documents plus grands : l'ordre reste croissant)
+    old_cols = np.repeat(np.arange(len(doc_vecs.vocab), dtype=np.int64), np.diff(doc_vecs.indptr))
+    matrix = _to_csc(
+        vocab,
+        np.concatenate([doc_vecs.indices, np.asarray(rows, dtype=np.int64)]),
+        np.concatenate([old_cols, np.asarray(cols, dtype=np.int64)]),
+        np.concatenate([doc_vecs.data, np.asarray(vals, dtype=np.float32)]),
+        num_docs,
+    )
+    return matrix, idf
+
+
+def _index_cache_file(digest: str) -> Path:
+    return DATA_FILE.parent / f".tfidf_cache_{digest}.pkl"
+
+
+def load_index(docs: List[Dict[str, str]]) -> Tuple[TfidfMatrix, Dict[str, float]]:
+    """
+    Comme build_index, mais réutilise l'index picklé sur disque si DATA_FILE n'a pas changé.
+
+    Le cache est nommé d'après le SHA-1 du fichier de données : un index périmé
+    n'est jamais relu. `docs` doit donc provenir de load_documents() ; pour un
+    corpus modifié en mémoire, appeler build_index directement.
+    """
+    try:
+        digest = hashlib.sha1(DATA_FILE.read_bytes() + str(INDEX_CACHE_VERSION).encode()).hexdigest()
+    except OSError:
+        return build_index(docs)
+    cache_file = _index_cache_file(digest)
+    try:
+        with open(cache_file, "rb") as f:
+            doc_vecs, idf = pickle.load(f)
+        if isinstance(doc_vecs, TfidfMatrix) and len(doc_vecs) == len(docs):
+            return doc_vecs, idf
+    except Exception:
+        pass
+    doc_vecs, idf = build_index(docs)
+    try:
+        tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((doc_vecs, idf), f, protocol=5)
+        os.replace(tmp, cache_file)
+        # Supprime les caches des versions précédentes du corpus
+        for old in DATA_FILE.parent.glob(".tfidf_cache_*.pkl"):
+            if old != cache_file:
+                old.unlink(missing_ok=True)
+    except Exception:
+        pass
+    return doc_vecs, idf
 
 
 def vectorize_query(query: str, idf: Dict[str, float]) -> Dict[str, float]:
     """Transforme une requête en vecteur TF-IDF selon l'IDF global."""
     tokens = tokenize(query)
-    tf: Dict[str, float] = {}
-    for t in tokens:
-        tf[t] = tf.get(t, 0) + 1
-    length = len(tokens) or 1
-    for t in tf:
-        tf[t] = tf[t] / length
-    vec: Dict[str, float] = {}
-    for token, tf_val in tf.items():
-        vec[token] = tf_val * idf.get(token, 0.0)
-    return vec
-
-
-def cosine_similarity(vec1: Dict[str, float], vec2: Dict[str, float]) -> float:
-    """Calcule la similarité cosinus entre deux vecteurs creux."""
-    # Produit scalaire
-    dot = 0.0
-    for token, v1 in vec1.items():
-        dot += v1 * vec2.get(token, 0.0)
+    return _tfidf_weights(Counter(tokens), len(tokens), idf)
+
+
+def cosine_similarity(
+    vec1: Dict[str, float],
+    vec2: Dict[str, float],
+    norm1: Optional[float] = None,
+    norm2: Optional[float] = None,
+) -> float:
+    """
+    Calcule la similarité cosinus entre deux vecteurs creux.
+
+    Les normes peuvent être fournies si elles sont déjà connues (constantes par
+    document) ; le produit scalaire parcourt le plus petit des deux vecteurs.
+    """
+    if not vec1 or not vec2:
+        return 0.0
     # Normes
-    norm1 = math.sqrt(sum(x * x for x in vec1.values()))
-    norm2 = math.sqrt(sum(x * x for x in vec2.values()))
+    if norm1 is None:
+        norm1 = math.sqrt(sum(x * x for x in vec1.values()))
+    if norm2 is None:
+        norm2 = math.sqrt(sum(x * x for x in vec2.values()))
     if norm1 == 0 or norm2 == 0:
         return 0.0
+    # Produit scalaire
+    small, large = (vec1, vec2) if len(vec1) <= len(vec2) else (vec2, vec1)
+    dot = sum(v * large.get(token, 0.0) for token, v in small.items())
     return dot / (norm1 * norm2)
 
 
-def query_documents(query: str, doc_vecs: List[Dict[str, float]], idf: Dict[str, float], docs: List[Dict[str, str]], k: int = 3, threshold: float = 0.1) -> List[Tuple[float, Dict[str, str]]]:
+def _query_postings(query_vec: Dict[str, float], doc_vecs: TfidfMatrix) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(documents, contributions) de chaque terme de la requête présent dans l'index."""
+    norm = math.sqrt(sum(x * x for x in query_vec.values()))
+    if norm == 0:
+        return []
+    postings = []
+    for t, w in query_vec.items():
+        j = doc_vecs.vocab.get(t)
+        if j is None or not w:
+            continue
+        lo, hi = doc_vecs.indptr[j], doc_vecs.indptr[j + 1]
+        postings.append((doc_vecs.indices[lo:hi], (w / norm) * doc_vecs.data[lo:hi]))
+    return postings
+
+
+def score_documents(query_vec: Dict[str, float], doc_vecs: TfidfMatrix) -> np.ndarray:
+    """Similarité cosinus de la requête avec chaque document (X @ q)."""
+    scores = np.zeros(doc_vecs.num_docs, dtype=np.float64)
+    for ids, contrib in _query_postings(query_vec, doc_vecs):
+        # Un document apparaît au plus une fois par colonne : += indexé est sûr
+        scores[ids] += contrib
+    return scores
+
+
+def score_candidates(query_vec: Dict[str, float], doc_vecs: TfidfMatrix) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Documents partageant au moins un terme avec la requête (triés) et leurs scores.
+
+    Le coût dépend de la longueur des listes de la requête, pas du nombre de
+    documents : les autres ont un score nul.
+    """
+    postings = _query_postings(query_vec, doc_vecs)
+    if not postings:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ids, inverse = np.unique(np.concatenate([p[0] for p in postings]), return_inverse=True)
+    # Sommes dans l'ordre des termes, comme score_documents
+    scores = np.bincount(inverse, weights=np.concatenate([p[1] for p in postings]), minlength=ids.size)
+    return ids, scores
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions des k meilleurs scores, décroissants ; à score égal, l'ordre d'origine est conservé."""
+    # Top-k par partition (O(N)) puis tri des k retenus seulement (comme l'ancien tri stable)
+    if scores.size > k:
+        kth = np.partition(scores, scores.size - k)[scores.size - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[: k - above.size]
+        top = np.concatenate([above, ties])
+        return top[np.argsort(-scores[top], kind="stable")]
+    return np.argsort(-scores, kind="stable")
+
+
+def query_documents(
+    query: str,
+    doc_vecs: TfidfMatrix,
+    idf: Dict[str, float],
+    docs: List[Dict[str, str]],
+    k: int = 3,
+    threshold: float = 0.1,
+    query_vec: Optional[Dict[str, float]] = None,
+) -> List[Tuple[float, Dict[str, str]]]:
     """
     Retourne les k documents les plus similaires à la requête, avec un seuil minimal.
 
-    Paramètres :
-    - query : texte de la requête
-    - doc_vecs : vecteurs TF-IDF des documents
-    - idf : dictionnaire IDF global
-    - docs : documents originaux
-    - k : nombre maximum de résultats
-    - threshold : seuil de similarité minimale pour retenir un document
+    Paramètres :
+    - query : texte de la requête
+    - doc_vecs : matrice TF-IDF des documents (voir build_index)
+    - idf : dictionnaire IDF global
+    - docs : documents originaux
+    - k : nombre maximum de résultats
+    - threshold : seuil de similarité minimale pour retenir un document
+    - query_vec : vecteur de la requête déjà calculé avec ce même idf (sinon calculé ici)
     """
-    query_vec = vectorize_query(query, idf)
-    scores: List[Tuple[float, int]] = []
-    for idx, doc_vec in enumerate(doc_vecs):
-        score = cosine_similarity(query_vec, doc_vec)
-        scores.append((score, idx))
-    # Trier par score décroissant
-    scores.sort(reverse=True, key=lambda x: x[0])
-    selected: List[Tuple[float, Dict[str, str]]] = []
-    for score, idx in scores[:k]:
-        if score >= threshold:
-            selected.append((score, docs[idx]))
-    return selected
+    if k <= 0 or not len(doc_vecs):
+        return []
+    if query_vec is None:
+        query_vec = vectorize_query(query, idf)
+    if threshold > 0:
+        # Un document sans terme commun (score nul) ne peut pas passer le seuil
+        ids, scores = score_candidates(query_vec, doc_vecs)
+    else:
+        scores = score_documents(query_vec, doc_vecs)
+        ids = np.arange(scores.size)
+    top = _top_k(scores, k)
+    return [(float(scores[pos]), docs[ids[pos]]) for pos in top.tolist() if scores[pos] >= threshold]
 
 
 def generate_answer(query: str, selected_docs: List[Tuple[float, Dict[str, str]]]) -> Tuple[str, List[str]]:
@@ -157,30 +431,36 @@ def generate_answer(query: str, selected_docs: List[Tuple[float, Dict[str, str]]
 
 
 def load_logs() -> List[Dict]:
-    """Charge les logs existants depuis le fichier."""
+    """Charge les logs existants depuis le fichier (JSON Lines, lignes invalides ignorées)."""
+    logs: List[Dict] = []
     if LOG_FILE.exists():
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
-
-
-def save_logs(logs: List[Dict]) -> None:
-    """Écrit les logs au format JSON."""
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(logs, f, ensure_ascii=False, indent=2)
+        loads = orjson.loads if orjson is not None else json.loads
+        with open(LOG_FILE, "rb") as f:
+            for line in f:
+                try:
+                    logs.append(loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return logs
+
+
+def append_log(entry: Dict) -> None:
+    """Ajoute une entrée en fin de fichier : seule la nouvelle ligne est écrite."""
+    if orjson is not None:
+        line = orjson.dumps(entry) + b"\n"
+    else:
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    with open(LOG_FILE, "ab") as f:
+        f.write(line)
 
 
 def main():
     print("==== Prototype IA Auto‑Évolutive ====")
     print("Posez une question (ou tapez 'quit' pour terminer) :")
     docs = load_documents()
-    doc_vecs, idf = build_index(docs)
+    doc_vecs, idf = load_index(docs)
     # Paramètre évolutif : seuil de similarité
     threshold = 0.1
-    logs = load_logs()
     while True:
         try:
             query = input("> ")
@@ -210,7 +490,7 @@ def main():
             print("Sources : aucune")
         print(f"Temps de réponse : {elapsed:.3f} s | Seuil actuel : {threshold:.2f}")
         # Enregistre le log
-        logs.append(
+        append_log(
             {
                 "timestamp": datetime.utcnow().isoformat() + "Z",
                 "question": query,
@@ -221,7 +501,6 @@ def main():
                 "threshold": threshold,
             }
         )
-        save_logs(logs)
     print("Session terminée. Merci d'avoir utilisé le prototype IA auto‑évolutive !")
 
 
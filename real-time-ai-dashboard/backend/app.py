@@ -1,18 +1,31 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import List, Optional
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import json
 
 import socketio
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, create_engine, func, select
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text, create_engine, func, select
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, Session
 from sqlalchemy.sql import text
 from pgvector.sqlalchemy import Vector
 
+try:  # Rust JSON encoder/decoder, used when installed
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
 try:
     from openai import OpenAI  # type: ignore
 except Exception:  # pragma: no cover
@@ -24,6 +37,12 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    HNSW_EF_SEARCH: int = 40
+    EMBED_CACHE_SIZE: int = 4096
+    EMBED_BATCH_SIZE: int = 256
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    METRICS_TTL: float = 2.0
 
 
 settings = Settings()
@@ -52,15 +71,30 @@ class Document(Base):
     published_at: Mapped[dt.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     embedding: Mapped[List[float] | None] = mapped_column(Vector(1536), nullable=True)
-
-
-engine = create_engine(settings.DATABASE_URL, future=True)
+    # ||embedding||, stored once so inner-product/rerank paths need not recompute it per row
+    embedding_norm: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    future=True,
+)
 with engine.begin() as conn:
     try:
         conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
     except Exception:
         pass
 Base.metadata.create_all(engine)
+with engine.begin() as conn:
+    # create_all does not add columns to an existing table. A nullable column without a
+    # default is a catalog-only change; the back-fill runs in migrate.py.
+    conn.exec_driver_sql("ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_norm double precision")
+# The HNSW index on documents.embedding is built by `python migrate.py` (CREATE INDEX
+# CONCURRENTLY), not here: a plain CREATE INDEX at import would block writes in every web process.
 
 
 sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
@@ -74,39 +108,88 @@ class AskResponse(BaseModel):
     sources: List[dict]
 
 
+# One client for the process: keeps the HTTPS connection pool warm across requests
+_openai_client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY and OpenAI is not None else None
+
+# Content-hash LRU: re-ingesting an unchanged document skips the embedding call
+_embed_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_embed_lock = threading.Lock()
+
+
+def _embed_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _embed_many(texts: List[str]) -> List[Optional[List[float]]]:
+    """Embed several texts, one API call per EMBED_BATCH_SIZE cache misses."""
+    out: List[Optional[List[float]]] = [None] * len(texts)
+    missing: "OrderedDict[str, List[int]]" = OrderedDict()
+    with _embed_lock:
+        for i, t in enumerate(texts):
+            key = _embed_key(t)
+            hit = _embed_cache.get(key)
+            if hit is not None:
+                _embed_cache.move_to_end(key)
+                out[i] = hit
+            else:
+                missing.setdefault(key, []).append(i)
+    if not missing or _openai_client is None:
+        return out
+    keys = list(missing)
+    step = max(1, settings.EMBED_BATCH_SIZE)
+    for start in range(0, len(keys), step):
+        chunk = keys[start : start + step]
+        try:
+            resp = _openai_client.embeddings.create(
+                model=settings.EMBEDDING_MODEL, input=[texts[missing[k][0]] for k in chunk]
+            )
+        except Exception:
+            continue
+        with _embed_lock:
+            for k, item in zip(chunk, sorted(resp.data, key=lambda d: d.index)):
+                vec = list(item.embedding)
+                for i in missing[k]:
+                    out[i] = vec
+                _embed_cache[k] = vec
+                _embed_cache.move_to_end(k)
+            while len(_embed_cache) > settings.EMBED_CACHE_SIZE:
+                _embed_cache.popitem(last=False)
+    return out
+
+
 def _embed(text: str) -> Optional[List[float]]:
-    if not settings.OPENAI_API_KEY or OpenAI is None:
-        return None
-    try:
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        resp = client.embeddings.create(model=settings.EMBEDDING_MODEL, input=text)
-        return list(resp.data[0].embedding)
-    except Exception:
-        return None
+    return _embed_many([text])[0]
+
+
+def _norm(emb: Optional[List[float]]) -> Optional[float]:
+    return math.sqrt(sum(x * x for x in emb)) if emb is not None else None
+
+
+_METRICS_SQL = text(
+    """
+    SELECT s.nb_docs, s.avg_fresh, l.title, l.created_at, (SELECT count(*) FROM sources) AS nb_sources
+    FROM (
+        -- avg freshness = mean age in days, computed where the rows live
+        SELECT count(*) AS nb_docs,
+               (avg(extract(epoch FROM now() - created_at)) / 86400)::float8 AS avg_fresh
+        FROM documents
+    ) s
+    LEFT JOIN LATERAL (
+        SELECT title, created_at FROM documents ORDER BY created_at DESC NULLS LAST LIMIT 1
+    ) l ON true
+    """
+)
 
 
 def _metrics(session: Session):
-    nb_docs = session.scalar(select(func.count()).select_from(Document)) or 0
-    last_doc = session.execute(select(Document.title, Document.created_at).order_by(Document.created_at.desc()).limit(1)).first()
-    last_title = last_doc[0] if last_doc else None
-    last_date = last_doc[1].isoformat() if last_doc else None
-    # avg freshness = mean age in days
-    now = dt.datetime.now(dt.timezone.utc)
-    docs = session.execute(select(Document.created_at)).all()
-    if docs:
-        ages = []
-        for (created_at,) in docs:
-            if created_at is None:
-                continue
-            delta = now - created_at
-            ages.append(delta.total_seconds() / 86400.0)
-        avg_fresh = sum(ages) / max(1, len(ages)) if ages else None
-    else:
-        avg_fresh = None
+    # Single round-trip: counts, latest document and average age together
+    nb_docs, avg_fresh, last_title, last_created, nb_sources = session.execute(_METRICS_SQL).one()
+    last_date = last_created.isoformat() if last_created else None
     # eval score placeholder
     eval_score = None
     return {
-        "nb_docs_total": nb_docs,
+        "nb_docs_total": nb_docs or 0,
+        "nb_sources_total": nb_sources or 0,
         "last_doc_title": last_title,
         "last_doc_date": last_date,
         "avg_freshness": avg_fresh,
@@ -114,6 +197,22 @@ def _metrics(session: Session):
     }
 
 
+# (computed_at, payload): dashboards poll every second, metrics can be a couple of seconds old
+_metrics_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+def _current_metrics(fresh: bool = False) -> Dict[str, Any]:
+    global _metrics_cache
+    now = time.monotonic()
+    cached = _metrics_cache
+    if not fresh and cached is not None and now - cached[0] < settings.METRICS_TTL:
+        return cached[1]
+    with Session(engine) as session:
+        data = _metrics(session)
+    _metrics_cache = (now, data)
+    return data
+
+
 @fastapi.post("/ask", response_model=AskResponse)
 def ask(q: str = Query(..., description="user query")):
     with Session(engine) as session:
@@ -122,9 +221,14 @@ def ask(q: str = Query(..., description="user query")):
         if qvec is None:
             docs = session.execute(select(Document).order_by(Document.created_at.desc()).limit(6)).scalars().all()
         else:
+            # Transaction-local, so pooled connections keep the server default
+            session.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(settings.HNSW_EF_SEARCH)})
             rows = session.execute(
-                text("SELECT id, title, url, content FROM documents WHERE embedding IS NOT NULL ORDER BY embedding <-> :qvec LIMIT 6"),
-                {"qvec": qvec},
+                text(
+                    "SELECT id, title, url, content FROM documents WHERE embedding IS NOT NULL "
+                    "ORDER BY embedding <-> CAST(:qvec AS vector) LIMIT 6"
+                ),
+                {"qvec": "[" + ",".join(map(str, qvec)) + "]"},
             ).all()
             docs = [Document(id=r.id, title=r.title, url=r.url, content=r.content) for r in rows]  # type: ignore[arg-type]
         if not docs:
@@ -142,20 +246,18 @@ def ask(q: str = Query(..., description="user query")):
 
 @fastapi.get("/metrics")
 def metrics():
-    with Session(engine) as session:
-        m = _metrics(session)
-        return {
-            "nb_docs": m["nb_docs_total"],
-            "nb_sources": session.scalar(select(func.count()).select_from(Source)) or 0,
-            "last_update": m["last_doc_date"],
-            "avg_freshness": m["avg_freshness"],
-        }
+    m = _current_metrics()
+    return {
+        "nb_docs": m["nb_docs_total"],
+        "nb_sources": m["nb_sources_total"],
+        "last_update": m["last_doc_date"],
+        "avg_freshness": m["avg_freshness"],
+    }
 
 
 @fastapi.get("/realtime/metrics")
 def realtime_metrics():
-    with Session(engine) as session:
-        return _metrics(session)
+    return _current_metrics()
 
 
 @fastapi.get("/docs/latest")
@@ -190,15 +292,15 @@ def sources_add(body: SourceIn):
         return {"id": s.id}
 
 
-async def broadcast_metrics():
-    with Session(engine) as session:
-        data = _metrics(session)
+async def broadcast_metrics(fresh: bool = True):
+    # After an ingest the numbers must include the new document; a new client can take the cached ones
+    data = _current_metrics(fresh=fresh)
     await sio.emit("metrics", data)
 
 
 @sio.event
 async def connect(sid, environ):
-    await broadcast_metrics()
+    await broadcast_metrics(fresh=False)
 
 
 class IngestIn(BaseModel):
@@ -211,23 +313,61 @@ class IngestIn(BaseModel):
 async def ingest(body: IngestIn):
     with Session(engine) as session:
         emb = _embed(body.title + "\n\n" + body.content)
-        d = Document(title=body.title, url=body.url, content=body.content, embedding=emb)
+        d = Document(title=body.title, url=body.url, content=body.content, embedding=emb, embedding_norm=_norm(emb))
         session.add(d)
         session.commit()
     await broadcast_metrics()
     return {"status": "ok", "id": d.id}
 
 
+def _store_batch(body: List[IngestIn]) -> List[int]:
+    # Blocking part of /ingest/batch (OpenAI call + commit), run off the event loop
+    embs = _embed_many([b.title + "\n\n" + b.content for b in body])
+    with Session(engine) as session:
+        docs = [
+            Document(title=b.title, url=b.url, content=b.content, embedding=e, embedding_norm=_norm(e))
+            for b, e in zip(body, embs)
+        ]
+        session.add_all(docs)
+        session.commit()
+        return [d.id for d in docs]
+
+
+@fastapi.post("/ingest/batch")
+async def ingest_batch(body: List[IngestIn]):
+    # Same as /ingest for many documents: batched embeddings, one commit, one broadcast
+    ids = await run_in_threadpool(_store_batch, body)
+    if ids:
+        await broadcast_metrics()
+    return {"status": "ok", "ids": ids}
+
+
+def _stream_json_array(path: Path) -> Iterator[bytes]:
+    # JSON Lines -> JSON array, one line at a time (the history is never held in memory)
+    yield b"["
+    first = True
+    with path.open("rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield line if first else b"," + line
+            first = False
+    yield b"]"
+
+
 @fastapi.get("/evolver/history")
 def evolver_history():
-    # Serve evolver/history.json if present
-    from pathlib import Path
-
+    # Serve evolver/history.jsonl (or a legacy history.json) if present
     repo_root = Path(__file__).resolve().parents[2]
-    history_path = repo_root / "real-time-ai-dashboard" / "evolver" / "history.json"
+    history_path = repo_root / "real-time-ai-dashboard" / "evolver" / "history.jsonl"
     if history_path.exists():
+        return StreamingResponse(_stream_json_array(history_path), media_type="application/json")
+    legacy_path = history_path.with_suffix(".json")
+    if legacy_path.exists():
         try:
-            return json.loads(history_path.read_text(encoding="utf-8"))
+            data = legacy_path.read_bytes()
+            return orjson.loads(data) if orjson is not None else json.loads(data)
         except Exception:
             return []
     return []
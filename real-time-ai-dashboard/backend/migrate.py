@@ -0,0 +1,74 @@
+"""One-shot schema migrations that are too slow for the web processes' startup.
+
+Building the HNSW index or back-filling `embedding_norm` on a populated table
+can take minutes, so neither runs when `app` is imported. Run this module as a
+job instead (from the backend directory, e.g. `docker compose run --rm backend
+python migrate.py`).
+
+The index is built with `CREATE INDEX CONCURRENTLY`, so writes to `documents`
+keep flowing meanwhile, and the back-fill commits in small batches.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from sqlalchemy import text
+
+from app import engine
+
+INDEX_NAME = "documents_embedding_hnsw"
+NORM_BACKFILL_BATCH = int(os.getenv("NORM_BACKFILL_BATCH", "1000"))
+
+
+def _index_state(conn) -> Optional[bool]:
+    """None if the index is missing, else whether it is valid."""
+    row = conn.execute(
+        text("SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"),
+        {"name": INDEX_NAME},
+    ).first()
+    return None if row is None else bool(row[0])
+
+
+def ensure_hnsw_index(conn) -> None:
+    """ANN index for the `ORDER BY embedding <-> :qvec` lookup in /ask."""
+    state = _index_state(conn)
+    if state is True:
+        return
+    if state is False:
+        # Leftover from an interrupted concurrent build; rebuild it
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+    conn.exec_driver_sql(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON documents USING hnsw (embedding vector_l2_ops)"
+    )
+
+
+def backfill_embedding_norms(conn) -> int:
+    """Store ||embedding|| on rows ingested before the column existed; returns how many were filled."""
+    total = 0
+    while True:
+        # Each batch commits on its own (autocommit): no long-held row locks
+        filled = conn.execute(
+            text(
+                "UPDATE documents SET embedding_norm = vector_norm(embedding) WHERE id IN ("
+                "SELECT id FROM documents WHERE embedding_norm IS NULL AND embedding IS NOT NULL LIMIT :n)"
+            ),
+            {"n": NORM_BACKFILL_BATCH},
+        ).rowcount
+        total += filled
+        if not filled:
+            return total
+
+
+def main() -> int:
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        ensure_hnsw_index(conn)
+        filled = backfill_embedding_norms(conn)
+    print(f"[migrate] index {INDEX_NAME} ready; embedding_norm filled on {filled} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
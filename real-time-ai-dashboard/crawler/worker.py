@@ -4,17 +4,45 @@ import datetime as dt
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set, Tuple
 
+import redis
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from celery import Celery
 
+try:  # lexbor (C) HTML5 parser, several times faster than BeautifulSoup
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    LexborHTMLParser = None  # type: ignore
+
+try:  # C-backed tree builder for the BeautifulSoup fallback
+    import lxml  # type: ignore  # noqa: F401
+
+    _BS_PARSER = "lxml"
+except Exception:  # pragma: no cover - optional dependency
+    _BS_PARSER = "html.parser"
+
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8080")
 ALLOWED_SOURCES = os.getenv("ALLOWLIST", "/app/crawler/allowlist.yaml")
+SKIP_TAGS = ["script", "style", "noscript"]
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "32"))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "16"))
+# Feed entries already sent to the backend (sorted set: url -> time sent), forgotten after SEEN_TTL
+SEEN_KEY = "crawler:seen_urls"
+SEEN_TTL = int(os.getenv("SEEN_URL_TTL", str(30 * 86400)))
+
+# Shared by the crawl threads so connections to the same hosts are reused
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+_redis_client: Optional[redis.Redis] = None
 
 celery_app = Celery("crawler", broker=REDIS_URL, backend=REDIS_URL)
 # Schedule crawl every 5 minutes
@@ -37,45 +65,108 @@ def load_allowlist() -> List[dict]:
 
 
 def extract_text_html(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    # remove script/style
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    text = soup.get_text(separator=" ")
+    """Visible text of the page body, whitespace-collapsed."""
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(SKIP_TAGS)
+        node = tree.body or tree.root
+        text = node.text(separator=" ") if node is not None else ""
+    else:
+        soup = BeautifulSoup(html, _BS_PARSER)
+        # remove script/style
+        for tag in soup(SKIP_TAGS):
+            tag.decompose()
+        text = (soup.body or soup).get_text(separator=" ")
     return " ".join(text.split())
 
 
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _redis_client
+
+
+def _seen_urls(urls: List[str]) -> Set[str]:
+    """URLs among `urls` already ingested within SEEN_TTL (none if Redis is unreachable)."""
+    if not urls:
+        return set()
+    try:
+        scores = _get_redis().zmscore(SEEN_KEY, urls)
+    except Exception:
+        return set()
+    cutoff = time.time() - SEEN_TTL
+    return {u for u, sc in zip(urls, scores) if sc is not None and sc >= cutoff}
+
+
+def _mark_seen(urls: Iterable[str]) -> None:
+    now = time.time()
+    mapping = {u: now for u in urls}
+    if not mapping:
+        return
+    try:
+        pipe = _get_redis().pipeline(transaction=False)
+        pipe.zadd(SEEN_KEY, mapping)
+        pipe.zremrangebyscore(SEEN_KEY, "-inf", now - SEEN_TTL)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _source_items(src: dict) -> List[Tuple[str, str, int, bool]]:
+    """(url, title, timeout, is_feed_entry) of the pages to fetch for one allowlist entry."""
+    url = src.get("url")
+    typ = src.get("type", "html")
+    try:
+        if typ == "rss":
+            # naive: fetch RSS and then items
+            import feedparser  # type: ignore
+
+            r = _session.get(url, timeout=20)
+            feed = feedparser.parse(r.content)
+            return [(entry.link, entry.title, 15, True) for entry in feed.entries[:10]]
+        # html/api: living pages, re-crawled every run
+        return [(url, src.get("title") or url, 20, False)]
+    except Exception as e:
+        print(json.dumps({"level": "error", "msg": "crawl_failed", "url": url, "error": str(e)}))
+        return []
+
+
+def _fetch_doc(url: str, title: str, timeout: int) -> Optional[dict]:
+    try:
+        r = _session.get(url, timeout=timeout)
+        return {"title": title, "url": url, "content": extract_text_html(r.text)}
+    except Exception as e:
+        print(json.dumps({"level": "error", "msg": "crawl_failed", "url": url, "error": str(e)}))
+        return None
+
+
 @celery_app.task(name="crawl_once")
 def crawl_once():
     sources = load_allowlist()
-    for src in sources:
-        url = src.get("url")
-        typ = src.get("type", "html")
-        try:
-            if typ == "rss":
-                # naive: fetch RSS and then items
-                import feedparser  # type: ignore
-
-                feed = feedparser.parse(url)
-                for entry in feed.entries[:10]:
-                    link = entry.link
-                    r = requests.get(link, timeout=15)
-                    content = extract_text_html(r.text)
-                    _send_doc(title=entry.title, url=link, content=content)
-            else:  # html/api
-                r = requests.get(url, timeout=20)
-                content = extract_text_html(r.text)
-                title = src.get("title") or url
-                _send_doc(title=title, url=url, content=content)
-        except Exception as e:
-            print(json.dumps({"level": "error", "msg": "crawl_failed", "url": url, "error": str(e)}))
-    return {"status": "ok"}
-
-
-def _send_doc(title: str, url: str, content: str):
+    # IO-bound: feeds, then pages, are fetched concurrently (wall time ~ slowest request)
+    with ThreadPoolExecutor(max_workers=max(1, CRAWL_CONCURRENCY)) as ex:
+        items = [item for batch in ex.map(_source_items, sources) for item in batch]
+        # Feed entries are immutable articles: skip those already ingested on a previous run
+        entries = {it[0] for it in items if it[3]}
+        seen = _seen_urls(sorted(entries))
+        items = [it for it in items if it[0] not in seen]
+        docs = [d for d in ex.map(lambda it: _fetch_doc(*it[:3]), items) if d is not None]
+    for start in range(0, len(docs), INGEST_BATCH_SIZE):
+        batch = docs[start : start + INGEST_BATCH_SIZE]
+        if _send_docs(batch):
+            _mark_seen(d["url"] for d in batch if d["url"] in entries)
+    return {"status": "ok", "skipped": len(seen)}
+
+
+def _send_docs(docs: List[dict]) -> bool:
+    # One /ingest/batch call per chunk: the backend embeds the chunk in a single API request
     try:
-        payload = {"title": title, "url": url, "content": content}
-        requests.post(f"{BACKEND_URL}/ingest", json=payload, timeout=20)
-        print(json.dumps({"level": "info", "msg": "doc_sent", "title": title, "url": url}))
+        r = _session.post(f"{BACKEND_URL}/ingest/batch", json=docs, timeout=60)
+        r.raise_for_status()
+        for d in docs:
+            print(json.dumps({"level": "info", "msg": "doc_sent", "title": d["title"], "url": d["url"]}))
+        return True
     except Exception as e:
-        print(json.dumps({"level": "error", "msg": "send_failed", "url": url, "error": str(e)}))
+        print(json.dumps({"level": "error", "msg": "send_failed", "urls": [d["url"] for d in docs], "error": str(e)}))
+        return False
@@ -7,16 +7,55 @@ import os
 import subprocess
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 
 import requests
 
+try:  # libgit2 bindings: branch/apply/commit in-process instead of one git fork per step
+    import pygit2  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    pygit2 = None  # type: ignore
+
+try:  # Rust JSON encoder/decoder, used when installed
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
 
 def run(cmd: List[str], cwd: Optional[Path] = None, check: bool = True) -> subprocess.CompletedProcess:
     print("[evolver] $", " ".join(cmd))
     return subprocess.run(cmd, cwd=str(cwd) if cwd else None, check=check, capture_output=True, text=True)
 
 
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def _dumps_line(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return json.dumps(obj).encode("utf-8") + b"\n"
+
+
+def _migrate_history(history_path: Path) -> None:
+    """Convert a legacy history.json (one JSON list) next to `history_path` into JSON Lines."""
+    legacy = history_path.with_suffix(".json")
+    if history_path.exists() or not legacy.exists():
+        return
+    try:
+        entries = _loads(legacy.read_bytes())
+    except Exception:
+        entries = []
+    history_path.write_bytes(b"".join(_dumps_line(e) for e in entries if isinstance(e, dict)))
+    legacy.unlink()
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
 def gather_sources(root: Path) -> List[Path]:
     """Collect backend and crawler sources to analyze."""
     files: List[Path] = []
@@ -47,15 +86,29 @@ def openai_propose_patch(prompt: str, api_key: str, model: str = "gpt-4o-mini")
     return (resp.choices[0].message.content or "").strip()
 
 
+PROMPT_FILE_CHARS = 8000
+
+
+def _size_key(p: Path) -> Tuple[int, str]:
+    try:
+        size = p.stat().st_size
+    except OSError:
+        size = 0
+    return size, p.as_posix()
+
+
 def build_prompt(root: Path, files: List[Path]) -> str:
     parts = [
         "Propose a small, safe improvement to performance/refactor or add a tiny endpoint.",
         "Return ONLY a single unified diff patch (git format), no extra prose.",
         "Use correct file paths relative to repository root.",
     ]
-    for p in files[:20]:
+    # Smallest files first (stable order), so more whole files fit in the prompt
+    for p in sorted(files, key=_size_key)[:20]:
         try:
-            text = p.read_text(encoding="utf-8")[:8000]
+            # Only the head is used: read at most 4 bytes per kept character
+            with open(p, "rb") as f:
+                text = f.read(4 * PROMPT_FILE_CHARS).decode("utf-8", errors="ignore")[:PROMPT_FILE_CHARS]
         except Exception:
             continue
         rel = p.relative_to(root).as_posix()
@@ -63,15 +116,54 @@ def build_prompt(root: Path, files: List[Path]) -> str:
     return "\n".join(parts)
 
 
+def _write_patch(repo: Path, patch_text: str, branch: str) -> Path:
+    patch_file = repo / "real-time-ai-dashboard" / "evolver" / "patches" / f"{branch}.diff"
+    # Branch names like auto-update/20250101 contain a slash
+    patch_file.parent.mkdir(parents=True, exist_ok=True)
+    patch_file.write_text(patch_text, encoding="utf-8")
+    return patch_file
+
+
+def _commit_with_pygit2(repo: Path, patch_text: str, branch: str) -> Optional[Path]:
+    """fetch/checkout -b/apply/add -A/commit through libgit2; push is left to git."""
+    r = pygit2.Repository(str(repo))
+    try:
+        r.remotes["origin"].fetch()
+    except Exception as e:  # same as `git fetch` with check=False
+        print("[evolver] fetch failed:", e)
+    r.checkout(r.branches.local.create(branch, r.head.peel(pygit2.Commit)))
+    patch_file = _write_patch(repo, patch_text, branch)
+    try:
+        r.apply(pygit2.Diff.parse_diff(patch_text))
+    except pygit2.GitError as e:
+        print("[evolver] git apply failed:\n", e)
+        return None
+    r.index.add_all()
+    r.index.write()
+    sig = r.default_signature
+    r.create_commit("HEAD", sig, sig, f"AI-EVOLVER: {branch}", r.index.write_tree(), [r.head.target])
+    return patch_file
+
+
 def create_branch_and_apply(repo: Path, patch_text: str, branch: str) -> Optional[str]:
+    if pygit2 is not None:
+        try:
+            patch_file = _commit_with_pygit2(repo, patch_text, branch)
+            if patch_file is None:
+                return None
+            run(["git", "push", "-u", "origin", branch], cwd=repo)
+            return str(patch_file)
+        except subprocess.CalledProcessError as e:
+            print("[evolver] git error:", e.stderr)
+            return None
+        except Exception as e:
+            print("[evolver] git error:", e)
+            return None
     try:
         run(["git", "fetch", "origin"], cwd=repo, check=False)
         run(["git", "checkout", "-b", branch], cwd=repo)
         # Write patch to file
-        patches_dir = repo / "real-time-ai-dashboard" / "evolver" / "patches"
-        patches_dir.mkdir(parents=True, exist_ok=True)
-        patch_file = patches_dir / f"{branch}.diff"
-        patch_file.write_text(patch_text, encoding="utf-8")
+        patch_file = _write_patch(repo, patch_text, branch)
         # Try to apply
         apply = run(["git", "apply", str(patch_file)], cwd=repo, check=False)
         if apply.returncode != 0:
@@ -134,24 +226,20 @@ def main():
     if gh_token and repo_full:
         pr_json = create_pr(branch, gh_token, repo_full, title=f"AI Evolver {today}", body=f"Patch: {Path(patch_file).name}")
 
-    history_path = rt_root / "evolver" / "history.json"
+    history_path = rt_root / "evolver" / "history.jsonl"
     history_path.parent.mkdir(parents=True, exist_ok=True)
-    history = []
-    if history_path.exists():
-        try:
-            history = json.loads(history_path.read_text(encoding="utf-8"))
-        except Exception:
-            history = []
+    _migrate_history(history_path)
     entry = {
         "timestamp": dt.datetime.utcnow().isoformat() + "Z",
         "branch": branch,
         "patch_file": str(Path(patch_file).relative_to(repo)) if patch_file else None,
         "pr": pr_json,
     }
-    history.append(entry)
-    history_path.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    # Append-only: one JSON object per line, the existing history is never re-read
+    with history_path.open("ab") as f:
+        f.write(_dumps_line(entry))
     # Also write last_pr.json for workflow consumption
-    (rt_root / "evolver" / "last_pr.json").write_text(json.dumps(entry, indent=2), encoding="utf-8")
+    (rt_root / "evolver" / "last_pr.json").write_bytes(_dumps(entry))
     print("[evolver] done")
     return 0
 
@@ -1,23 +1,53 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
+import math
 import os
+import re
 import time
 from datetime import datetime
 import traceback
+import uuid
 from pathlib import Path
 import shutil
+import multiprocessing
 import socket
 import threading
-from collections import deque
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import hashlib
-from urllib.parse import urlparse, urljoin, parse_qs, unquote, quote
+from urllib.parse import urlparse, urlsplit, urljoin, parse_qs, unquote, quote
 import urllib.robotparser as robotparser
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 
+import requests
+from bs4 import BeautifulSoup  # type: ignore
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, jsonify, request, send_from_directory
-from flask import has_request_context
+from flask import g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest
+
+try:  # lexbor (C) HTML5 parser: tree and text extraction without Python-level node objects
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    LexborHTMLParser = None  # type: ignore
+
+try:  # C-backed tree builder for the BeautifulSoup fallback
+    import lxml  # type: ignore  # noqa: F401
+
+    _BS_PARSER = "lxml"
+except Exception:  # pragma: no cover - optional dependency
+    _BS_PARSER = "html.parser"
+
+try:  # Rust JSON encoder/decoder for responses and data files, used when installed
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 # We reuse the core logic implemented in main.py
 import main as core
@@ -28,6 +58,17 @@ try:
     from backend.app import main as api_main  # type: ignore
 except Exception:
     api_main = None  # type: ignore
+
+
+def _call_api(fn, *args, **kwargs):
+    """Call a FastAPI handler from Flask, driving it to completion if it is async."""
+    res = fn(*args, **kwargs)
+    if inspect.iscoroutine(res):
+        res = asyncio.run(res)
+    if hasattr(res, "body") and hasattr(res, "media_type"):
+        # Handlers returning a Response directly (pre-serialized JSON)
+        res = _loads_bytes(res.body)
+    return res
 try:
     from openai import OpenAI  # type: ignore
 except Exception:
@@ -59,60 +100,200 @@ def _ensure_data_dir() -> Path:
         except Exception:
             # Best effort
             pass
-    target_logs = p / "logs.json"
-    if not target_logs.exists():
-        try:
-            target_logs.write_text("[]", encoding="utf-8")
-        except Exception:
-            pass
     return p
 
 DATA_DIR = _ensure_data_dir()
 DATA_FILE = DATA_DIR / "dummy_data.json"
-LOG_FILE = DATA_DIR / "logs.json"
+# Append-only tail of DATA_FILE: crawled pages land here, folded back in by _compact_dataset
+DATA_JSONL = DATA_DIR / "dummy_data.jsonl"
+# One JSON object per line; appended to, never rewritten
+LOG_FILE = DATA_DIR / "logs.jsonl"
+LEGACY_LOG_FILE = DATA_DIR / "logs.json"
+
+
+def _dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """JSON-encode to UTF-8 bytes (orjson when available)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def _loads_bytes(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; same output shape as the default one.
+
+    Keys stay sorted and datetimes still go through Flask's `default` (HTTP
+    dates), so responses only differ by non-ASCII text being sent as UTF-8.
+    """
+
+    _OPTIONS = 0
+    if orjson is not None:
+        _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _encode(self, obj: Any, indent: bool) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=self._OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._encode(obj, bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._encode(obj, indent) + b"\n", mimetype=self.mimetype)
 
 
 app = Flask(__name__, static_folder=str(ROOT / "dashboard"))
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 # Be permissive during local development to avoid CORS issues from the dev frontend.
 CORS(app, resources={r"*": {"origins": "*"}}, supports_credentials=True)
 
 
 # ---- In-memory state ----
-running: bool = False
+# Set by /api/start, cleared by /api/stop
+_running = threading.Event()
 
 # Initialize documents and TF-IDF index
 docs = core.load_documents()
-doc_vecs, idf = core.build_index(docs)
+doc_vecs, idf = core.load_index(docs)
+# Bumped on every rebuild; part of the /search cache key so stale results are never served
+_index_version: int = 0
 
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+_search_cache: "OrderedDict[tuple, tuple[float, Dict[str, Any]]]" = OrderedDict()
+_search_cache_lock = threading.Lock()
 
-def _load_logs() -> list[Dict[str, Any]]:
+# /api/ask query vectors, keyed by (lowercased question, _index_version): repeated questions skip tokenization
+QUERY_VEC_CACHE_SIZE = int(os.getenv("QUERY_VEC_CACHE_SIZE", "1024"))
+_query_vec_cache: "OrderedDict[tuple[str, int], Dict[str, float]]" = OrderedDict()
+_query_vec_lock = threading.Lock()
+
+
+def _file_stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+# Parsed log entries, reused until LOG_FILE's stamp changes (i.e. another process wrote it)
+_logs_cache: list[Dict[str, Any]] | None = None
+_logs_stamp: tuple[int, int] | None = None
+# Entries per day (timestamp[:10]) and total response time, maintained alongside _logs_cache
+_logs_per_day: Counter[str] = Counter()
+_logs_rt_total: float = 0.0
+_logs_lock = threading.Lock()
+
+
+def _migrate_legacy_logs() -> None:
+    """Convert a pre-JSONL logs.json (one JSON list) into LOG_FILE."""
+    if LOG_FILE.exists() or not LEGACY_LOG_FILE.exists():
+        return
     try:
-        if LOG_FILE.exists():
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+        entries = _loads_bytes(LEGACY_LOG_FILE.read_bytes())
+        LOG_FILE.write_bytes(b"".join(_dumps_bytes(e) + b"\n" for e in entries if isinstance(e, dict)))
+        LEGACY_LOG_FILE.unlink()
     except Exception:
         pass
-    return []
 
 
-def _save_logs(logs: list[Dict[str, Any]]) -> None:
+def _log_day(entry: Any) -> str | None:
+    ts = entry.get("timestamp") if isinstance(entry, dict) else None
+    return ts[:10] if ts else None
+
+
+def _log_response_time(entry: Any) -> float:
     try:
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            json.dump(logs, f, ensure_ascii=False, indent=2)
+        return float(entry.get("response_time", 0.0))
     except Exception:
-        pass
+        return 0.0
+
+
+def _refresh_logs_locked() -> list[Dict[str, Any]]:
+    """Re-read LOG_FILE if its stamp changed; caller holds _logs_lock."""
+    global _logs_cache, _logs_stamp, _logs_per_day, _logs_rt_total
+    stamp = _file_stamp(LOG_FILE)
+    if _logs_cache is None or stamp != _logs_stamp:
+        if stamp is None:
+            _migrate_legacy_logs()
+            stamp = _file_stamp(LOG_FILE)
+        logs: list[Dict[str, Any]] = []
+        try:
+            with open(LOG_FILE, "rb") as f:
+                for line in f:
+                    try:
+                        logs.append(_loads_bytes(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        _logs_cache, _logs_stamp = logs, stamp
+        _logs_per_day = Counter(day for day in map(_log_day, logs) if day)
+        _logs_rt_total = sum(map(_log_response_time, logs))
+    return _logs_cache
+
+
+def _load_logs() -> list[Dict[str, Any]]:
+    with _logs_lock:
+        # Callers may mutate what they get back
+        return list(_refresh_logs_locked())
+
+
+def _log_summary() -> tuple[int, float, Dict[str, Any] | None]:
+    """(entries, summed response_time, last entry) without copying the log list."""
+    with _logs_lock:
+        logs = _refresh_logs_locked()
+        return len(logs), _logs_rt_total, (logs[-1] if logs else None)
+
+
+def _log_counts_per_day() -> list[tuple[str, int]]:
+    """(day, entries) pairs in date order: O(days), the logs themselves are not rescanned."""
+    with _logs_lock:
+        _refresh_logs_locked()
+        return sorted(_logs_per_day.items())
+
+
+def _append_log(entry: Dict[str, Any]) -> None:
+    """Write one log line; the in-memory copy is extended rather than re-read."""
+    global _logs_cache, _logs_stamp, _logs_rt_total
+    with _logs_lock:
+        try:
+            before = _file_stamp(LOG_FILE)
+            with open(LOG_FILE, "ab") as f:
+                f.write(_dumps_bytes(entry) + b"\n")
+        except Exception:
+            return
+        if _logs_cache is not None and before == _logs_stamp:
+            _logs_cache.append(entry)
+            _logs_stamp = _file_stamp(LOG_FILE)
+            day = _log_day(entry)
+            if day:
+                _logs_per_day[day] += 1
+            _logs_rt_total += _log_response_time(entry)
+        else:
+            _logs_cache = None
 
 
 def _get_last_threshold(default: float = 0.1) -> float:
-    logs = _load_logs()
-    if logs:
-        last = logs[-1]
+    _, _, last = _log_summary()
+    if last is not None:
         if isinstance(last, dict) and isinstance(last.get("threshold"), (int, float)):
             return float(last["threshold"])
     return default
 
 
 threshold: float = _get_last_threshold()
+# Guards read-modify-write updates of `threshold` from concurrent requests
+_threshold_lock = threading.Lock()
 
 # ---- Background web crawler state ----
 _crawl_lock = threading.Lock()
@@ -130,7 +311,8 @@ _crawl_state: Dict[str, Any] = {
     "errors": 0,
     "last_url": None,
     "last_error": None,
-    "blocked_domains": set(),
+    # Replaced, never mutated: readers can keep a reference without copying
+    "blocked_domains": frozenset(),
 }
 
 # Domains to skip (anti-bot or low textual value)
@@ -146,10 +328,13 @@ _IGNORED_ERROR_PATH_PREFIXES = (
 )
 _IGNORED_ERROR_PATHS = {"/favicon.ico"}
 
-def _record_error(message: str, status: int, extra: dict | None = None) -> None:
+def _record_error(message: str, status: int, extra: dict | None = None, with_stack: bool = False) -> None:
+    """Buffer an error for /api/errors; `with_stack` formats the current traceback, only if kept."""
     try:
         path = method = None
         if has_request_context():
+            # after_request_log_errors skips responses already recorded here
+            g.error_recorded = True
             try:
                 path = request.path
                 method = request.method
@@ -171,6 +356,8 @@ def _record_error(message: str, status: int, extra: dict | None = None) -> None:
             if "stack" in extra and isinstance(extra["stack"], str):
                 extra = {**extra, "stack": extra["stack"][:4000]}
             evt.update(extra)
+        if with_stack:
+            evt["stack"] = traceback.format_exc()[:4000]
         _error_buffer.append(evt)
     except Exception:
         # Never raise from logging
@@ -204,7 +391,7 @@ def flask_metrics_record():
 
     if api_main is not None and hasattr(api_main, "metrics_record"):
         try:
-            res = api_main.metrics_record(payload)
+            res = _call_api(api_main.metrics_record, payload)
             status = 200 if res.get("status") == "ok" else 500
             return (jsonify(res), status)
         except Exception:
@@ -217,8 +404,7 @@ def flask_metrics_record():
         items = []
         if hist_file.exists():
             try:
-                with open(hist_file, "r", encoding="utf-8") as f:
-                    items = json.load(f)
+                items = _loads_bytes(hist_file.read_bytes())
             except Exception:
                 items = []
         # Build record
@@ -234,8 +420,7 @@ def flask_metrics_record():
             "meta": payload.get("meta") or {},
         }
         items.append(rec)
-        with open(hist_file, "w", encoding="utf-8") as f:
-            json.dump(items, f, ensure_ascii=False, indent=2)
+        hist_file.write_bytes(_dumps_bytes(items, indent=True))
         return (jsonify({"status": "ok"}), 200)
     except Exception as e:
         return (jsonify({"status": "error", "error": str(e)}), 500)
@@ -254,7 +439,7 @@ def flask_metrics_history():
                 args["limit"] = 50
         if api_main is not None and hasattr(api_main, "metrics_history"):
             try:
-                res = api_main.metrics_history(**args)
+                res = _call_api(api_main.metrics_history, **args)
                 return jsonify(res)
             except Exception:
                 pass
@@ -264,8 +449,7 @@ def flask_metrics_history():
         items = []
         if hist_file.exists():
             try:
-                with open(hist_file, "r", encoding="utf-8") as f:
-                    items = json.load(f)
+                items = _loads_bytes(hist_file.read_bytes())
             except Exception:
                 items = []
         # Apply limit
@@ -384,7 +568,7 @@ def events_post():
 
 def _norm_url(u: str) -> str:
     try:
-        parsed = urlparse(u)
+        parsed = urlsplit(u)
         # Remove fragment
         clean = parsed._replace(fragment="").geturl()
         return clean
@@ -396,43 +580,346 @@ def _is_http_url(u: str) -> bool:
     return u.startswith("http://") or u.startswith("https://")
 
 
+_URL_IN_TEXT_RE = re.compile(r"https?://[^\s'\"]+")
+_WS_RE = re.compile(r"\s+")
+
+
+def _clean_seed(u: str) -> str | None:
+    """Sanitize a user-supplied URL: strip quotes, extract first http(s)://, add https to www.*"""
+    u = u.strip()
+    if (u.startswith("'") and u.endswith("'")) or (u.startswith('"') and u.endswith('"')):
+        u = u[1:-1]
+    if not u.lower().startswith(("http://", "https://")) and "http" in u:
+        m = _URL_IN_TEXT_RE.search(u)
+        if m:
+            u = m.group(0)
+    if not u.lower().startswith(("http://", "https://")) and u.lower().startswith("www."):
+        u = "https://" + u
+    return u if u.lower().startswith(("http://", "https://")) else None
+
+
 def _same_domain(u: str, domain: str) -> bool:
     try:
-        return urlparse(u).netloc.endswith(domain)
+        return urlsplit(u).netloc.endswith(domain)
     except Exception:
         return False
 
 
 def _read_dataset() -> list[Dict[str, Any]]:
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    dataset = _loads_bytes(DATA_FILE.read_bytes())
+    try:
+        with open(DATA_JSONL, "rb") as f:
+            for line in f:
+                if line.strip():
+                    dataset.append(_loads_bytes(line))
+    except FileNotFoundError:
+        pass
+    return dataset
+
+
+def _dataset_stamp() -> tuple[Any, Any]:
+    """Changes whenever DATA_FILE or its JSONL tail is written."""
+    return _file_stamp(DATA_FILE), _file_stamp(DATA_JSONL)
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
+
+
+# Stored content is capped at this many chars per document
+MAX_DOC_CHARS = 5000
+
+
+def _make_doc(title: str, url: str, content: str) -> Dict[str, Any]:
+    """Dataset entry; content is immutable after insert, so its hash is stored once with it."""
+    content = content[:MAX_DOC_CHARS]
+    return {"title": title, "url": url, "content": content, "content_sha256": _content_hash(content)}
+
+
+def _fill_content_hashes(dataset: list[Dict[str, Any]]) -> int:
+    """Add `content_sha256` to entries written before it existed; returns how many were filled."""
+    filled = 0
+    for d in dataset:
+        if not d.get("content_sha256"):
+            d["content_sha256"] = _content_hash(d.get("content") or "")
+            filled += 1
+    return filled
+
+
+# Serializes dataset writes and index swaps across the crawler thread and request threads:
+# a line appended between a compaction's read and its unlink of the tail would be lost,
+# and concurrent _extend_index calls would drop each other's documents. Reentrant because
+# callers holding it (compaction + reindex, the crawler's migration) call the helpers below.
+_dataset_lock = threading.RLock()
 
 
 def _write_dataset(dataset: list[Dict[str, Any]]):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(dataset, f, ensure_ascii=False, indent=2)
+    """Rewrite the full dataset (which already includes the JSONL tail) and drop the tail.
+
+    Callers must hold `_dataset_lock` from the read that produced `dataset`.
+    """
+    with _dataset_lock:
+        tmp = DATA_FILE.with_name(f"{DATA_FILE.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(_dumps_bytes(dataset, indent=True))
+        os.replace(tmp, DATA_FILE)
+        DATA_JSONL.unlink(missing_ok=True)
+
+
+def _append_dataset(doc: Dict[str, Any]) -> None:
+    """Persist one new document in O(len(doc)) instead of rewriting the whole file."""
+    with _dataset_lock:
+        with open(DATA_JSONL, "ab") as f:
+            f.write(_dumps_bytes(doc) + b"\n")
+
+
+def _compact_dataset() -> list[Dict[str, Any]]:
+    """Fold the JSONL tail into DATA_FILE; returns the merged dataset."""
+    with _dataset_lock:
+        dataset = _read_dataset()
+        if DATA_JSONL.exists():
+            _write_dataset(dataset)
+        return dataset
+
+
+# (dataset stamp, document count, url -> (title, etag, last_modified)) for /health and /api/crawl:
+# the files are only re-read after a write
+_dataset_meta_cache: tuple[Any, int, dict[str, tuple[str, str | None, str | None]]] | None = None
+
+
+def _dataset_meta() -> tuple[int, dict[str, tuple[str, str | None, str | None]]]:
+    global _dataset_meta_cache
+    stamp = _dataset_stamp()
+    cached = _dataset_meta_cache
+    if cached is not None and cached[0] == stamp:
+        return cached[1], cached[2]
+    dataset = _read_dataset()
+    # Later entries win, as for the crawler's known_validators
+    validators = {
+        d["url"]: (d.get("title") or "", d.get("etag"), d.get("last_modified"))
+        for d in dataset
+        if d.get("etag") or d.get("last_modified")
+    }
+    _dataset_meta_cache = (stamp, len(dataset), validators)
+    return len(dataset), validators
+
+
+def _dataset_count() -> int:
+    return _dataset_meta()[0]
+
+
+# Term counts per document, keyed by (title, content hash): a rebuild only tokenizes new documents.
+# IDF still changes for every term when N grows, so the weights themselves are recomputed.
+_term_counts_cache: dict[tuple[str, str], Any] = {}
+
+
+def _term_counts(d: Dict[str, Any], cache: dict[tuple[str, str], Any]) -> Any:
+    key = (d.get("title") or "", d.get("content_sha256") or _content_hash(d.get("content") or ""))
+    counts = cache.get(key) or _term_counts_cache.get(key)
+    if counts is None:
+        counts = core.term_counts(d)
+    cache[key] = counts
+    return counts
+
+
+def _build_index(dataset: list[Dict[str, Any]]):
+    global _term_counts_cache
+    cache: dict[tuple[str, str], Any] = {}
+    doc_counts = [_term_counts(d, cache) for d in dataset]
+    _term_counts_cache = cache
+    return core.build_index(dataset, doc_counts)
+
+
+# Documents appended with core.update_index since the last full build; IDF is refreshed every INDEX_REBUILD_EVERY
+INDEX_REBUILD_EVERY = int(os.getenv("INDEX_REBUILD_EVERY", "256"))
+_docs_since_rebuild = 0
+
+
+def _set_index(dataset: list[Dict[str, Any]]) -> None:
+    """Swap in a freshly built index, then bump `_index_version`."""
+    global docs, doc_vecs, idf, _index_version, _docs_since_rebuild
+    with _dataset_lock:
+        new_vecs, new_idf = _build_index(dataset)
+        docs, doc_vecs, idf = dataset, new_vecs, new_idf
+        _docs_since_rebuild = 0
+        _index_version += 1
+
+
+def _extend_index(new_docs: list[Dict[str, Any]]) -> None:
+    """Append documents to the live index in O(new docs + nnz) NumPy work, without re-weighting the corpus."""
+    global docs, doc_vecs, idf, _index_version, _docs_since_rebuild
+    with _dataset_lock:
+        if _docs_since_rebuild + len(new_docs) >= INDEX_REBUILD_EVERY:
+            _set_index(docs + new_docs)
+            return
+        doc_counts = [_term_counts(d, _term_counts_cache) for d in new_docs]
+        new_vecs, new_idf = core.update_index(doc_vecs, idf, doc_counts)
+        docs, doc_vecs, idf = docs + new_docs, new_vecs, new_idf
+        _docs_since_rebuild += len(new_docs)
+        _index_version += 1
+
+
+def _reindex_from_disk() -> None:
+    """Compact the dataset and rebuild the index from it, with no append in between."""
+    with _dataset_lock:
+        _set_index(_compact_dataset())
 
 
 def _rebuild_index_if_needed(batch_counter: int):
-    global docs, doc_vecs, idf
     if batch_counter >= 5:
-        docs = _read_dataset()
-        doc_vecs, idf = core.build_index(docs)
+        _reindex_from_disk()
         return 0
     return batch_counter
 
 
-def _extract_text_from_html(html: str) -> tuple[str, str]:
-    from bs4 import BeautifulSoup  # type: ignore
-    soup = BeautifulSoup(html, "html.parser")
+# The index above was loaded from DATA_FILE alone: fold in a JSONL tail left by a previous run.
+# Skipped in core's index-pool processes, which import this module when it is run as __main__.
+if DATA_JSONL.exists() and multiprocessing.parent_process() is None:
+    try:
+        _reindex_from_disk()
+    except Exception:
+        # Best effort: the tail is still read by _read_dataset
+        pass
+
+
+MAX_PAGE_BYTES = 3_000_000  # ~3MB
+# Domains fetched in parallel by the crawler (still one page at a time per domain)
+CRAWL_CONCURRENCY = max(1, int(os.getenv("CRAWL_CONCURRENCY", "8")))
+
+
+def _new_http_session() -> requests.Session:
+    """Keep-alive session for outbound fetches: one TCP/TLS handshake per host, not per request."""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_http = _new_http_session()
+
+
+def _read_capped(resp: Any, limit: int) -> str | None:
+    """Body of a `stream=True` response as text, or None if it exceeds `limit` bytes."""
+    raw = resp.raw.read(limit + 1, decode_content=True)
+    if len(raw) > limit:
+        return None
+    # Same decoding as resp.text (requests defaults text/* without charset to ISO-8859-1)
+    return raw.decode(resp.encoding or "utf-8", errors="replace")
+
+
+def _parse_html(html: str) -> Any:
+    """Parse a page once; the tree is shared by text and link extraction.
+
+    selectolax when installed, else BeautifulSoup.
+    """
+    if LexborHTMLParser is not None:
+        return LexborHTMLParser(html)
+    return BeautifulSoup(html, _BS_PARSER)
+
+
+def _join_paragraphs(paragraphs: Iterable[str], limit: int | None, collapse_ws: bool) -> str:
+    """Join paragraph texts, stopping once `limit` chars are gathered.
+
+    Leading empty paragraphs don't count toward the limit (the caller strips them),
+    so the result's first `limit` chars match the untruncated text's.
+    """
+    parts: list[str] = []
+    total = 0
+    for text in paragraphs:
+        if collapse_ws:
+            text = " ".join(text.split())
+            if not text:
+                continue
+        parts.append(text)
+        if limit is not None and (total or text):
+            total += len(text) + 1
+            if total > limit:
+                break
+    return (" " if collapse_ws else "\n").join(parts)
+
+
+def _extract_text_from_html(
+    html: str | Any, limit: int | None = None, collapse_ws: bool = False
+) -> tuple[str, str]:
+    """(title, paragraph text) of a page.
+
+    `limit` stops the walk over <p> tags once that many chars are gathered (the text may
+    run a little past it); `collapse_ws` folds whitespace runs and paragraph breaks into single spaces.
+    """
+    tree = _parse_html(html) if isinstance(html, str) else html
+    if LexborHTMLParser is not None and isinstance(tree, LexborHTMLParser):
+        node = tree.css_first("title")
+        title = (node.text() if node is not None else "")[:200]
+        paragraphs = (p.text(separator=" ", strip=True) for p in tree.css("p"))
+        return title, _join_paragraphs(paragraphs, limit, collapse_ws)
+    soup = tree
     title = (soup.title.string if soup.title and soup.title.string else "")[:200]
-    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
-    text = "\n".join(paragraphs)
-    return title, text
+    paragraphs = (p.get_text(" ", strip=True) for p in soup.find_all("p"))
+    return title, _join_paragraphs(paragraphs, limit, collapse_ws)
+
+
+def _extract_hrefs(tree: Any) -> list[str]:
+    """Non-empty href values of the page's <a> tags, in document order."""
+    if LexborHTMLParser is not None and isinstance(tree, LexborHTMLParser):
+        hrefs = (a.attributes.get("href") for a in tree.css("a[href]"))
+    else:
+        hrefs = (a.get("href") for a in tree.find_all("a", href=True))
+    return [h for h in hrefs if h]
+
+
+def _fetch_page(
+    url: str, headers: Dict[str, str], throttle: float, delay: float
+) -> tuple[str, str, str, list[str], Dict[str, str]]:
+    """Fetch and parse one page on a crawl pool thread.
+
+    Returns (status, title, content, hrefs, validators); status is "ok", "skip", "retry" (429)
+    or "forbidden" (403); validators holds the page's etag/last_modified, if sent.
+    `throttle` is the per-domain delay decided by the crawl thread, slept here so other domains keep going.
+    """
+    if throttle > 0:
+        time.sleep(throttle)
+    resp = None
+    try:
+        # Headers first: the body is only downloaded for HTML pages under the size cap
+        resp = _http.get(url, headers=headers, timeout=20, allow_redirects=True, stream=True)
+        # Handle 429 (Too Many Requests): simple backoff, the crawl thread retries once
+        if resp.status_code == 429:
+            time.sleep(min(10.0, delay * 2))
+            return "retry", "", "", [], {}
+        if resp.status_code == 403:
+            return "forbidden", "", "", [], {}
+        # Unchanged since the stored copy (conditional GET): no body, nothing to parse
+        if resp.status_code == 304:
+            return "skip", "", "", [], {}
+        resp.raise_for_status()
+        # Content-Type filter
+        ctype = (resp.headers.get("Content-Type") or "").lower()
+        if "text/html" not in ctype:
+            return "skip", "", "", [], {}
+        # Content-Length filter (if provided)
+        try:
+            clen = int(resp.headers.get("Content-Length") or 0)
+            if clen and clen > MAX_PAGE_BYTES:
+                return "skip", "", "", [], {}
+        except Exception:
+            pass
+        html = _read_capped(resp, MAX_PAGE_BYTES)
+        if html is None:
+            # No/false Content-Length and the body went past the cap
+            return "skip", "", "", [], {}
+        tree = _parse_html(html)
+        # Only the first MAX_DOC_CHARS chars are stored: stop gathering paragraphs there
+        title, text = _extract_text_from_html(tree, limit=MAX_DOC_CHARS)
+        validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        # Links come from the same tree as the text
+        return "ok", title, (text or "").strip(), _extract_hrefs(tree), {k: v for k, v in validators.items() if v}
+    finally:
+        if resp is not None:
+            resp.close()
 
 
 def _crawl_worker():
-    global docs, doc_vecs, idf
     ua_pool = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
@@ -451,6 +938,8 @@ def _crawl_worker():
         delay = float(_crawl_state.get("delay") or 1.5)
         queue: deque[str] = _crawl_state["queue"]
         visited: set[str] = _crawl_state["visited"]
+        # Mirrors `queue` so a URL linked from many pages is only enqueued once
+        queued: set[str] = set(queue)
 
     rp = robotparser.RobotFileParser()
     if domain:
@@ -462,133 +951,194 @@ def _crawl_worker():
             # If robots fails to load, we proceed conservatively
             pass
 
+    # Live copy of the dataset with its URL/content-hash sets, updated per accepted page.
+    # Reloaded only if the file was changed by someone else (e.g. /api/crawl).
+    dataset: list[Dict[str, Any]] = []
+    known_urls: set[str] = set()
+    # Raw 32-byte digests: half the size of the hex strings stored in the dataset
+    known_hashes: set[bytes] = set()
+    # url -> (etag, last_modified) of stored pages, sent back as If-None-Match/If-Modified-Since
+    known_validators: dict[str, tuple[str | None, str | None]] = {}
+    dataset_stamp: tuple[Any, Any] | None = None
+
+    def _refresh_dataset() -> None:
+        nonlocal dataset, known_urls, known_hashes, known_validators, dataset_stamp
+        stamp = _dataset_stamp()
+        if stamp[0] is not None and stamp == dataset_stamp:
+            return
+        with _dataset_lock:
+            dataset = _read_dataset()
+            if _fill_content_hashes(dataset):
+                # One-time migration of legacy entries; later loads only read the stored hashes
+                _write_dataset(dataset)
+                stamp = _dataset_stamp()
+        known_urls = {d.get("url") for d in dataset}
+        known_hashes = {bytes.fromhex(d["content_sha256"]) for d in dataset}
+        known_validators = {
+            d["url"]: (d.get("etag"), d.get("last_modified"))
+            for d in dataset
+            if d.get("etag") or d.get("last_modified")
+        }
+        dataset_stamp = stamp
+
     additions_since_reindex = 0
     domain_last_fetch: dict[str, float] = {}
+    min_gap = max(1.0, delay)
     block_domains: set[str] = set()
     retries: dict[str, int] = {}
-    try:
-        while True:
+    # One page in flight per domain, up to CRAWL_CONCURRENCY domains at once.
+    # Fetching/parsing runs on the pool; dataset, index and frontier stay on this thread.
+    in_flight: dict[Future, tuple[str, str]] = {}
+    busy_domains: set[str] = set()
+
+    def _schedule(pool: ThreadPoolExecutor) -> None:
+        deferred: list[str] = []
+        scanned = 0
+        while len(in_flight) < CRAWL_CONCURRENCY and len(visited) < max_pages and scanned < 256:
             with _crawl_lock:
-                if not _crawl_state["running"]:
-                    break
-                if not queue or len(visited) >= max_pages:
-                    _crawl_state["running"] = False
+                if not queue:
                     break
                 current = queue.popleft()
-                _crawl_state["last_url"] = current
+            scanned += 1
+            cur_domain = urlsplit(current).netloc
+            if cur_domain in busy_domains:
+                # Keeps its place; picked up once that domain's page is done
+                deferred.append(current)
+                continue
+            queued.discard(current)
             if current in visited:
                 continue
-            visited.add(current)
-            # Throttle per domain
-            cur_domain = urlparse(current).netloc
             # Skip if in skip-list or previously blocked
             with _crawl_lock:
-                shared_blocked = set(_crawl_state.get("blocked_domains", set()))
+                shared_blocked = _crawl_state["blocked_domains"]
             if cur_domain in SKIP_DOMAINS or cur_domain in shared_blocked:
                 continue
-            now = time.time()
-            last = domain_last_fetch.get(cur_domain, 0.0)
-            min_gap = max(1.0, delay)
-            wait = last + min_gap - now
-            if wait > 0:
-                time.sleep(wait)
-            domain_last_fetch[cur_domain] = time.time()
             # Robots check
             try:
                 if domain and not rp.can_fetch(headers["User-Agent"], current):
                     continue
             except Exception:
                 pass
+            visited.add(current)
+            # Throttle per domain: the pool thread sleeps, other domains are not held up
+            now = time.time()
+            throttle = domain_last_fetch.get(cur_domain, 0.0) + min_gap - now
+            domain_last_fetch[cur_domain] = now + max(0.0, throttle)
+            # rotate UA a bit
+            page_headers = dict(headers, **{"User-Agent": ua_pool[len(visited) % len(ua_pool)]})
+            etag, last_modified = known_validators.get(current, (None, None))
+            if etag:
+                page_headers["If-None-Match"] = etag
+            if last_modified:
+                page_headers["If-Modified-Since"] = last_modified
+            with _crawl_lock:
+                _crawl_state["last_url"] = current
+            in_flight[pool.submit(_fetch_page, current, page_headers, throttle, delay)] = (current, cur_domain)
+            busy_domains.add(cur_domain)
+        if deferred:
+            with _crawl_lock:
+                queue.extendleft(reversed(deferred))
+
+    def _handle(current: str, cur_domain: str, result: tuple[str, str, str, list[str], Dict[str, str]]) -> None:
+        nonlocal additions_since_reindex, dataset_stamp
+        status, title, content, hrefs, validators = result
+        if status == "retry":
+            retries[current] = retries.get(current, 0) + 1
+            if retries[current] <= 1:
+                # Not visited yet, or the retry would be skipped when popped
+                visited.discard(current)
+                queued.add(current)
+                with _crawl_lock:
+                    queue.append(current)
+            return
+        # Handle 403: block domain for this run and skip
+        if status == "forbidden":
+            block_domains.add(cur_domain)
+            with _crawl_lock:
+                _crawl_state["blocked_domains"] = _crawl_state["blocked_domains"] | {cur_domain}
+            raise requests.RequestException(f"403 Forbidden for domain {cur_domain}")
+        # Minimal content filter: skip very short pages
+        if status != "ok" or len(content) < 200:
+            return
+        # Deduplicate by URL and content hash
+        url_key = _norm_url(current)
+        # Hashed once, over what is stored: used for the lookup and kept in the entry
+        new_doc = _make_doc(title or url_key, url_key, content)
+        _refresh_dataset()
+        digest = bytes.fromhex(new_doc["content_sha256"])
+        if url_key in known_urls or digest in known_hashes:
+            # Already present
+            pass
+        else:
+            new_doc.update(validators)
+            dataset.append(new_doc)
+            with _dataset_lock:
+                _append_dataset(new_doc)
+                dataset_stamp = _dataset_stamp()
+            known_urls.add(url_key)
+            known_hashes.add(digest)
+            if validators:
+                known_validators[url_key] = (validators.get("etag"), validators.get("last_modified"))
+            additions_since_reindex += 1
+            with _crawl_lock:
+                _crawl_state["added"] += 1
+            additions_since_reindex = _rebuild_index_if_needed(additions_since_reindex)
+        # Links for BFS
+        with _crawl_lock:
+            shared_blocked = _crawl_state["blocked_domains"]
+        new_links: list[str] = []
+        for href in hrefs:
+            if href.startswith("mailto:") or href.startswith("javascript:"):
+                continue
+            # Split once; scheme, netloc and the normalized URL all come from it
             try:
-                import requests
-                # rotate UA a bit
-                headers["User-Agent"] = ua_pool[len(visited) % len(ua_pool)]
-                resp = requests.get(current, headers=headers, timeout=20, allow_redirects=True)
-                # Handle 429 (Too Many Requests): simple backoff and retry once
-                if resp.status_code == 429:
-                    backoff = min(10.0, delay * 2)
-                    time.sleep(backoff)
-                    retries[current] = retries.get(current, 0) + 1
-                    if retries[current] <= 1:
-                        with _crawl_lock:
-                            _crawl_state["queue"].append(current)
-                        continue
-                # Handle 403: block domain for this run and skip
-                if resp.status_code == 403:
-                    block_domains.add(cur_domain)
-                    with _crawl_lock:
-                        bd = _crawl_state.setdefault("blocked_domains", set())
-                        bd.add(cur_domain)
-                    raise requests.RequestException(f"403 Forbidden for domain {cur_domain}")
-                resp.raise_for_status()
-                # Content-Type filter
-                ctype = (resp.headers.get("Content-Type") or "").lower()
-                if "text/html" not in ctype:
-                    continue
-                # Content-Length filter (if provided)
+                parts = urlsplit(urljoin(current, href))
+            except ValueError:
+                continue
+            if parts.scheme not in ("http", "https"):
+                continue
+            abs_url = parts._replace(fragment="").geturl()
+            next_dom = parts.netloc
+            if domain and not next_dom.endswith(domain):
+                continue
+            # Skip blocked or unfriendly domains
+            if next_dom in block_domains or next_dom in SKIP_DOMAINS or next_dom in shared_blocked:
+                continue
+            if abs_url not in visited and abs_url not in queued:
+                queued.add(abs_url)
+                new_links.append(abs_url)
+        if new_links:
+            with _crawl_lock:
+                queue.extend(new_links)
+
+    _refresh_dataset()
+    pool = ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY, thread_name_prefix="crawl")
+    try:
+        while True:
+            with _crawl_lock:
+                if not _crawl_state["running"]:
+                    break
+            _schedule(pool)
+            if not in_flight:
+                with _crawl_lock:
+                    _crawl_state["running"] = False
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                current, cur_domain = in_flight.pop(fut)
+                busy_domains.discard(cur_domain)
                 try:
-                    clen = int(resp.headers.get("Content-Length") or 0)
-                    if clen and clen > 3_000_000:  # ~3MB
-                        continue
-                except Exception:
-                    pass
-                title, text = _extract_text_from_html(resp.text)
-                # Minimal content filter
-                content = (text or "").strip()
-                if len(content) < 200:
-                    # Skip very short pages
-                    continue
-                # Deduplicate by URL and content hash
-                url_key = _norm_url(current)
-                content_hash = hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
-                dataset = _read_dataset()
-                known_urls = {d.get("url") for d in dataset}
-                known_hashes = {hashlib.sha256((d.get("content") or "").encode("utf-8", errors="ignore")).hexdigest() for d in dataset}
-                if url_key in known_urls or content_hash in known_hashes:
-                    # Already present
-                    pass
-                else:
-                    dataset.append({"title": title or url_key, "url": url_key, "content": content[:5000]})
-                    _write_dataset(dataset)
-                    additions_since_reindex += 1
-                    with _crawl_lock:
-                        _crawl_state["added"] += 1
-                    additions_since_reindex = _rebuild_index_if_needed(additions_since_reindex)
-                # Extract links for BFS
-                from bs4 import BeautifulSoup  # type: ignore
-                s = BeautifulSoup(resp.text, "html.parser")
-                for a in s.find_all("a", href=True):
-                    href = a.get("href")
-                    if not href:
-                        continue
-                    if href.startswith("mailto:") or href.startswith("javascript:"):
-                        continue
-                    abs_url = urljoin(current, href)
-                    abs_url = _norm_url(abs_url)
-                    if not _is_http_url(abs_url):
-                        continue
-                    if domain and not _same_domain(abs_url, domain):
-                        continue
-                    # Skip blocked or unfriendly domains
-                    next_dom = urlparse(abs_url).netloc
+                    _handle(current, cur_domain, fut.result())
+                except Exception as e:  # network or parse errors
                     with _crawl_lock:
-                        shared_blocked = set(_crawl_state.get("blocked_domains", set()))
-                    if next_dom in block_domains or next_dom in SKIP_DOMAINS or next_dom in shared_blocked:
-                        continue
-                    if abs_url not in visited:
-                        with _crawl_lock:
-                            queue.append(abs_url)
-            except Exception as e:  # network or parse errors
-                with _crawl_lock:
-                    _crawl_state["errors"] += 1
-                    _crawl_state["last_error"] = str(e)
-            finally:
-                time.sleep(delay)
+                        _crawl_state["errors"] += 1
+                        _crawl_state["last_error"] = str(e)
     finally:
+        # Pages still in flight after a stop are dropped
+        pool.shutdown(wait=False, cancel_futures=True)
         # Final rebuild if pending additions
         if additions_since_reindex:
-            docs = _read_dataset()
-            doc_vecs, idf = core.build_index(docs)
+            _reindex_from_disk()
         with _crawl_lock:
             _crawl_state["running"] = False
 
@@ -630,8 +1180,6 @@ def _start_crawl(seeds: list[str], max_pages: int, delay: float, same_domain: bo
 def _discover_links_ddg(query: str, max_results: int = 10, lang: str = "fr-fr") -> list[str]:
     links: list[str] = []
     try:
-        import requests
-        from bs4 import BeautifulSoup  # type: ignore
         headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -641,7 +1189,7 @@ def _discover_links_ddg(query: str, max_results: int = 10, lang: str = "fr-fr")
         }
         url = "https://duckduckgo.com/html/"
         params = {"q": query, "kl": lang}
-        resp = requests.get(url, params=params, headers=headers, timeout=20)
+        resp = _http.get(url, params=params, headers=headers, timeout=20)
         resp.raise_for_status()
         soup = BeautifulSoup(resp.text, "html.parser")
         for a in soup.select("a.result__a, a.result__url"):  # be flexible
@@ -678,10 +1226,9 @@ def _discover_links_bing(query: str, max_results: int = 10) -> list[str]:
     if not key:
         return []
     try:
-        import requests
         headers = {"Ocp-Apim-Subscription-Key": key}
         params = {"q": query, "count": max_results}
-        resp = requests.get("https://api.bing.microsoft.com/v7.0/search", headers=headers, params=params, timeout=20)
+        resp = _http.get("https://api.bing.microsoft.com/v7.0/search", headers=headers, params=params, timeout=20)
         resp.raise_for_status()
         js = resp.json()
         web_pages = js.get("webPages", {}).get("value", [])
@@ -696,9 +1243,8 @@ def _discover_links_google_cse(query: str, max_results: int = 10) -> list[str]:
     if not api_key or not cse_id:
         return []
     try:
-        import requests
         params = {"key": api_key, "cx": cse_id, "q": query, "num": min(max_results, 10)}
-        resp = requests.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=20)
+        resp = _http.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=20)
         resp.raise_for_status()
         js = resp.json()
         items = js.get("items", [])
@@ -712,9 +1258,8 @@ def _discover_links_serpapi(query: str, max_results: int = 10, engine: str = "go
     if not key:
         return []
     try:
-        import requests
         params = {"engine": engine, "q": query, "api_key": key, "num": max_results}
-        resp = requests.get("https://serpapi.com/search", params=params, timeout=20)
+        resp = _http.get("https://serpapi.com/search", params=params, timeout=20)
         resp.raise_for_status()
         js = resp.json()
         links: list[str] = []
@@ -727,6 +1272,44 @@ def _discover_links_serpapi(query: str, max_results: int = 10, engine: str = "go
         return []
 
 
+_DISCOVERERS = {
+    "ddg": _discover_links_ddg,
+    "bing": _discover_links_bing,
+    "google": _discover_links_google_cse,
+    "serpapi": _discover_links_serpapi,
+}
+
+
+def _discover_all(query: str, engines: list[str], max_results: int = 10) -> list[str]:
+    """Query several search engines concurrently and merge their links.
+
+    Latency is that of the slowest engine rather than the sum; results keep the
+    order of `engines`, deduplicated.
+    """
+    funcs = [_DISCOVERERS[e] for e in engines if e in _DISCOVERERS]
+    if not funcs:
+        return []
+    if len(funcs) == 1:
+        results = [funcs[0](query, max_results=max_results)]
+    else:
+        with ThreadPoolExecutor(max_workers=len(funcs)) as pool:
+            futures = [pool.submit(f, query, max_results=max_results) for f in funcs]
+            results = []
+            for fut in futures:
+                try:
+                    results.append(fut.result())
+                except Exception:
+                    results.append([])
+    seen = set()
+    links: list[str] = []
+    for res in results:
+        for u in res or []:
+            if u not in seen:
+                seen.add(u)
+                links.append(u)
+    return links
+
+
 @app.post("/api/crawl_start")
 def api_crawl_start():
     """Start a background crawl job.
@@ -741,19 +1324,6 @@ def api_crawl_start():
         seeds = [s.strip() for s in seeds if isinstance(s, str) and s.strip()]
         if not seeds:
             return jsonify({"error": "seeds manquants"}), 400
-        # sanitize seeds: strip quotes, extract first http(s)://, add https to www.*
-        import re as _re
-        def _clean_seed(u: str) -> str | None:
-            u = u.strip()
-            if (u.startswith("'") and u.endswith("'")) or (u.startswith('"') and u.endswith('"')):
-                u = u[1:-1]
-            if not u.lower().startswith(("http://", "https://")) and "http" in u:
-                m = _re.search(r"https?://[^\s'\"]+", u)
-                if m:
-                    u = m.group(0)
-            if not u.lower().startswith(("http://", "https://")) and u.lower().startswith("www."):
-                u = "https://" + u
-            return u if u.lower().startswith(("http://", "https://")) else None
         seeds = [s for s in (_clean_seed(s) for s in seeds) if s]
         if not seeds:
             return jsonify({"error": "Aucun seed valide (attendu http(s)://...)"}), 400
@@ -764,20 +1334,25 @@ def api_crawl_start():
         # Determine domain from first seed
         info = _start_crawl(seeds, max_pages, delay, same_domain)
         return jsonify({"ok": True, **info})
-    except RuntimeError as re:
-        _record_error(str(re), 409)
-        return jsonify({"error": str(re)}), 409
+    except RuntimeError as rte:
+        _record_error(str(rte), 409)
+        return jsonify({"error": str(rte)}), 409
     except ValueError as ve:
         _record_error(str(ve), 400)
         return jsonify({"error": str(ve)}), 400
+    except BadRequest as bre:
+        # Malformed JSON body: a client error, no traceback needed
+        _record_error(bre.description or str(bre), 400)
+        return jsonify({"error": "JSON invalide"}), 400
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"error": str(e)}), 500
 @app.post("/api/search_and_learn")
 def api_search_and_learn():
     """Discover links from search engines for a query, then crawl them.
 
-    Body: { query: str, max_results?: int=10, engine?: 'ddg'|'bing'|'google'|'serpapi', max_pages?: int=30, delay?: float=1.5, same_domain?: bool=false }
+    Body: { query: str, max_results?: int=10, engine?: 'ddg'|'bing'|'google'|'serpapi'|'all', max_pages?: int=30, delay?: float=1.5, same_domain?: bool=false }
+    `engine` may also be a comma-separated list (e.g. 'ddg,bing'); engines are queried concurrently.
     """
     try:
         data = request.get_json(force=True) or {}
@@ -790,29 +1365,29 @@ def api_search_and_learn():
         delay = float(data.get("delay") or 1.5)
         same_domain = bool(data.get("same_domain") or False)
 
-        links: list[str] = []
-        if engine == "bing":
-            links = _discover_links_bing(query, max_results=max_results)
-        elif engine == "google":
-            links = _discover_links_google_cse(query, max_results=max_results)
-        elif engine == "serpapi":
-            links = _discover_links_serpapi(query, max_results=max_results)
+        if engine == "all":
+            engines = list(_DISCOVERERS)
         else:
-            links = _discover_links_ddg(query, max_results=max_results)
+            engines = [e.strip() for e in engine.split(",") if e.strip() in _DISCOVERERS] or ["ddg"]
+        links = _discover_all(query, engines, max_results=max_results)
 
         if not links:
             return jsonify({"error": "Aucun lien découvert (vérifiez le moteur/API key)", "engine": engine}), 424
 
         info = _start_crawl(links, max_pages=max_pages, delay=delay, same_domain=same_domain)
         return jsonify({"ok": True, "engine": engine, "discovered": len(links), "seeds": links[:5], **info})
-    except RuntimeError as re:
-        _record_error(str(re), 409)
-        return jsonify({"error": str(re)}), 409
+    except RuntimeError as rte:
+        _record_error(str(rte), 409)
+        return jsonify({"error": str(rte)}), 409
     except ValueError as ve:
         _record_error(str(ve), 400)
         return jsonify({"error": str(ve)}), 400
+    except BadRequest as bre:
+        # Malformed JSON body: a client error, no traceback needed
+        _record_error(bre.description or str(bre), 400)
+        return jsonify({"error": "JSON invalide"}), 400
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"error": str(e)}), 500
 
 
@@ -834,7 +1409,7 @@ def api_crawl_status():
         st["visited_count"] = len(_crawl_state.get("visited", []))
         st["queue_count"] = len(_crawl_state.get("queue", []))
         # Report blocked domains
-        bd = _crawl_state.get("blocked_domains", set())
+        bd = _crawl_state["blocked_domains"]
         st["blocked_count"] = len(bd)
         st["blocked_domains"] = sorted(list(bd))[:10]
     return jsonify(st)
@@ -849,10 +1424,12 @@ def _infer_source_type(url: str) -> str:
     return "html"
 
 
+# Very naive detection: any French accented letter; one C-level scan instead of one per letter
+_FR_CHARS_RE = re.compile(r"[éèêàùçôîïëäöü]")
+
+
 def _infer_language(text: str) -> str:
-    t = text or ""
-    # Very naive detection
-    if any(c in t for c in "éèêàùçôîïëäöü"):
+    if _FR_CHARS_RE.search(text or ""):
         return "fr"
     return "en"
 
@@ -860,12 +1437,15 @@ def _infer_language(text: str) -> str:
 def _doc_created_at_default() -> str:
     # Fallback to file mtime as ISO date
     try:
-        ts = DATA_FILE.stat().st_mtime
+        ts = max(p.stat().st_mtime for p in (DATA_FILE, DATA_JSONL) if p.exists())
         return datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d")
     except Exception:
         return datetime.utcnow().strftime("%Y-%m-%d")
 
 
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+
 def _get_openai_client() -> Any | None:
     """Return an OpenAI client if OPENAI_API_KEY is configured and SDK available."""
     api_key = os.getenv("OPENAI_API_KEY")
@@ -878,6 +1458,77 @@ def _get_openai_client() -> Any | None:
         return None
 
 
+class _LLMAnswerCache:
+    """LLM answers of past /api/ask questions, reused for near-identical questions.
+
+    Questions are compared by cosine similarity of their TF-IDF vectors, so a
+    lookup costs no API call; unknown words get the highest IDF, so questions
+    differing only by a name absent from the corpus do not collide. Entries are
+    dropped when the index changes (the LLM context came from the old one).
+    """
+
+    def __init__(self, capacity: int, threshold: float, ttl: float) -> None:
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (vector, norm, model, answer, stored_at), oldest first
+        self._entries: "OrderedDict[int, tuple[Dict[str, float], float, str, str, float]]" = OrderedDict()
+        self._next_key = 0
+        self._version = -1
+
+    @staticmethod
+    def vectorize(question: str, idf: Dict[str, float], num_docs: int) -> tuple[Dict[str, float], float]:
+        counts = Counter(core.tokenize(question))
+        oov_idf = math.log(num_docs + 1) + 1.0
+        vec = {t: c * idf.get(t, oov_idf) for t, c in counts.items()}
+        return vec, math.sqrt(sum(v * v for v in vec.values()))
+
+    def _sync_version(self, version: int) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, vec: Dict[str, float], norm: float, model: str, version: int) -> str | None:
+        if not norm:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(version)
+            best_key, best_sim = None, self.threshold
+            for key, (evec, enorm, emodel, _, stored_at) in self._entries.items():
+                if emodel != model or now - stored_at >= self.ttl:
+                    continue
+                sim = core.cosine_similarity(vec, evec, norm, enorm)
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][3]
+
+    def put(self, vec: Dict[str, float], norm: float, model: str, answer: str, version: int) -> None:
+        if not norm:
+            return
+        with self._lock:
+            self._sync_version(version)
+            self._entries[self._next_key] = (vec, norm, model, answer, time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+
+_llm_cache = (
+    _LLMAnswerCache(
+        capacity=int(os.getenv("LLM_CACHE_SIZE", "512")),
+        threshold=float(os.getenv("LLM_CACHE_THRESHOLD", "0.92")),
+        ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+    )
+    if os.getenv("LLM_CACHE", "1") in ("1", "true", "True")
+    else None
+)
+
+
 @app.get("/")
 def index():
     # Serve the static dashboard
@@ -896,9 +1547,9 @@ def metrics():
         documents = len(docs)
         # Simple placeholders
         coverage = min(1.0, documents / 100.0)
-        logs = _load_logs()
-        if logs:
-            avg_rt = sum(float(x.get("response_time", 0.0)) for x in logs) / max(1, len(logs))
+        log_count, rt_total, _ = _log_summary()
+        if log_count:
+            avg_rt = rt_total / log_count
         else:
             avg_rt = None
         return jsonify(
@@ -912,7 +1563,7 @@ def metrics():
             }
         )
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"error": str(e)}), 500
 
 
@@ -924,6 +1575,22 @@ def jobs_list():
     return jsonify({"items": [], "type": job_type, "status": status})
 
 
+def _query_vector(question: str, version: int, idf: Dict[str, float]) -> Dict[str, float]:
+    """TF-IDF vector of `question` under `idf`; `version` must be read before `idf` (see /search)."""
+    key = (question.lower(), version)
+    with _query_vec_lock:
+        vec = _query_vec_cache.get(key)
+        if vec is not None:
+            _query_vec_cache.move_to_end(key)
+            return vec
+    vec = core.vectorize_query(question, idf)
+    with _query_vec_lock:
+        _query_vec_cache[key] = vec
+        while len(_query_vec_cache) > QUERY_VEC_CACHE_SIZE:
+            _query_vec_cache.popitem(last=False)
+    return vec
+
+
 @app.get("/search")
 def search():
     """Simple search endpoint mapping to TF-IDF answer generation.
@@ -938,11 +1605,26 @@ def search():
         k = int(request.args.get("k") or 5)
     except ValueError:
         k = 5
+    # The tokenizer lowercases, so case variants share an entry; `query` is echoed per request
+    # Read before the index globals: a concurrent swap can only file fresh results under an old key
+    key = (q.lower(), k, threshold, _index_version)
+    now = time.monotonic()
+    with _search_cache_lock:
+        hit = _search_cache.get(key)
+        if hit is not None and now - hit[0] < SEARCH_CACHE_TTL:
+            _search_cache.move_to_end(key)
+            return jsonify({"query": q, **hit[1]})
     results = core.query_documents(q, doc_vecs, idf, docs, k=k, threshold=threshold)
     answer, sources = core.generate_answer(q, results)
     # naive confidence: based on number of sources
     conf = min(0.99, 0.3 + 0.2 * len(sources)) if sources else 0.2
-    return jsonify({"query": q, "answer": answer, "confidence": conf, "sources": sources})
+    payload = {"answer": answer, "confidence": conf, "sources": sources}
+    with _search_cache_lock:
+        _search_cache[key] = (now, payload)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    return jsonify({"query": q, **payload})
 
 
 @app.get("/dashboard/overview")
@@ -964,16 +1646,7 @@ def dashboard_overview():
 @app.get("/dashboard/timeseries/docs_per_day")
 def docs_per_day():
     # Build a simple timeseries from logs as proxy for ingest activity
-    data = {}
-    for entry in _load_logs():
-        ts = entry.get("timestamp")
-        if not ts:
-            continue
-        day = ts[:10]
-        data[day] = data.get(day, 0) + 1
-    series = [
-        {"date": day, "documents": count} for day, count in sorted(data.items())
-    ]
+    series = [{"date": day, "documents": count} for day, count in _log_counts_per_day()]
     if not series:
         today = datetime.utcnow().strftime("%Y-%m-%d")
         series = [{"date": today, "documents": len(docs)}]
@@ -1015,11 +1688,24 @@ def jobs_active():
 
 @app.get("/dashboard/evolver_history")
 def evolver_history():
-    hist_file = ROOT / "real-time-ai-dashboard" / "evolver" / "history.json"
+    # The evolver appends to history.jsonl (one run per line); older runs left a history.json list
+    hist_file = ROOT / "real-time-ai-dashboard" / "evolver" / "history.jsonl"
     if hist_file.exists():
+        items = []
+        with open(hist_file, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    items.append(_loads_bytes(line))
+                except Exception:
+                    # Skip a partially written line
+                    continue
+        return jsonify({"items": items})
+    legacy_file = hist_file.with_suffix(".json")
+    if legacy_file.exists():
         try:
-            with open(hist_file, "r", encoding="utf-8") as f:
-                return jsonify({"items": json.load(f)})
+            return jsonify({"items": _loads_bytes(legacy_file.read_bytes())})
         except Exception:
             pass
     return jsonify({"items": []})
@@ -1070,7 +1756,7 @@ def api_healthz():
         health["redis"] = {"ok": False, "error": "REDIS_URL non défini"}
     # Data persistence
     try:
-        docs_count = len(_read_dataset())
+        docs_count = _dataset_count()
         health["data"] = {"ok": DATA_DIR.exists(), "dir": str(DATA_DIR), "docs": docs_count}
     except Exception as e:
         health["data"] = {"ok": False, "dir": str(DATA_DIR), "error": str(e)}
@@ -1088,30 +1774,67 @@ def api_healthz():
 
 @app.get("/api/status")
 def api_status():
-    logs = _load_logs()
+    log_count, _, _ = _log_summary()
     return jsonify(
         {
-            "running": running,
+            "running": _running.is_set(),
             "threshold": threshold,
-            "logs": len(logs),
+            "logs": log_count,
         }
     )
 
 
 @app.post("/api/start")
 def api_start():
-    global running
-    running = True
+    _running.set()
     return jsonify({"ok": True})
 
 
 @app.post("/api/stop")
 def api_stop():
-    global running
-    running = False
+    _running.clear()
     return jsonify({"ok": True})
 
 
+# LLM augmentation runs off the request thread; results are polled via GET /api/ask/<request_id>
+ASK_LLM_ASYNC = os.getenv("ASK_LLM_ASYNC", "1") in ("1", "true", "True")
+_ask_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ASK_WORKERS", "8")), thread_name_prefix="ask")
+_pending_llm: "OrderedDict[str, Future]" = OrderedDict()
+_pending_llm_lock = threading.Lock()
+_PENDING_LLM_MAX = 1024
+
+
+def _llm_augment(client: Any, llm_model: str, question: str, results: list, cache_key: tuple | None) -> str | None:
+    """Ask the LLM for a short answer grounded on the top sources (None on failure)."""
+    try:
+        # Build a short context from top sources
+        context_snippets = [
+            f"Titre: {doc.get('title')}\nContenu: {(doc.get('content') or '')[:800]}" for _, doc in results[:2]
+        ]
+        parts = [
+            "Tu es un assistant utile. Réponds brièvement et cite les sources si possible.\n",
+            f"Question: {question}\n",
+        ]
+        if context_snippets:
+            parts += ["\n\nContexte:\n", "\n---\n".join(context_snippets)]
+        prompt = "".join(parts)
+        resp = client.responses.create(model=llm_model, input=prompt, store=False)
+        llm_answer = getattr(resp, "output_text", None) or getattr(resp, "content", None)
+        if _llm_cache is not None and cache_key is not None and isinstance(llm_answer, str) and llm_answer:
+            _llm_cache.put(cache_key[0], cache_key[1], llm_model, llm_answer, cache_key[2])
+        return llm_answer
+    except Exception:
+        return None
+
+
+def _augment_and_log(
+    client: Any, llm_model: str, question: str, results: list, cache_key: tuple | None, log_entry: Dict[str, Any]
+) -> str | None:
+    llm_answer = _llm_augment(client, llm_model, question, results, cache_key)
+    _append_log({**log_entry, "llm_answer": llm_answer})
+    return llm_answer
+
+
 @app.post("/api/ask")
 def api_ask():
     global threshold
@@ -1122,68 +1845,91 @@ def api_ask():
             return jsonify({"error": "question manquante"}), 400
 
         start = time.perf_counter()
-        results = core.query_documents(question, doc_vecs, idf, docs, k=3, threshold=threshold)
+        version = _index_version
+        index_vecs, index_idf, index_docs = doc_vecs, idf, docs
+        query_vec = _query_vector(question, version, index_idf)
+        results = core.query_documents(
+            question, index_vecs, index_idf, index_docs, k=3, threshold=threshold, query_vec=query_vec
+        )
         answer, sources = core.generate_answer(question, results)
         elapsed = time.perf_counter() - start
 
         # Simple evaluation: success if at least two distinct sources
         success = len(sources) >= 2
         # Adjust threshold (bounds 0.05 - 0.5) similar to main.py
-        if success:
-            threshold = max(0.05, threshold - 0.02)
-        else:
-            threshold = min(0.5, threshold + 0.02)
+        with _threshold_lock:
+            if success:
+                threshold = max(0.05, threshold - 0.02)
+            else:
+                threshold = min(0.5, threshold + 0.02)
+            new_threshold = threshold
+
+        log_entry = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "question": question,
+            "answer": answer,
+            "llm_answer": None,
+            "sources": sources,
+            "success": success,
+            "response_time": elapsed,
+            "threshold": new_threshold,
+        }
+        payload: Dict[str, Any] = {
+            "answer": answer,
+            "llm_answer": None,
+            "sources": sources,
+            "response_time": elapsed,
+            "threshold": new_threshold,
+        }
 
         # Optional: augment answer using OpenAI if configured
-        llm_answer = None
         client = _get_openai_client()
-        if client is not None:
-            try:
-                # Build a short context from top sources
-                context_snippets = []
-                for _, doc in results[:2]:
-                    context_snippets.append(f"Titre: {doc.get('title')}\nContenu: {doc.get('content')[:800]}")
-                prompt = (
-                    "Tu es un assistant utile. Réponds brièvement et cite les sources si possible.\n" 
-                    f"Question: {question}\n"
-                    + ("\n\nContexte:\n" + "\n---\n".join(context_snippets) if context_snippets else "")
-                )
-                llm_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-                resp = client.responses.create(model=llm_model, input=prompt, store=False)
-                llm_answer = getattr(resp, "output_text", None) or getattr(resp, "content", None)
-            except Exception:
-                llm_answer = None
-
-        # Log the interaction
-        logs = _load_logs()
-        logs.append(
-            {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "question": question,
-                "answer": answer,
-                "llm_answer": llm_answer,
-                "sources": sources,
-                "success": success,
-                "response_time": elapsed,
-                "threshold": threshold,
-            }
-        )
-        _save_logs(logs)
-
-        return jsonify(
-            {
-                "answer": answer,
-                "llm_answer": llm_answer,
-                "sources": sources,
-                "response_time": elapsed,
-                "threshold": threshold,
-            }
-        )
+        llm_model = OPENAI_MODEL
+        cache_key = None
+        if client is not None and _llm_cache is not None:
+            # Read the version before the index globals (see /search)
+            cache_version = _index_version
+            cache_vec, cache_norm = _llm_cache.vectorize(question, idf, len(docs))
+            cache_key = (cache_vec, cache_norm, cache_version)
+            cached = _llm_cache.get(cache_vec, cache_norm, llm_model, cache_version)
+            if cached is not None:
+                client = None
+                log_entry["llm_answer"] = payload["llm_answer"] = cached
+
+        if client is None:
+            # Log the interaction
+            _append_log(log_entry)
+        elif not ASK_LLM_ASYNC:
+            payload["llm_answer"] = _augment_and_log(client, llm_model, question, results, cache_key, log_entry)
+        else:
+            # The LLM call and its log line finish in the background; poll GET /api/ask/<request_id>
+            request_id = uuid.uuid4().hex
+            fut = _ask_executor.submit(_augment_and_log, client, llm_model, question, results, cache_key, log_entry)
+            with _pending_llm_lock:
+                _pending_llm[request_id] = fut
+                while len(_pending_llm) > _PENDING_LLM_MAX:
+                    _pending_llm.popitem(last=False)
+            payload["request_id"] = request_id
+            payload["llm_pending"] = True
+
+        return jsonify(payload)
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"error": str(e)}), 500
 
 
+@app.get("/api/ask/<request_id>")
+def api_ask_result(request_id: str):
+    """LLM answer of an /api/ask call that returned `llm_pending`."""
+    with _pending_llm_lock:
+        fut = _pending_llm.get(request_id)
+    if fut is None:
+        return jsonify({"error": "request_id inconnu ou expiré"}), 404
+    if not fut.done():
+        return jsonify({"request_id": request_id, "done": False, "llm_answer": None})
+    return jsonify({"request_id": request_id, "done": True, "llm_answer": fut.result()})
+
+
 @app.get("/api/llm_test")
 def api_llm_test():
     client = _get_openai_client()
@@ -1191,12 +1937,12 @@ def api_llm_test():
         _record_error("OPENAI_API_KEY manquant ou SDK non disponible", 400)
         return jsonify({"ok": False, "error": "OPENAI_API_KEY manquant ou SDK non disponible"}), 400
     try:
-        model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        model = OPENAI_MODEL
         resp = client.responses.create(model=model, input="write a 1-line haiku about AI", store=False)
         text = getattr(resp, "output_text", None) or getattr(resp, "content", None)
         return jsonify({"ok": True, "model": model, "text": text})
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
@@ -1205,11 +1951,13 @@ def api_evolve():
     """Minimal evolution step: gently decrease threshold within bounds."""
     global threshold
     try:
-        old = threshold
-        threshold = max(0.05, threshold - 0.01)
-        return jsonify({"ok": True, "old_threshold": old, "new_threshold": threshold})
+        with _threshold_lock:
+            old = threshold
+            threshold = max(0.05, threshold - 0.01)
+            new = threshold
+        return jsonify({"ok": True, "old_threshold": old, "new_threshold": new})
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"error": str(e)}), 500
 
 
@@ -1218,34 +1966,15 @@ def api_crawl():
     """
     Very small crawler: fetch an URL, extract title + text, add to dataset, rebuild index.
     """
-    import re
-    from bs4 import BeautifulSoup  # type: ignore
-    import requests
-    from urllib.parse import urlparse, unquote, quote
-
-    global docs, doc_vecs, idf
-
     try:
         data = request.get_json(force=True) or {}
         raw_url = (data.get("url") or "").strip()
         if not raw_url:
             return jsonify({"error": "url manquante"}), 400
         # Sanitize and ensure scheme
-        url = raw_url
-        # Strip surrounding quotes if pasted
-        if (url.startswith("'") and url.endswith("'")) or (url.startswith('"') and url.endswith('"')):
-            url = url[1:-1]
-        # If the string contains an URL inside text, extract the first one
-        if not url.lower().startswith(("http://", "https://")) and "http" in url:
-            import re as _re
-            m = _re.search(r"https?://[^\s'\"]+", url)
-            if m:
-                url = m.group(0)
-        if not url.lower().startswith(("http://", "https://")):
-            if url.lower().startswith("www."):
-                url = "https://" + url
-            else:
-                return jsonify({"error": "URL invalide: doit commencer par http(s)://"}), 400
+        url = _clean_seed(raw_url)
+        if url is None:
+            return jsonify({"error": "URL invalide: doit commencer par http(s)://"}), 400
 
         # Use a browser-like User-Agent, Accept-Language and allow redirects to avoid simple 403 blocks
         headers = {
@@ -1268,7 +1997,7 @@ def api_crawl():
             title = unquote(title_slug)
             api_title = quote(title, safe="")
             api_url = f"https://{lang}.wikipedia.org/api/rest_v1/page/summary/{api_title}?redirect=true"
-            api_resp = requests.get(api_url, timeout=20, headers=headers)
+            api_resp = _http.get(api_url, timeout=20, headers=headers)
             api_resp.raise_for_status()
             data_json = api_resp.json()
             title = data_json.get("title") or title
@@ -1284,7 +2013,7 @@ def api_crawl():
                     "format": "json",
                     "titles": title,
                 }
-                action_resp = requests.get(action_url, params=params, timeout=20, headers=headers)
+                action_resp = _http.get(action_url, params=params, timeout=20, headers=headers)
                 action_resp.raise_for_status()
                 action_json = action_resp.json()
                 pages = action_json.get("query", {}).get("pages", {})
@@ -1294,47 +2023,46 @@ def api_crawl():
                         break
                 if not extract:
                     return jsonify({"error": "Wikipedia: résumé indisponible pour cette page (essayez un article spécifique)."}), 422
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                dataset = json.load(f)
-            dataset.append({"title": title, "url": url, "content": extract[:5000]})
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(dataset, f, ensure_ascii=False, indent=2)
-            docs = dataset
-            doc_vecs, idf = core.build_index(docs)
+            new_doc = _make_doc(title, url, extract)
+            _append_dataset(new_doc)
+            _extend_index([new_doc])
             return jsonify({"ok": True, "title": title, "added": True, "via": "wikipedia_api"})
 
-        # Generic HTML fetch
-        resp = requests.get(url, timeout=20, headers=headers, allow_redirects=True)
+        # Generic HTML fetch, conditional if the page is already stored with validators
+        _, stored_validators = _dataset_meta()
+        stored = stored_validators.get(url) or stored_validators.get(_norm_url(url))
+        if stored is not None:
+            if stored[1]:
+                headers["If-None-Match"] = stored[1]
+            if stored[2]:
+                headers["If-Modified-Since"] = stored[2]
+        resp = _http.get(url, timeout=20, headers=headers, allow_redirects=True)
+        if resp.status_code == 304 and stored is not None:
+            # Unchanged since the stored copy: nothing to parse or index
+            return jsonify({"ok": True, "title": stored[0], "added": False, "cached": True})
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # Extract title and main text
-        title = (soup.title.string if soup.title and soup.title.string else url)[:200]
-        # Simple text extraction: join paragraphs
-        paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
-        text = "\n".join(paragraphs)
-        # Trim overly long content
-        text = re.sub(r"\s+", " ", text).strip()
+        # Extract title and main text (paragraphs), with the crawler's parser
+        # Whitespace is collapsed and paragraphs past the stored MAX_DOC_CHARS are never joined
+        title, text = _extract_text_from_html(_parse_html(resp.text), limit=MAX_DOC_CHARS, collapse_ws=True)
+        title = title or url[:200]
         if not text:
             text = "Contenu indisponible ou page principalement visuelle."
 
-        # Load, append, and persist
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            dataset = json.load(f)
-        new_doc = {"title": title, "url": url, "content": text[:5000]}
-        dataset.append(new_doc)
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        # Persist as one JSONL line; the crawler's compaction folds it into DATA_FILE
+        new_doc = _make_doc(title, url, text)
+        validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        new_doc.update({k: v for k, v in validators.items() if v})
+        _append_dataset(new_doc)
 
-        # Refresh in-memory index
-        docs = dataset
-        doc_vecs, idf = core.build_index(docs)
+        # Refresh in-memory index (incrementally; full rebuild every INDEX_REBUILD_EVERY docs)
+        _extend_index([new_doc])
 
         return jsonify({"ok": True, "title": title, "added": True})
     except requests.RequestException as rexc:  # type: ignore
         _record_error(f"HTTP: {rexc}", 502)
         return jsonify({"error": f"HTTP: {rexc}"}), 502
     except Exception as e:
-        _record_error(str(e), 500, {"stack": traceback.format_exc()})
+        _record_error(str(e), 500, with_stack=True)
         return jsonify({"error": str(e)}), 500
 
 
@@ -1343,7 +2071,7 @@ def api_crawl():
 def after_request_log_errors(response):  # type: ignore
     try:
         status = int(getattr(response, "status_code", 0) or 0)
-        if status >= 400:
+        if status >= 400 and not g.get("error_recorded"):
             msg = None
             try:
                 if response.is_json:
@@ -1371,7 +2099,7 @@ def handle_405(e):  # type: ignore
 
 @app.errorhandler(500)
 def handle_500(e):  # type: ignore
-    _record_error(str(e), 500, {"stack": traceback.format_exc()})
+    _record_error(str(e), 500, with_stack=True)
     return jsonify({"error": "Internal Server Error"}), 500
 
 
@@ -0,0 +1,9 @@
+from collections import Counter
+
+from backend.app.main import app
+
+
+def test_no_duplicate_routes():
+    # A second handler on the same method+path is never reached (first match wins)
+    seen = Counter((m, r.path) for r in app.routes for m in (getattr(r, "methods", None) or ()))
+    assert [k for k, n in seen.items() if n > 1] == []
@@ -37,3 +37,47 @@ def test_search_answer_with_fallback_tfidf(monkeypatch):
     # Should have at least one citation from dummy_data
     assert len(out["citations"]) >= 1
     assert 0.0 <= out["confidence"] <= 1.0
+
+
+def test_semantic_cache_hit_miss_and_invalidation(monkeypatch, tmp_path):
+    import core.search as search
+
+    calls = []
+
+    def _uncached(query: str, top_k: int, threshold: float):
+        calls.append(query)
+        return {"answer": f"réponse {len(calls)}", "citations": [], "confidence": 0.5}
+
+    vectors = {"a": [1.0, 0.0], "a bis": [0.999, 0.01], "b": [0.0, 1.0]}
+    version = ["v1"]
+    monkeypatch.setenv("SEMANTIC_CACHE", "1")
+    monkeypatch.setenv("OPENAI_MODEL", "m1")
+    monkeypatch.setattr(search, "_semantic_cache", search._SemanticCache(tmp_path / "semcache", capacity=8))
+    monkeypatch.setattr(search, "_embed_query", lambda q: vectors[q])
+    monkeypatch.setattr(search, "_corpus_version", lambda: version[0])
+    monkeypatch.setattr(search, "_search_answer_uncached", _uncached)
+
+    first = search.search_answer("a")
+    # Near-identical question: served from the cache
+    assert search.search_answer("a bis") == first
+    assert len(calls) == 1
+    # Different question: miss
+    search.search_answer("b")
+    assert len(calls) == 2
+    # Corpus changed (e.g. a crawl added documents): the old answer is not reused
+    version[0] = "v2"
+    assert search.search_answer("a")["answer"] != first["answer"]
+    assert len(calls) == 3
+    # Another LLM model: miss
+    monkeypatch.setenv("OPENAI_MODEL", "m2")
+    search.search_answer("a")
+    assert len(calls) == 4
+    # Expired entries are not served
+    monkeypatch.setenv("SEMANTIC_CACHE_TTL", "0")
+    search.search_answer("a")
+    assert len(calls) == 5
+    # Disabled by default
+    monkeypatch.delenv("SEMANTIC_CACHE")
+    monkeypatch.delenv("SEMANTIC_CACHE_TTL")
+    search.search_answer("a")
+    assert len(calls) == 6
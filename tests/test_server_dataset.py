@@ -0,0 +1,57 @@
+import json
+import threading
+
+import pytest
+
+server = pytest.importorskip("server")
+
+
+@pytest.fixture
+def dataset_files(monkeypatch, tmp_path):
+    data_file = tmp_path / "dummy_data.json"
+    data_jsonl = tmp_path / "dummy_data.jsonl"
+    data_file.write_text(json.dumps([server._make_doc("Base", "https://example.com/base", "base")]), encoding="utf-8")
+    monkeypatch.setattr(server, "DATA_FILE", data_file)
+    monkeypatch.setattr(server, "DATA_JSONL", data_jsonl)
+    return data_file, data_jsonl
+
+
+def test_append_goes_to_jsonl_tail(dataset_files):
+    data_file, data_jsonl = dataset_files
+    before = data_file.read_bytes()
+    server._append_dataset(server._make_doc("Tail", "https://example.com/tail", "tail"))
+    assert data_file.read_bytes() == before
+    assert [d["url"] for d in server._read_dataset()] == ["https://example.com/base", "https://example.com/tail"]
+
+
+def test_legacy_entries_get_content_hashes(dataset_files):
+    data_file, _ = dataset_files
+    data_file.write_text(json.dumps([{"title": "Old", "url": "https://example.com/old", "content": "old"}]), encoding="utf-8")
+    dataset = server._read_dataset()
+    assert server._fill_content_hashes(dataset) == 1
+    assert dataset[0]["content_sha256"] == server._content_hash("old")
+    assert server._fill_content_hashes(dataset) == 0
+
+
+def test_compaction_folds_tail_into_data_file(dataset_files):
+    data_file, data_jsonl = dataset_files
+    server._append_dataset(server._make_doc("Tail", "https://example.com/tail", "tail"))
+    merged = server._compact_dataset()
+    assert not data_jsonl.exists()
+    assert [d["url"] for d in json.loads(data_file.read_text(encoding="utf-8"))] == [d["url"] for d in merged]
+    assert len(merged) == 2
+
+
+def test_appends_concurrent_with_compaction_are_kept(dataset_files):
+    n = 200
+
+    def _append_many():
+        for i in range(n):
+            server._append_dataset(server._make_doc(f"Doc {i}", f"https://example.com/{i}", f"content {i}"))
+
+    writer = threading.Thread(target=_append_many)
+    writer.start()
+    while writer.is_alive():
+        server._compact_dataset()
+    writer.join()
+    assert len(server._read_dataset()) == n + 1
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List
 
 import requests
@@ -26,10 +27,12 @@ def main():
     args = p.parse_args()
 
     base = args.base_url.rstrip("/")
+    # One keep-alive connection to the server for the whole run
+    session = requests.Session()
 
     # Health check
     try:
-        r = requests.get(f"{base}/api/status", timeout=5)
+        r = session.get(f"{base}/api/status", timeout=5)
         r.raise_for_status()
     except Exception as e:
         print("[auto_update] Erreur de connexion au serveur Flask.")
@@ -38,22 +41,28 @@ def main():
         return 2
 
     # Ensure worker running
-    st = requests.get(f"{base}/api/status", timeout=10).json()
+    st = session.get(f"{base}/api/status", timeout=10).json()
     if not st.get("running"):
         print("[auto_update] Démarrage du worker…")
-        requests.post(f"{base}/api/start", timeout=10)
+        session.post(f"{base}/api/start", timeout=10)
+
+    def ask_one(q: str):
+        try:
+            resp = session.post(f"{base}/api/ask", json={"question": q}, timeout=30)
+            if resp.status_code == 200:
+                data = resp.json()
+                return f"[ask] {q} -> success={data.get('success')} threshold={data.get('threshold'):.3f}"
+            return f"[ask] {q} -> HTTP {resp.status_code}"
+        except Exception as e:
+            return f"[ask] {q} -> erreur: {e}"
 
     def ask_all(questions: List[str]):
-        for q in questions:
-            try:
-                resp = requests.post(f"{base}/api/ask", json={"question": q}, timeout=30)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    print(f"[ask] {q} -> success={data.get('success')} threshold={data.get('threshold'):.3f}")
-                else:
-                    print(f"[ask] {q} -> HTTP {resp.status_code}")
-            except Exception as e:
-                print(f"[ask] {q} -> erreur: {e}")
+        # Questions are independent: a cycle waits for the slowest one, not for their sum
+        if not questions:
+            return
+        with ThreadPoolExecutor(max_workers=min(8, len(questions))) as ex:
+            for fut in as_completed([ex.submit(ask_one, q) for q in questions]):
+                print(fut.result())
 
     cycle = 0
     while True:
@@ -63,7 +72,7 @@ def main():
 
         # Trigger evolution
         try:
-            ev = requests.post(f"{base}/api/evolve", timeout=15).json()
+            ev = session.post(f"{base}/api/evolve", timeout=15).json()
             change = ev.get("change")
             if change:
                 print(f"[evolve] {change['tuned']} {change['from']} -> {change['to']} (mean_success={ev.get('mean_success'):.2f})")